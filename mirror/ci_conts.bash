@@ -1,4 +1,7 @@
 #!/bin/bash
+## ci-* images of THIS host and the containers using them, written to ~/shared/ci-containers.txt
+## runs on the REMOTEHOST against its local docker; for all hosts at once (no extra ssh),
+## use "inventory.py --ci" on the LOCALHOST, which renders the same from the fleet inventory
 
 # Define the output file
 output_file=~/shared/ci-containers.txt
@@ -1,4 +1,8 @@
 #!/bin/bash
+## disk usage, images and containers of THIS host, written to ~/shared/containers.txt
+## stays on the REMOTEHOST: it measures /home per user (du, with sudo if available) and can
+## notify users (wall, mail, warning files), none of which the fleet inventory can do.
+## For just the images, containers and disk of all hosts use "inventory.py --hosts"
 
 OUTPUT_FILE=$HOME/shared/containers.txt
 SEND_WALL=false
@@ -2,105 +2,98 @@
 """A short-hand command that uses $HOME/mirror/context/hosts.yaml to connect
 to an ssh host. 
 
-Includes also a connection test feature for all hosts.
+Includes also a connection test feature for all hosts and a fleet-wide
+health sweep (container-health-check.py on every host and context container).
+
+All connections go through sshpool.py's ControlMaster connections, so repeated
+commands to a host skip the ssh handshake.
 """
 import sys
 import yaml
 import os
-import subprocess
+import re
+import glob
+import json
+import shlex
+import time
 import argparse
-import socket
-import paramiko
+import subprocess
+import sshpool
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 # Path to your YAML config file
 CONFIG_FILE = f"{os.environ['HOME']}/mirror/context/hosts.yaml"
+CONTEXT_DIR = f"{os.environ['HOME']}/mirror/context"
+# Where the health sweep leaves its JSON report
+HEALTH_REPORT = f"{CONTEXT_DIR}/health.json"
+# container-health-check.py as pushed to the REMOTEHOST and as seen in the CONTAINER
+HOST_HEALTH_CHECK = "~/shared/bin/container-health-check.py"
+CONTAINER_HEALTH_CHECK = "/root/shared/bin/container-health-check.py"
 
 def load_config():
     with open(CONFIG_FILE, 'r') as f:
         return yaml.safe_load(f)
 
-def get_disk_space(ssh: paramiko.SSHClient) -> str:
-    """Get disk space information for root directory.
+def load_contexts() -> Dict[str, Dict[str, str]]:
+    """Read the export statements of the context files (without sourcing them)
     
     Returns:
-        String containing disk usage information or error message
+        Dictionary of contextname -> {variable: value}
     """
-    try:
-        stdin, stdout, stderr = ssh.exec_command("df -h /")
-        output = stdout.readlines()
-        if len(output) >= 2:  # df output has header and at least one data line
-            # Get the last line which contains the actual data
-            data = output[1].split()
-            total, used, avail = data[1], data[2], data[3]
-            used_percent = data[4]
-            return f"Total: {total}, Used: {used}, Available: {avail} ({used_percent} used)"
-        return "Unable to parse disk space information"
-    except Exception as e:
-        return f"Error getting disk space: {str(e)}"
+    contexts = {}
+    for path in sorted(glob.glob(os.path.join(CONTEXT_DIR, "*.bash"))):
+        if "scaffold" in os.path.basename(path):
+            continue
+        variables = {}
+        with open(path, 'r') as f:
+            for line in f:
+                match = re.match(r"\s*export\s+(\w+)=(\"[^\"]*\"|'[^']*'|[^\s#]*)", line)
+                if match:
+                    variables[match.group(1)] = match.group(2).strip("\"'")
+        contexts[variables.get('contextname') or os.path.basename(path)[:-5]] = variables
+    return contexts
 
-def get_datetime(ssh: paramiko.SSHClient) -> str:
-    """Check that datetime is ok in the machine
+def parse_disk_space(output: str) -> str:
+    """Parse disk space information for root directory from "df -h /" output.
     
     Returns:
         String containing disk usage information or error message
     """
-    stdin, stdout, stderr = ssh.exec_command("date --utc")
-    output = stdout.readlines()[0]
-    return output
+    lines = output.splitlines()
+    if len(lines) >= 2:  # df output has header and at least one data line
+        # Get the last line which contains the actual data
+        data = lines[1].split()
+        total, used, avail = data[1], data[2], data[3]
+        used_percent = data[4]
+        return f"Total: {total}, Used: {used}, Available: {avail} ({used_percent} used)"
+    return "Unable to parse disk space information"
 
 def test_ssh_connection(host_info: Tuple[str, Dict]) -> Tuple[str, str, bool, str, str, str]:
     """Test SSH connection to a host and check disk space
     
+    Both checks run as one command over the host's (reused) master connection.
+    
     Args:
         host_info: Tuple of (nickname, host_config)
     
     Returns:
-        Tuple of (nickname, success_status, connection_message, disk_space_info)
+        Tuple of (host, nickname, success_status, connection_message, disk_space_info, datetime)
     """
     nickname, config = host_info
     host = config['host']
     port = config['sshport']
 
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    
     print(f"ssh -vvv {config['username']}@{host}")
 
     try:
-        # First test if port is open
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(5)
-        result = sock.connect_ex((host, port))
-        if result != 0:
-            return host, nickname, False, f"Port {port} is closed", "", ""
-        sock.close()
-        
-        # Then try SSH connection
-        ssh.connect(
-            hostname=host,
-            port=port,
-            username=config['username'],
-            timeout=5
-        )
-        
-        # Get disk space information if connection successful
-        disk_space = get_disk_space(ssh)
-        datetime = get_datetime(ssh)
-        # return host, nickname, True, "Connection successful", disk_space
-        return host, nickname, True, "", disk_space, datetime
-    
-    except socket.gaierror:
-        return host, nickname, False, "DNS lookup failed", "", ""
-    except paramiko.AuthenticationException:
-        return host, nickname, False, "Authentication failed", "", ""
-    except (socket.timeout, paramiko.SSHException) as e:
-        return host, nickname, False, f"Connection failed: {str(e)}", "", ""
-    except Exception as e:
-        return host, nickname, False, f"Error: {str(e)}", "", ""
-    finally:
-        ssh.close()
+        result = sshpool.run(host, port, config['username'], "df -h /; echo @@; date --utc", timeout=15)
+    except subprocess.TimeoutExpired:
+        return host, nickname, False, "Connection failed: timed out", "", ""
+    if result.returncode == 255:
+        return host, nickname, False, sshpool.describe_error(result.stderr), "", ""
+    df, _, datetime = result.stdout.partition("@@\n")
+    return host, nickname, True, "", parse_disk_space(df), datetime.strip()
 
 def test_all_connections(config):
     """Test connections to all hosts in parallel and show disk space"""
@@ -128,6 +121,131 @@ def test_all_connections(config):
     
     print("-" * 70)
 
+def health_command(containers: List[str], timeout: int) -> str:
+    """Build the one remote command that health-checks a host and its containers
+    
+    Each target's JSON result is preceded by a "@@ <target>" marker line.
+    Containers that are not running are skipped. The checks run with --refresh:
+    a sweep has to show what hangs now, not a verdict cached minutes ago.
+    """
+    check = f"--json --refresh --timeout {timeout}"
+    lines = [f"echo '@@ host'; python3 {HOST_HEALTH_CHECK} {check}"]
+    for container in containers:
+        name = shlex.quote(container)
+        lines.append(
+            f"if docker ps -q --filter name=^{name}$ | grep -q .; then "
+            f"echo '@@ '{name}; docker exec {name} {CONTAINER_HEALTH_CHECK} {check}; fi"
+        )
+    return "\n".join(lines)
+
+def parse_health_output(output: str) -> List[Dict]:
+    """Split health_command() output into one result dict per target"""
+    targets = []
+    for block in output.split("@@ ")[1:]:
+        target, _, body = block.partition("\n")
+        try:
+            result = json.loads(body.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            result = {'error': body.strip() or "no output from container-health-check.py"}
+        targets.append({'target': target.strip(), **result})
+    return targets
+
+def sweep_host(host_info: Tuple[str, Dict], containers: List[str], timeout: int) -> Dict:
+    """Health-check one host and its context containers over its (reused) master connection
+    
+    Returns:
+        Dictionary with the host, its nickname, the sweep duration and the per-target results
+        (or an 'error' if the host could not be reached)
+    """
+    nickname, config = host_info
+    start = time.time()
+    report = {'nickname': nickname, 'host': config['host'], 'targets': []}
+    # each check is bounded by its slowest probe; leave room for every target plus docker exec
+    deadline = (timeout + 5) * (len(containers) + 1)
+    try:
+        result = sshpool.run(config['host'], config['sshport'], config['username'],
+                             health_command(containers, timeout), timeout=deadline)
+        if result.returncode == 255 and "@@ " not in result.stdout:
+            report['error'] = sshpool.describe_error(result.stderr)
+        else:
+            report['targets'] = parse_health_output(result.stdout)
+    except subprocess.TimeoutExpired:
+        report['error'] = "Health check did not finish in time"
+    except Exception as e:
+        report['error'] = f"Connection failed: {str(e)}"
+    report['elapsed'] = time.time() - start
+    return report
+
+def target_status(target: Dict) -> str:
+    """One-word verdict for a health sweep target"""
+    if 'error' in target:
+        return "ERROR"
+    if target['hanging_commands']:
+        return "HANG"
+    return "OK" if target['failed'] == 0 else "FAIL"
+
+def health_sweep(config, workers: int = 10, timeout: int = 5, report_file: str = HEALTH_REPORT):
+    """Run container-health-check.py on every host and its running context containers
+    
+    Hosts are swept concurrently (at most `workers` at a time, one connection per host).
+    Prints a table and writes the whole sweep to `report_file` as JSON.
+    """
+    containers = {}
+    for context in load_contexts().values():
+        if context.get('hostname') and context.get('container_name'):
+            containers.setdefault(context['hostname'], set()).add(context['container_name'])
+    
+    host_configs = [
+        (nickname, {**host_config, 'username': config['username']})
+        for nickname, host_config in config['hosts'].items()
+        if not host_config.get("skip", False)
+    ]
+    
+    print(f"Health sweep of {len(host_configs)} hosts...")
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(sweep_host, host_info, sorted(containers.get(host_info[1]['host'], ())), timeout)
+            for host_info in host_configs
+        ]
+        reports = [future.result() for future in futures]
+    elapsed = time.time() - start
+    
+    print("-" * 90)
+    print(f"{'HOST':<16} {'TARGET':<28} {'GPU':<8} {'PASSED':<8} {'STATUS':<7} DETAILS")
+    print("-" * 90)
+    for report in reports:
+        if 'error' in report:
+            print(f"{report['nickname']:<16} {'-':<28} {'-':<8} {'-':<8} {'ERROR':<7} {report['error']}")
+            continue
+        for target in report['targets']:
+            status = target_status(target)
+            if 'error' in target:
+                passed, details = "-", target['error'].splitlines()[-1]
+            else:
+                passed = f"{target['passed']}/{target['total']}"
+                details = ", ".join(f"{name}: {result['status']}"
+                                    for name, result in target['results'].items()
+                                    if result['status'] != 'passed')
+            print(f"{report['nickname']:<16} {target['target']:<28} {target.get('gpu_type', '-'):<8} "
+                  f"{passed:<8} {status:<7} {details}")
+    print("-" * 90)
+    
+    bad = [report['nickname'] for report in reports
+           if 'error' in report or any(target_status(t) != "OK" for t in report['targets'])]
+    print(f"Swept {len(reports)} hosts in {elapsed:.1f}s, {len(bad)} need attention" + (f": {', '.join(bad)}" if bad else ""))
+    
+    with open(report_file, 'w') as f:
+        json.dump({'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'elapsed': elapsed, 'hosts': reports}, f, indent=2)
+    print(f"Report written to {report_file}")
+    return bad
+
+def disconnect_all(config):
+    """Close the master connections to all hosts"""
+    for nickname, host_config in config['hosts'].items():
+        if sshpool.disconnect(host_config['host'], host_config['sshport'], config['username']):
+            print(f"closed connection to {nickname}")
+
 def main():
     parser = argparse.ArgumentParser(
         description="SSH connection utility using YAML config"
@@ -149,6 +267,33 @@ def main():
         default=None,
         help="Just run a command instead of connecting"
     )
+    group.add_argument(
+        "--health",
+        action="store_true",
+        help="Health-check all hosts and their running context containers (container-health-check.py)"
+    )
+    group.add_argument(
+        "--workers",
+        type=int,
+        default=10,
+        help="How many hosts --health checks at a time (default: 10)"
+    )
+    group.add_argument(
+        "--timeout",
+        type=int,
+        default=5,
+        help="Per-probe timeout for --health in seconds (default: 5)"
+    )
+    group.add_argument(
+        "--report",
+        default=HEALTH_REPORT,
+        help=f"Where --health writes its JSON report (default: {HEALTH_REPORT})"
+    )
+    group.add_argument(
+        "--disconnect",
+        action="store_true",
+        help="Close the shared (ControlMaster) connections to all hosts"
+    )
     group.add_argument(
         "--env",
         default=None,
@@ -175,6 +320,14 @@ def main():
         print(f'export username="{config["username"]}"')
         sys.exit(0)
 
+    if args.disconnect:
+        disconnect_all(config)
+        sys.exit(0)
+
+    if args.n is None and args.health:
+        bad = health_sweep(config, workers=args.workers, timeout=args.timeout, report_file=args.report)
+        sys.exit(1 if bad else 0)
+
     if args.n is None and args.test:
         test_all_connections(config)
         sys.exit(0)
@@ -197,10 +350,9 @@ def main():
 
     print(f"Connecting to {args.n} ({host}) as {username}...")
     
-    # Execute SSH command
-    ssh_cmd = ['ssh', '-p', str(port), f"{username}@{host}"]
-    if args.c:
-        ssh_cmd.append(args.c)
+    # Execute SSH command, over the shared connection if possible
+    sshpool.connect(host, port, username)
+    ssh_cmd = sshpool.ssh_command(host, port, username, args.c, batch=False)
     os.execvp('ssh', ssh_cmd)
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Fleet inventory: images, containers, disk and tmux sessions of all hosts
+
+Collects from every host in $HOME/mirror/context/hosts.yaml (and every host a
+context file points to) with one batched remote command per host, all hosts
+concurrently on an asyncio event loop, over the shared connections of sshpool.py.
+The result is cached to $HOME/mirror/context/inventory.json, and the reports
+render from that cache:
+
+    inventory.py                # collect, then report all contexts (what report.bash did)
+    inventory.py --hosts        # ... and per-host containers, disk and tmux sessions
+    inventory.py --ci           # ... and the ci-* images of every host with their containers
+    inventory.py --cached       # just render the last inventory, no connections
+    inventory.py --max-age 300  # reuse an inventory younger than 5 minutes
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import sshpool
+from go_ssh import CONTEXT_DIR, load_config, load_contexts
+from typing import Dict, List, Optional
+
+INVENTORY_FILE = f"{CONTEXT_DIR}/inventory.json"
+# Seconds the remote command of a host may take
+COLLECT_TIMEOUT = 60
+
+# Everything about a host in one go; each section starts with a "@@ <section>" line
+REMOTE_COMMAND = "; ".join([
+    "echo '@@ images'", "docker images --format '{{json .}}' 2>/dev/null",
+    "echo '@@ containers'", "docker ps -a --format '{{json .}}' 2>/dev/null",
+    "echo '@@ disk'", "df -Pk / $HOME 2>/dev/null",
+    "echo '@@ tmux'", "tmux ls -F '#{session_name} #{session_windows} #{session_attached}' 2>/dev/null",
+    "true"
+])
+
+
+def parse_inventory(output: str) -> Dict:
+    """Split REMOTE_COMMAND output into images, containers, disk and tmux lists"""
+    sections = {'images': [], 'containers': [], 'disk': [], 'tmux': []}
+    section = None
+    for line in output.splitlines():
+        if line.startswith("@@ "):
+            section = line[3:].strip()
+            continue
+        if not line.strip() or section not in sections:
+            continue
+        if section in ('images', 'containers'):
+            try:
+                sections[section].append(json.loads(line))
+            except ValueError:
+                pass
+        elif section == 'disk':
+            fields = line.split()
+            if fields[0] != "Filesystem" and len(fields) >= 6:
+                disk = {'mount': fields[5], 'total_kb': int(fields[1]), 'used_kb': int(fields[2]),
+                        'avail_kb': int(fields[3]), 'used': fields[4]}
+                if disk not in sections['disk']:
+                    sections['disk'].append(disk)
+        else:
+            name, windows, attached = (line.rsplit(" ", 2) + ["", ""])[:3]
+            sections['tmux'].append({'name': name, 'windows': windows, 'attached': attached == "1"})
+    return sections
+
+
+async def collect_host(nickname: str, host: str, port, username: str) -> Dict:
+    """Inventory of one host (with an 'error' instead if it could not be collected)"""
+    start = time.time()
+    entry = {'nickname': nickname, 'host': host}
+    error = await asyncio.to_thread(sshpool.connect, host, port, username)
+    if error is not None:
+        entry['error'] = sshpool.describe_error(error)
+    else:
+        process = await asyncio.create_subprocess_exec(
+            *sshpool.ssh_command(host, port, username, REMOTE_COMMAND),
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), COLLECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            entry['error'] = f"Timed out after {COLLECT_TIMEOUT}s"
+        else:
+            if process.returncode == 255:
+                entry['error'] = sshpool.describe_error(stderr.decode(errors='replace'))
+            else:
+                entry.update(parse_inventory(stdout.decode(errors='replace')))
+    entry['elapsed'] = time.time() - start
+    return entry
+
+
+def fleet_hosts(config: Dict, contexts: Dict[str, Dict[str, str]]) -> Dict[str, Dict]:
+    """host -> {nickname, port, username} for hosts.yaml hosts and the hosts of the contexts"""
+    hosts = {}
+    for nickname, host_config in config['hosts'].items():
+        if not host_config.get("skip", False):
+            hosts[host_config['host']] = {'nickname': nickname, 'port': host_config['sshport'],
+                                          'username': config['username']}
+    for contextname, context in contexts.items():
+        host = context.get('hostname')
+        if host and host not in hosts:
+            hosts[host] = {'nickname': context.get('hostnick') or host, 'port': context.get('sshport') or 22,
+                           'username': context.get('username') or config['username']}
+    return hosts
+
+
+async def collect(hosts: Dict[str, Dict]) -> Dict:
+    """Inventory of all hosts, collected concurrently"""
+    start = time.time()
+    entries = await asyncio.gather(*(
+        collect_host(info['nickname'], host, info['port'], info['username'])
+        for host, info in hosts.items()
+    ))
+    return {
+        'time': time.time(),
+        'elapsed': time.time() - start,
+        'hosts': {entry['host']: entry for entry in entries}
+    }
+
+
+def load_inventory() -> Optional[Dict]:
+    try:
+        with open(INVENTORY_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_inventory(inventory: Dict):
+    tmp = f"{INVENTORY_FILE}.{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(inventory, f, indent=2)
+    os.replace(tmp, INVENTORY_FILE)
+
+
+def find_image(images: List[Dict], image_id: str) -> Optional[Dict]:
+    """The image a context's image_id (repo:tag, repo or image id) refers to"""
+    name = image_id if ":" in image_id.rsplit("/", 1)[-1] else f"{image_id}:latest"
+    for image in images:
+        if f"{image['Repository']}:{image['Tag']}" == name:
+            return image
+        if image['ID'] and image_id.replace("sha256:", "").startswith(image['ID']):
+            return image
+    return None
+
+
+def image_containers(containers: List[Dict], image: Dict) -> List[Dict]:
+    """Containers created from an image (by repo:tag, bare repo for :latest, or image id)"""
+    names = {f"{image['Repository']}:{image['Tag']}", image['ID']}
+    if image['Tag'] == "latest":
+        names.add(image['Repository'])
+    return [c for c in containers if c['Image'] in names]
+
+
+def report_contexts(inventory: Dict, contexts: Dict[str, Dict[str, str]]):
+    """Status of all contexts, like report.bash used to print it
+
+    A context's container matches every container whose name contains container_name,
+    as the `docker ps --filter name=...` of the old report.bash did.
+    """
+    for contextname, context in contexts.items():
+        host = context.get('hostname', '')
+        image_id = context.get('image_id', '')
+        print("--------------CONTEXT: " + contextname + " @ " + host)
+        print("Image: " + image_id)
+        entry = inventory['hosts'].get(host)
+        if entry is None:
+            print("HOST NOT IN INVENTORY")
+            continue
+        if 'error' in entry:
+            print(f"HOST UNREACHABLE: {entry['error']}")
+            continue
+        image = find_image(entry['images'], image_id) if image_id else None
+        if image is not None:
+            print("Image created on: " + image['CreatedAt'].split(" ")[0])
+            print("Image DOWNLOADED")
+        container_name = context.get('container_name')
+        if not container_name:
+            continue
+        matching = [c for c in entry['containers'] if container_name in c['Names']]
+        if matching:
+            print("CONTAINER EXISTS")
+        if any(c['State'] == "running" for c in matching):
+            print("CONTAINER IS RUNNING")
+
+
+def report_hosts(inventory: Dict):
+    """Containers, disk and tmux sessions of every host"""
+    for host, entry in inventory['hosts'].items():
+        print(f"==============HOST: {entry['nickname']} ({host})")
+        if 'error' in entry:
+            print(f"UNREACHABLE: {entry['error']}")
+            continue
+        for disk in entry['disk']:
+            print(f"Disk {disk['mount']}: {disk['avail_kb'] / 1024**2:.0f}G free of "
+                  f"{disk['total_kb'] / 1024**2:.0f}G ({disk['used']} used)")
+        running = [c for c in entry['containers'] if c['State'] == "running"]
+        print(f"Images: {len(entry['images'])}, containers: {len(entry['containers'])} ({len(running)} running)")
+        for container in entry['containers']:
+            print(f"   {container['Names']:<40} {container['State']:<10} {container['Image']}")
+        if entry['tmux']:
+            print("tmux sessions: " + ", ".join(
+                f"{s['name']} ({s['windows']} windows{', attached' if s['attached'] else ''})" for s in entry['tmux']))
+
+
+def report_ci(inventory: Dict):
+    """The ci-* images of every host and the containers using them, like ci_conts.bash per host"""
+    for host, entry in inventory['hosts'].items():
+        print(f"==============HOST: {entry['nickname']} ({host})")
+        if 'error' in entry:
+            print(f"UNREACHABLE: {entry['error']}")
+            continue
+        for image in entry['images']:
+            if not image['Repository'].startswith("ci-"):
+                continue
+            print(f"Image: {image['Repository']}:{image['Tag']}")
+            containers = image_containers(entry['containers'], image)
+            if not containers:
+                print("  No containers using this image")
+            else:
+                print("  Containers:")
+                for container in containers:
+                    print(f"    {container['Names']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect and report the inventory of all hosts")
+    parser.add_argument("--cached", action="store_true",
+                        help=f"Report from the last inventory ({INVENTORY_FILE}) without connecting")
+    parser.add_argument("--max-age", type=float, default=0,
+                        help="Reuse the last inventory if it is younger than this many seconds")
+    parser.add_argument("--hosts", action="store_true",
+                        help="Also report containers, disk and tmux sessions per host")
+    parser.add_argument("--ci", action="store_true",
+                        help="Also report the ci-* images of every host and the containers using them")
+    parser.add_argument("--json", action="store_true",
+                        help="Print the inventory as JSON instead of the reports")
+    args = parser.parse_args()
+
+    try:
+        config = load_config()
+    except Exception as e:
+        print(f"Error loading config file: {e}")
+        sys.exit(1)
+    contexts = load_contexts()
+
+    inventory = load_inventory() if (args.cached or args.max_age > 0) else None
+    if args.cached and inventory is None:
+        print(f"No inventory in {INVENTORY_FILE} yet - run without --cached first")
+        sys.exit(1)
+    if inventory is None or (not args.cached and time.time() - inventory['time'] > args.max_age):
+        inventory = asyncio.run(collect(fleet_hosts(config, contexts)))
+        save_inventory(inventory)
+        print(f"# collected {len(inventory['hosts'])} hosts in {inventory['elapsed']:.1f}s", file=sys.stderr)
+    else:
+        print(f"# inventory from {time.time() - inventory['time']:.0f}s ago", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(inventory, indent=2))
+        return
+    report_contexts(inventory, contexts)
+    if args.hosts:
+        report_hosts(inventory)
+    if args.ci:
+        report_ci(inventory)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,15 @@ import argparse
 import yaml
 import os
 import sys
+import shlex
 import subprocess
+import sshpool
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def run_with_context(script_to_run, ssh=False, only=None):
+def run_with_context(script_to_run, ssh=False, only=None, parallel=None):
     # Get yaml path using pathlib
     yaml_file = Path.home() / "mirror" / "context" / "hosts.yaml"
     
@@ -35,8 +40,10 @@ def run_with_context(script_to_run, ssh=False, only=None):
     username = config['username']
     
     # For each hostname in the config
+    hosts = []
     for hostnick, host_config in config['hosts'].items():
-        print(f"\nProcessing host: {hostnick}")
+        if parallel is None:
+            print(f"\nProcessing host: {hostnick}")
 
         if only and (hostnick != only):
             print("skipping host", hostnick)
@@ -47,42 +54,116 @@ def run_with_context(script_to_run, ssh=False, only=None):
             continue
 
         if 'sshport' not in host_config:
-            print(f"Error: 'sshport' not found for host {hostname}")
+            print(f"Error: 'sshport' not found for host {hostnick}")
             continue
             
-        sshport = host_config['sshport']
-        hostname = host_config["host"]
-        
-        # Set environment variables
-        os.environ['username'] = username
-        os.environ['hostname'] = hostname
-        os.environ['sshport'] = str(sshport)
-        
-        if ssh:
-            # 'bash -ic "echo \"Hello World\""'
-            # script_to_run_ = f"ssh -q -o LogLevel=QUIET -p{sshport} {username}@{hostname} {script_to_run} 2>/dev/null"
-
-            st = "ssh -q -o LogLevel=QUIET "
-            st += "-o PasswordAuthentication=no "    # Disable password auth entirely
-            st += "-o ConnectTimeout=10 "           # Timeout for initial connection
-            st += "-o StrictHostKeyChecking=no "    # Skip host key verification
-            st +=f"-p{sshport} {username}@{hostname} '{script_to_run}' 2>/dev/null"
-            script_to_run_ = st
-            print(">", script_to_run_)
-            # script_to_run_ = f"ssh -q -p{sshport} {username}@{hostname} 'source ~/.bashrc && {script_to_run}'"
-            # print(script_to_run_)
+        if parallel is None:
+            run_host(hostnick, host_config["host"], host_config['sshport'], username, script_to_run, ssh)
+            print("did host", hostnick)
         else:
-            script_to_run_ = script_to_run
-
+            hosts.append((hostnick, host_config["host"], host_config['sshport']))
+
+    if parallel is not None:
+        return run_parallel(hosts, username, script_to_run, ssh, parallel)
+
+
+def host_command(hostname, sshport, username, script_to_run, ssh):
+    """Arguments for subprocess running script_to_run for one host
+
+    Each host gets its own environment with (username, hostname, sshport) - os.environ is not touched.
+
+    Returns:
+        Tuple of (subprocess arguments, message to print) - arguments are None if the host is unreachable
+    """
+    env = dict(os.environ, username=username, hostname=hostname, sshport=str(sshport))
+    if ssh:
+        # 'bash -ic "echo \"Hello World\""'
+        # Reuse (or start) the shared master connection to the host, see sshpool.py
+        error = sshpool.connect(hostname, sshport, username)
+        if error is not None:
+            return None, f"Error connecting to host {hostname}: {sshpool.describe_error(error)}"
+        command = sshpool.ssh_command(hostname, sshport, username, script_to_run)
+        command[1:1] = ["-q", "-o", "LogLevel=QUIET"]
+        return dict(args=command, env=env, stderr=subprocess.DEVNULL), f"> {shlex.join(command)}"
+    return dict(args=[script_to_run], env=env, shell=True), None
+
+
+def run_host(hostnick, hostname, sshport, username, script_to_run, ssh):
+    run_args, message = host_command(hostname, sshport, username, script_to_run, ssh)
+    if message:
+        print(message)
+    if run_args is None:
+        return
+    try:
+        # Run the script
+        subprocess.run(**run_args, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Error running script for host {hostname}: {e}")
+    except Exception as e:
+        print(f"Unexpected error for host {hostname}: {e}")
+
+
+def run_parallel(hosts, username, script_to_run, ssh, parallel):
+    """Run script_to_run for up to `parallel` hosts at a time
+
+    Output is streamed line by line, each line prefixed with its host nickname.
+    Ends with a per-host exit code and duration summary. An unexpected error while
+    running one host is reported as that host's failure; the other hosts carry on.
+    """
+    print_lock = threading.Lock()
+    width = max((len(hostnick) for hostnick, _, _ in hosts), default=0)
+
+    def stream(hostnick, hostname, sshport):
+        run_args, message = host_command(hostname, sshport, username, script_to_run, ssh)
+        if message:
+            with print_lock:
+                print(f"[{hostnick:<{width}}] {message}")
+        if run_args is None:
+            return None
+        process = subprocess.Popen(**{'stdout': subprocess.PIPE, 'stderr': subprocess.STDOUT, **run_args},
+                                   text=True, errors='replace', bufsize=1)
+        try:
+            for line in process.stdout:
+                with print_lock:
+                    print(f"[{hostnick:<{width}}] {line}", end="", flush=True)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        return process.wait()
+
+    def run(hostnick, hostname, sshport):
+        """Returns (exit code or None if unreachable, seconds, error message or None)"""
+        start = time.time()
         try:
-            # Run the script
-            subprocess.run([script_to_run_], shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error running script for host {hostname}: {e}")
+            return stream(hostnick, hostname, sshport), time.time() - start, None
         except Exception as e:
-            print(f"Unexpected error for host {hostname}: {e}")
-
-        print("did host", hostnick)
+            with print_lock:
+                print(f"Unexpected error for host {hostname}: {e}")
+            return None, time.time() - start, str(e) or type(e).__name__
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = [executor.submit(run, *host) for host in hosts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:  # only if run() itself broke down
+                results.append((None, 0.0, str(e) or type(e).__name__))
+
+    print("\nSummary:")
+    for (hostnick, hostname, _), (exit_code, elapsed, error) in zip(hosts, results):
+        if error is not None:
+            status = "error"
+        else:
+            status = "unreachable" if exit_code is None else f"exit {exit_code}"
+        mark = "✓" if exit_code == 0 else "✗"
+        line = f"{mark} {hostnick:<{width}} {status:<12} {elapsed:6.1f}s"
+        print(f"{line}  {error}" if error is not None else line)
+    failed = sum(1 for exit_code, _, _ in results if exit_code != 0)
+    if failed:
+        print(f"{failed}/{len(hosts)} hosts failed")
+    return failed
 
 
 if __name__ == "__main__":
@@ -96,9 +177,15 @@ If --ssh is used, then run an ssh command in each host instead.
 
 Typical use case: run our helper scripts in the remote host: getgpu.bash or for example "tmux kill-server"
 
-If your command includes spaces, use this kind of comma encapsulation:
+If your command includes spaces, pass it as one quoted argument - it is handed to the remote
+shell as is, so do not add an extra layer of quotes:
+
+run_all_hosts.py --ssh 'ls ~/mirror/.git'
 
-run_all_hosts.py --ssh '"ls ~/mirror/.git"'
+With --parallel N the command runs for up to N hosts at a time; every output line is prefixed with
+the host nickname and a per-host exit code / duration summary is printed at the end:
+
+run_all_hosts.py --parallel 10 pushremove.bash
 
 A tip: to stop all docker containers with the string "kokkelis" in their name in all hosts, do this:
                                                                           
@@ -109,5 +196,9 @@ run_all_hosts.py --ssh "docker ps -q --filter name=kokkelis | xargs -r docker ki
     # parser.add_argument('script_to_run', nargs='...', help='The script to run')
     parser.add_argument("--only", action='store', default=None)
     parser.add_argument('--ssh', action='store_true', help='Run the command via SSH')
+    parser.add_argument('--parallel', type=int, default=None, metavar='N',
+                        help='Run for up to N hosts at a time, with host-prefixed output and a summary')
     args = parser.parse_args()
-    run_with_context(args.script_to_run, ssh=args.ssh, only=args.only)
+    failed = run_with_context(args.script_to_run, ssh=args.ssh, only=args.only, parallel=args.parallel)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Shared SSH connection layer for the LOCALHOST fleet tools (go_ssh.py, run_all_hosts.py)
+
+Uses OpenSSH ControlMaster multiplexing: the first command to a host starts a
+background master connection that stays up for CONTROL_PERSIST seconds, and every
+later ssh/scp/rsync that uses the same ControlPath rides on it - no new TCP
+connection, key exchange or authentication. The masters outlive the process, so
+repeated fleet commands (go_ssh.py --test, run_all_hosts.py --ssh ...) reuse the
+sessions of the previous ones.
+
+    import sshpool
+    result = sshpool.run(host, port, username, "df -h /")
+    print(result.returncode, result.stdout)
+
+Close all masters with "go_ssh.py --disconnect".
+"""
+import os
+import subprocess
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+# Master sockets live here; %C is a hash of (local host, remote host, port, user)
+CONTROL_PATH = f"{os.environ['HOME']}/.ssh/cm-%C"
+# How long an idle master connection is kept (seconds)
+CONTROL_PERSIST = 600
+CONNECT_TIMEOUT = 10
+
+# one lock per host, so concurrent threads do not race to start the same master
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def ssh_options(port, control_master: str = "no", batch: bool = True) -> List[str]:
+    """Options for an ssh command that goes through the host's master connection
+
+    Args:
+        batch: Fail instead of prompting for a password (for non-interactive use). Batch
+            connections also accept the key of a host seen for the first time, but still
+            refuse a changed one; interactive sessions keep ssh's host-key prompt
+    """
+    options = [
+        "-p", str(port),
+        "-o", f"ControlPath={CONTROL_PATH}",
+        "-o", f"ControlMaster={control_master}",
+        "-o", f"BatchMode={'yes' if batch else 'no'}",
+        "-o", f"ConnectTimeout={CONNECT_TIMEOUT}",
+    ]
+    if batch:
+        options += ["-o", "StrictHostKeyChecking=accept-new"]
+    return options
+
+
+def ssh_command(host: str, port, username: str, command: Optional[str] = None, batch: bool = True) -> List[str]:
+    """ssh argv that reuses the host's master connection (if there is one)"""
+    argv = ["ssh", *ssh_options(port, batch=batch), f"{username}@{host}"]
+    if command is not None:
+        argv.append(command)
+    return argv
+
+
+def _lock(host: str, port) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(f"{host}:{port}", threading.Lock())
+
+
+def is_connected(host: str, port, username: str) -> bool:
+    """Is there a live master connection to the host"""
+    check = ["ssh", *ssh_options(port), "-O", "check", f"{username}@{host}"]
+    return subprocess.run(check, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+
+def connect(host: str, port, username: str) -> Optional[str]:
+    """Make sure a master connection to the host is up
+
+    Returns:
+        None on success, otherwise ssh's error message
+    """
+    with _lock(host, port):
+        if is_connected(host, port, username):
+            return None
+        # -f -N: authenticate, then go to the background and just hold the connection.
+        # The master gets no pipes of ours, otherwise reading our commands' output
+        # would wait for it to exit; its error messages go to a temporary file.
+        master = [
+            "ssh", *ssh_options(port, control_master="yes"),
+            "-o", f"ControlPersist={CONTROL_PERSIST}",
+            "-f", "-N", f"{username}@{host}"
+        ]
+        with tempfile.TemporaryFile(mode='w+') as stderr:
+            try:
+                result = subprocess.run(master, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                        stderr=stderr, timeout=CONNECT_TIMEOUT + 5)
+            except subprocess.TimeoutExpired:
+                return "Connection timed out"
+            if result.returncode != 0:
+                stderr.seek(0)
+                return stderr.read().strip() or f"ssh exited with {result.returncode}"
+        return None
+
+
+def disconnect(host: str, port, username: str) -> bool:
+    """Stop the master connection to the host; True if there was one"""
+    stop = ["ssh", *ssh_options(port), "-O", "exit", f"{username}@{host}"]
+    return subprocess.run(stop, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+
+def run(host: str, port, username: str, command: str, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """Run a command at the host over its master connection (started if needed)
+
+    Returns:
+        CompletedProcess with text stdout/stderr; returncode 255 means ssh itself
+        failed (connection, authentication) and stderr tells why
+
+    Raises:
+        subprocess.TimeoutExpired: if the command does not finish in timeout seconds
+    """
+    error = connect(host, port, username)
+    if error is not None:
+        return subprocess.CompletedProcess(command, 255, "", error)
+    return subprocess.run(ssh_command(host, port, username, command), stdin=subprocess.DEVNULL,
+                          capture_output=True, text=True, timeout=timeout)
+
+
+def describe_error(stderr: str) -> str:
+    """Short, human-friendly reason for an ssh failure"""
+    if "Could not resolve hostname" in stderr:
+        return "DNS lookup failed"
+    if "Permission denied" in stderr:
+        return "Authentication failed"
+    if "Connection refused" in stderr:
+        return "Port is closed"
+    if "timed out" in stderr:
+        return "Connection failed: timed out"
+    lines = stderr.strip().splitlines()
+    return f"Connection failed: {lines[-1] if lines else 'unknown error'}"
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""Incremental sync of mirror/ and shared/ between LOCALHOST and a REMOTEHOST
+
+Replaces the rsync fan-out of push.bash / pull.bash:
+
+- the trees are walked once, with the include/exclude rules of the old rsync
+  lines (PUSH_RULES / PULL_RULES, rsync semantics: first match wins)
+- a local manifest remembers size, mtime and content hash of every file synced to
+  a target, so only files whose content changed are sent - or that were deleted or
+  modified at the target since (checked against one listing of the target)
+- all changed files go as one tar stream over one (shared, see sshpool.py) ssh
+  connection, and the command waits for it - no background processes
+- files over --max-size are reported instead of silently skipped
+- a per-directory summary is printed at the end
+
+The remote side is the context's $username@$hostname:$sshport, or a local
+directory with --target (handy for trying the rules out):
+
+    sync.py push
+    sync.py pull
+    sync.py push --target /tmp/fake-remote --dry-run
+"""
+import os
+import sys
+import json
+import time
+import fnmatch
+import hashlib
+import shutil
+import tarfile
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import sshpool
+
+MANIFEST_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'container-juggle-sync'
+# rsync --max-size=1M of the old scripts
+DEFAULT_MAX_SIZE = "1M"
+
+_DOTFILES = ("-", "**/.*")
+_NOTEBOOK = [_DOTFILES, ("-", "**/.ipynb_checkpoints/"), ("+", "*.py"), ("+", "*.ipynb"), ("+", "*/"), ("-", "*")]
+_TXT = [("+", "*/"), ("+", "*.txt"), ("+", "*.bash"), ("+", "*.sh"), ("+", "*.csv"), ("+", "*.json"), ("+", "*.md")]
+_ARTEFACTS = [
+    ("+", "*.py"), ("-", "**/torch_compile_debug/"), _DOTFILES, ("-", "**/res_cache/"),
+    ("-", "**/.ipynb_checkpoints/"), ("-", "**/__pycache__"), ("-", "SAVED*/"), ("-", "hwfail/"),
+    ("-", "fail/"), ("-", "rerun/"), ("-", "uncategorized/"), ("-", "success/"),
+    ("+", "*.ipynb"), ("+", "*/"), ("+", "*.png"),
+]
+
+# (directory, filters) as in push.bash: a directory's files follow the rules of the deepest
+# directory listed. Unmatched paths are included, like in rsync.
+PUSH_RULES = [
+    ("mirror", [_DOTFILES]),
+    ("shared", [_DOTFILES]),
+    ("shared/notebook", _NOTEBOOK),
+    ("shared/script", _NOTEBOOK),
+    ("shared/tests", [_DOTFILES, ("-", "SAVED"), ("+", "*.py")] + _TXT + [("-", "*")]),
+    ("shared/bin", [_DOTFILES]),
+    ("shared/secret", []),
+    ("shared/pythonenv", [("-", "**/__pycache__"), _DOTFILES]),
+]
+
+# ... and as in pull.bash
+PULL_RULES = [
+    ("mirror", [("-", "/context/")]),
+    ("shared", [("+", "*.json"), ("-", "*")]),
+    ("shared/notebook", _ARTEFACTS + [("-", "*")]),
+    ("shared/script", _ARTEFACTS + [("-", "*")]),
+    ("shared/tests", _ARTEFACTS + _TXT + [("-", "*")]),
+    ("shared/bin", [_DOTFILES]),
+    ("shared/pythonenv", [("-", "**/__pycache__"), _DOTFILES]),
+]
+
+
+def parse_size(size: str) -> int:
+    """rsync style size ("1M", "500K", "2G" or bytes) in bytes"""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    size = size.strip().upper()
+    if size[-1:] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+def _matches(pattern: str, path: str, is_dir: bool) -> bool:
+    """Does an rsync filter pattern match path (relative to the rule's directory)"""
+    if pattern.endswith("/"):
+        if not is_dir:
+            return False
+        pattern = pattern[:-1]
+    if pattern.startswith("/"):
+        return fnmatch.fnmatchcase(path, pattern[1:])
+    if "/" not in pattern:
+        return fnmatch.fnmatchcase(path.rsplit("/", 1)[-1], pattern)
+    if pattern.startswith("**/") and fnmatch.fnmatchcase(path, pattern[3:]):
+        return True
+    return fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(path, "*/" + pattern)
+
+
+def included(filters, path: str, is_dir: bool) -> bool:
+    """First matching filter decides; unmatched paths are included"""
+    for action, pattern in filters:
+        if _matches(pattern, path, is_dir):
+            return action == "+"
+    return True
+
+
+def path_included(filters, path: str) -> bool:
+    """Is a file included, checking also that none of its parent directories is excluded"""
+    parts = path.split("/")
+    for depth in range(1, len(parts)):
+        if not included(filters, "/".join(parts[:depth]), True):
+            return False
+    return included(filters, path, False)
+
+
+def owner(rules, path: str) -> Optional[str]:
+    """The deepest rule directory path falls under"""
+    best = None
+    for directory, _ in rules:
+        if path.startswith(directory + "/") and (best is None or len(directory) > len(best)):
+            best = directory
+    return best
+
+
+def walk(root: Path, rules) -> Dict[str, Dict[str, os.stat_result]]:
+    """Walk the rule directories under root once
+
+    Returns:
+        rule directory -> {path relative to root: stat} of the included files
+    """
+    filters = dict(rules)
+    found = {directory: {} for directory, _ in rules}
+    for directory, _ in rules:
+        top = root / directory
+        if not top.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(top):
+            rel = Path(dirpath).relative_to(root).as_posix()
+            inner = rel[len(directory) + 1:] if rel != directory else ""
+            kept = []
+            for name in sorted(dirnames):
+                sub = f"{rel}/{name}"
+                # sub-trees with rules of their own are walked with those rules
+                if sub in filters:
+                    continue
+                if included(filters[directory], f"{inner}/{name}".lstrip("/"), True):
+                    kept.append(name)
+            dirnames[:] = kept
+            for name in sorted(filenames):
+                if included(filters[directory], f"{inner}/{name}".lstrip("/"), False):
+                    path = Path(dirpath) / name
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    if path.is_file():
+                        found[directory][f"{rel}/{name}"] = st
+    return found
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LocalTarget:
+    """The "remote" side is a directory on this machine"""
+    def __init__(self, root):
+        self.root = Path(root).expanduser().resolve()
+        self.key = f"dir:{self.root}"
+
+    def list(self, rules) -> Dict[str, Tuple[int, float]]:
+        return {path: (st.st_size, st.st_mtime)
+                for files in walk(self.root, rules).values() for path, st in files.items()}
+
+    def send(self, source: Path, paths: List[str]):
+        for path in paths:
+            destination = self.root / path
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source / path, destination)
+
+    def fetch(self, paths: List[str], destination: Path):
+        for path in paths:
+            (destination / path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(self.root / path, destination / path)
+
+
+class SSHTarget:
+    """The remote side is the home directory at a REMOTEHOST, reached over its sshpool master connection"""
+    def __init__(self, host: str, port, username: str):
+        self.host, self.port, self.username = host, port, username
+        self.key = f"ssh:{username}@{host}:{port}"
+        error = sshpool.connect(host, port, username)
+        if error is not None:
+            raise ConnectionError(f"{host}: {sshpool.describe_error(error)}")
+
+    def _popen(self, command: str, **kwargs) -> subprocess.Popen:
+        return subprocess.Popen(sshpool.ssh_command(self.host, self.port, self.username, command), **kwargs)
+
+    def list(self, rules) -> Dict[str, Tuple[int, float]]:
+        roots = " ".join(directory for directory, _ in rules if "/" not in directory)
+        result = sshpool.run(self.host, self.port, self.username,
+                             f"cd && find {roots} -type f -printf '%p\\t%s\\t%T@\\n' 2>/dev/null; true")
+        if result.returncode != 0:
+            raise ConnectionError(f"{self.host}: {sshpool.describe_error(result.stderr)}")
+        listing = {}
+        for line in result.stdout.splitlines():
+            path, size, mtime = line.rsplit("\t", 2)
+            listing[path] = (int(size), float(mtime))
+        return listing
+
+    def send(self, source: Path, paths: List[str]):
+        process = self._popen("cd && tar -xf -", stdin=subprocess.PIPE)
+        with tarfile.open(fileobj=process.stdin, mode="w|") as tar:
+            for path in paths:
+                tar.add(source / path, arcname=path, recursive=False)
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"{self.host}: remote tar failed with exit code {process.returncode}")
+
+    def fetch(self, paths: List[str], destination: Path):
+        process = self._popen("cd && tar --null -T - -cf -", stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        process.stdin.write(b"".join(path.encode() + b"\0" for path in paths))
+        process.stdin.close()
+        wanted = set(paths)
+        # the 'data' filter is the default from Python 3.14 on, and refuses anything unsafe
+        extract_options = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+        with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+            for member in tar:
+                # only what we asked for - never anything outside the destination
+                if member.isfile() and member.name in wanted:
+                    tar.extract(member, destination, **extract_options)
+        if process.wait() != 0:
+            raise RuntimeError(f"{self.host}: remote tar failed with exit code {process.returncode}")
+
+
+def manifest_path(direction: str, target) -> Path:
+    return MANIFEST_DIR / f"{direction}-{hashlib.sha256(target.key.encode()).hexdigest()[:16]}.json"
+
+
+def load_manifest(path: Path) -> Dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path: Path, manifest: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}")
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _summary(rules) -> Dict[str, Dict]:
+    return {directory: {'files': 0, 'sent': 0, 'bytes': 0, 'too_large': []} for directory, _ in rules}
+
+
+def push(source: Path, target, rules=PUSH_RULES, max_size: int = parse_size(DEFAULT_MAX_SIZE),
+         dry_run: bool = False) -> Dict[str, Dict]:
+    """Send the files whose content changed since the last push to this target
+
+    A file is re-hashed only if its size or mtime differs from the manifest, and
+    sent only if its hash differs too - or if the copy at the target no longer has
+    the size and mtime it had after the last push (deleted or edited there).
+
+    Returns:
+        rule directory -> {'files', 'sent', 'bytes', 'too_large'}
+    """
+    mpath = manifest_path("push", target)
+    # path -> [size, mtime_ns, sha256, size and mtime of the copy at the target]
+    manifest = load_manifest(mpath)
+    listing = target.list(rules)
+    summary = _summary(rules)
+    changed = []
+    for directory, files in walk(source, rules).items():
+        for path, st in files.items():
+            result = summary[directory]
+            result['files'] += 1
+            if st.st_size > max_size:
+                result['too_large'].append(path)
+                continue
+            known = manifest.get(path)
+            intact = known is not None and _target_intact(known, listing.get(path))
+            if intact and known[:2] == [st.st_size, st.st_mtime_ns]:
+                continue
+            digest = file_hash(source / path)
+            if not intact or known[2] != digest:
+                changed.append(path)
+                result['sent'] += 1
+                result['bytes'] += st.st_size
+                # tar and copy2 keep the mtime, so this is what the target will list
+                manifest[path] = [st.st_size, st.st_mtime_ns, digest, st.st_size, st.st_mtime]
+            else:
+                manifest[path] = [st.st_size, st.st_mtime_ns, digest, *known[3:5]]
+    if changed and not dry_run:
+        target.send(source, changed)
+    if not dry_run:
+        save_manifest(mpath, manifest)
+    return summary
+
+
+def _target_intact(known: List, listed: Optional[Tuple[int, float]]) -> bool:
+    """Does the target still list a pushed file with the size and mtime it got from the push"""
+    if listed is None:
+        return False
+    # manifests of older versions lack the target's stamp; the push kept the local one
+    size, mtime = known[3:5] if len(known) >= 5 else (known[0], known[1] / 1e9)
+    return listed[0] == size and abs(listed[1] - mtime) <= 1
+
+
+def pull(destination: Path, target, rules=PULL_RULES, max_size: int = parse_size(DEFAULT_MAX_SIZE),
+         dry_run: bool = False) -> Dict[str, Dict]:
+    """Fetch the files that changed at the target since the last pull
+
+    Like rsync -u, a file that is newer locally is left alone.
+
+    Returns:
+        rule directory -> {'files', 'sent', 'bytes', 'too_large'} ('sent' counts fetched files)
+    """
+    mpath = manifest_path("pull", target)
+    manifest = load_manifest(mpath)
+    summary = _summary(rules)
+    filters = dict(rules)
+    changed = []
+    for path, (size, mtime) in sorted(target.list(rules).items()):
+        directory = owner(rules, path)
+        if directory is None or not path_included(filters[directory], path[len(directory) + 1:]):
+            continue
+        result = summary[directory]
+        result['files'] += 1
+        if size > max_size:
+            result['too_large'].append(path)
+            continue
+        if manifest.get(path) == [size, mtime]:
+            continue
+        local = destination / path
+        if local.exists():
+            st = local.stat()
+            if st.st_mtime > mtime + 1:
+                continue
+            # same size and mtime (e.g. we pushed it) or, for a local directory target, same content
+            if st.st_size == size and (abs(st.st_mtime - mtime) <= 1 or target_hash_matches(target, path, local)):
+                manifest[path] = [size, mtime]
+                continue
+        changed.append(path)
+        result['sent'] += 1
+        result['bytes'] += size
+        manifest[path] = [size, mtime]
+    if changed and not dry_run:
+        target.fetch(changed, destination)
+    if not dry_run:
+        save_manifest(mpath, manifest)
+    return summary
+
+
+def target_hash_matches(target, path: str, local: Path) -> bool:
+    """Same content at both ends (only checked when the target is a local directory)"""
+    if isinstance(target, LocalTarget):
+        return file_hash(target.root / path) == file_hash(local)
+    return False
+
+
+def print_summary(summary: Dict[str, Dict], verb: str, elapsed: float):
+    print(f"{'DIRECTORY':<20} {'FILES':>7} {verb.upper():>7} {'BYTES':>12} {'TOO LARGE':>10}")
+    for directory, result in summary.items():
+        print(f"{directory:<20} {result['files']:>7} {result['sent']:>7} {result['bytes']:>12} "
+              f"{len(result['too_large']):>10}")
+    for directory, result in summary.items():
+        for path in result['too_large']:
+            print(f"WARNING: not {verb} (over --max-size): {path}")
+    total = sum(result['sent'] for result in summary.values())
+    print(f"{total} files {verb} in {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental, content-hash based push/pull of mirror/ and shared/")
+    parser.add_argument("direction", choices=["push", "pull"])
+    parser.add_argument("--target", default=None,
+                        help="Sync with this local directory instead of $username@$hostname:$sshport")
+    parser.add_argument("--root", default=str(Path.home()),
+                        help="Local directory holding mirror/ and shared/ (default: $HOME)")
+    parser.add_argument("--max-size", default=DEFAULT_MAX_SIZE,
+                        help=f"Skip (and report) files larger than this (default: {DEFAULT_MAX_SIZE})")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be synced")
+    parser.add_argument("--json", action="store_true", help="Print the per-directory results as JSON")
+    args = parser.parse_args()
+
+    try:
+        if args.target is not None:
+            target = LocalTarget(args.target)
+        else:
+            missing = [name for name in ("username", "hostname", "sshport") if not os.environ.get(name)]
+            if missing:
+                print(f"Error: {', '.join(missing)} not set - activate a context first (or use --target)")
+                sys.exit(1)
+            target = SSHTarget(os.environ["hostname"], os.environ["sshport"], os.environ["username"])
+        start = time.time()
+        sync = push if args.direction == "push" else pull
+        summary = sync(Path(args.root), target, max_size=parse_size(args.max_size), dry_run=args.dry_run)
+    except (ConnectionError, RuntimeError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, "sent" if args.direction == "push" else "fetched", time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
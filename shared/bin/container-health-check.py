@@ -9,20 +9,37 @@ before you invest time in a problematic container.
 - Validates GPU availability and health 
 - Checks other critical system components
 - All tests use timeouts to prevent script hanging
+- Independent probes run concurrently, so a full check takes about as long
+  as the slowest probe instead of the sum of all of them
+- Verdicts are cached per host, container and GPU driver version for --ttl
+  seconds, so repeated checks (e.g. on every login) return instantly
+- --perf measures disk (shared/, sharedump/), memory and host-to-device
+  bandwidth and flags nodes that are much slower than their own baseline
+- --daemon keeps probing every --interval seconds, tracks probe latency,
+  exports Prometheus-style metrics (or JSON) and alerts on regressions
 
-Usage: ./container_health_check.py [--timeout SECONDS]
+Usage: ./container_health_check.py [--timeout SECONDS] [--tools] [--filesystem] [--serial] [--json]
+                                   [--ttl SECONDS] [--refresh] [--clear-cache] [--perf] [--baseline]
+       ./container_health_check.py --daemon [--interval SECONDS] [--metrics FILE] [--port PORT] [--tools]
 """
 
 import os
+import json
+import hashlib
+import asyncio
+import statistics
+import mmap
+import random
 import shutil
 import sys
 import subprocess
 import time
 import argparse
-import multiprocessing
 import signal
 import tempfile
 import platform
+import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from pathlib import Path
 
@@ -30,21 +47,60 @@ from pathlib import Path
 # Default timeout for command execution (seconds)
 DEFAULT_TIMEOUT = 5
 
+# How long a cached verdict stays valid (seconds)
+DEFAULT_TTL = 600
+
+# Where verdicts are cached
+CACHE_FILE = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'container-health-check.json'
+
+# Per-host performance baselines of the --perf probes
+BASELINE_FILE = CACHE_FILE.with_name('container-health-baselines.json')
+
+# Directories the --perf disk probes measure (when they exist)
+PERF_DIRS = [Path.home() / 'shared', Path.home() / 'sharedump']
+
+# Sizes of the --perf probes
+PERF_FILE_MB = 64
+PERF_RANDOM_READS = 256
+PERF_BLOCK = 4096
+PERF_MEMORY_MB = 256
+
+# A --perf result below this fraction of the host's baseline is flagged as slow
+PERF_TOLERANCE = 0.5
+
+# Daemon mode: seconds between probe rounds and how many latency samples make up a probe's trend
+DAEMON_INTERVAL = 60
+DAEMON_WINDOW = 60
+
+# Daemon mode: a probe has regressed when its latency exceeds ALERT_FACTOR times its median
+# (and the median by more than ALERT_MIN_DELTA seconds), once ALERT_MIN_SAMPLES are in
+ALERT_FACTOR = 3
+ALERT_MIN_DELTA = 0.5
+ALERT_MIN_SAMPLES = 5
+
+# Extra time run_command_safe() may take beyond a probe's timeout (killing and reaping a hung process group)
+PROBE_GRACE = 2
+
 class HealthCheck:
-    def __init__(self, timeout=DEFAULT_TIMEOUT, verbose=True):
+    def __init__(self, timeout=DEFAULT_TIMEOUT, verbose=True, parallel=True):
         self.timeout = timeout
         self.verbose = verbose
+        self.parallel = parallel
         self.results = {}
+        self._print_lock = threading.Lock()
+        self._results_lock = threading.Lock()
         
     def print(self, msg):
         """Print if verbose mode is enabled"""
         if self.verbose:
-            print(msg)
+            with self._print_lock:  # probes report from several threads
+                print(msg)
     
-    def run_command_safe(self, command, name=None, timeout=None):
+    def run_command_safe(self, command, name=None, timeout=None, record=True):
         """
-        Run a command with timeout safety using multiprocessing to fully isolate
-        processes that might hang.
+        Run a command with timeout safety. The command runs in its own session
+        (and so its own process group); if it does not finish in time the whole
+        group is killed - the command and anything it spawned, nothing else.
         """
         if name is None:
             name = command[0] if isinstance(command, list) else command.split()[0]
@@ -54,61 +110,39 @@ class HealthCheck:
             
         self.print(f"Testing command: {name}")
         
-        # Create a queue for returning results from the process
-        queue = multiprocessing.Queue()
-        
-        # Function to be run in a separate process
-        def worker(cmd, q):
+        start_time = time.time()
+        try:
+            process = subprocess.Popen(
+                command,
+                shell=isinstance(command, str),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True
+            )
             try:
-                start_time = time.time()
-                result = subprocess.run(
-                    cmd, 
-                    shell=isinstance(cmd, str),
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout
-                )
-                elapsed = time.time() - start_time
-                q.put({
+                stdout, stderr = process.communicate(timeout=timeout)
+                result = {
                     'status': 'success',
-                    'exit_code': result.returncode,
-                    'stdout': result.stdout,
-                    'stderr': result.stderr,
-                    'elapsed': elapsed
-                })
+                    'exit_code': process.returncode,
+                    'stdout': stdout,
+                    'stderr': stderr,
+                    'elapsed': time.time() - start_time
+                }
             except subprocess.TimeoutExpired:
-                q.put({'status': 'timeout'})
-            except Exception as e:
-                q.put({'status': 'error', 'error': str(e)})
-        
-        # Create and start process
-        process = multiprocessing.Process(target=worker, args=(command, queue))
-        process.daemon = True  # Allow the process to be terminated when main process exits
-        
-        start_time = time.time()
-        process.start()
-        
-        # Wait for the result with additional timeout padding
-        try:
-            result = queue.get(timeout=timeout + 2)
-            process.join(1)  # Brief attempt to clean up
-        except Exception:
-            result = {'status': 'unresponsive'}
-        
-        # Check if the process is still alive, terminate it if needed
-        if process.is_alive():
-            self.print(f"Process for {name} didn't exit cleanly, terminating...")
-            process.terminate()
-            time.sleep(0.5)
-            if process.is_alive():
-                self.print(f"Process for {name} still alive after terminate, killing...")
-                process.kill()
+                result = {'status': 'timeout'}
+                self.print(f"Process for {name} didn't exit in time, killing...")
+                self.kill_process_group(process)
+                try:
+                    process.communicate(timeout=PROBE_GRACE / 2)
+                except subprocess.TimeoutExpired:
+                    # Stuck in the kernel (e.g. in the GPU driver), even SIGKILL does not help
+                    result = {'status': 'unresponsive'}
+        except Exception as e:
+            result = {'status': 'error', 'error': str(e)}
         
         elapsed = time.time() - start_time
         
-        # Check for child processes that might still be running
-        self.cleanup_orphaned_processes(name)
-        
         status = {}
         if result.get('status') == 'success':
             if result['exit_code'] == 0:
@@ -143,20 +177,84 @@ class HealthCheck:
                 'details': f"Error: {result.get('error', 'Unknown error')}"
             }
             
-        self.results[name] = status
+        if record:
+            self.results[name] = status
         return status
 
-    def cleanup_orphaned_processes(self, name):
-        """Attempt to find and kill any orphaned processes by command name"""
+    def kill_process_group(self, process):
+        """Kill the process group a run_command_safe() command leads"""
         try:
-            # This is a basic implementation - could be enhanced for better detection
-            cleanup_cmd = f"pkill -f {name}"
-            subprocess.run(cleanup_cmd, shell=True, timeout=2)
-        except Exception:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
             pass
     
-    def test_rocm(self):
-        """Test ROCm functionality safely"""
+    def run_probes(self, probes, parallel=None):
+        """Run probes concurrently (or one after the other with parallel=False).
+        
+        Each probe is a dict with a 'name' and either a 'command' (run through
+        run_command_safe) or a 'func' returning a result dict, plus an optional
+        'timeout'. Every probe gets its own deadline, all counted from the same start,
+        so the whole batch takes about as long as its slowest probe. A probe that
+        overruns its deadline is reported as 'unresponsive' and left behind; should it
+        finish after all, its result is dropped, so the verdict does not depend on timing.
+        
+        Args:
+            probes: List of probe dicts
+            parallel: Overrides self.parallel (e.g. for benchmarks that must not overlap)
+        
+        Returns:
+            dict: probe name -> result dict (with 'status' and 'details')
+        """
+        if parallel is None:
+            parallel = self.parallel
+        results = {}
+        
+        def run(probe, slot):
+            if 'command' in probe:
+                result = self.run_command_safe(probe['command'], probe['name'], probe.get('timeout'), record=False)
+            else:
+                result = probe['func']()  # func probes print their own outcome
+            with self._results_lock:
+                if slot.get('expired'):
+                    return  # already reported as unresponsive
+                slot['done'] = True
+                results[probe['name']] = self.results[probe['name']] = result
+                if 'command' in probe:
+                    status_symbol = "✅" if result['status'] == 'passed' else "❌"
+                    self.print(f"{status_symbol} {probe['name']}: {result['status']} - {result['details']}")
+        
+        if not parallel:
+            for probe in probes:
+                run(probe, {})
+            return results
+        
+        start = time.time()
+        threads = []
+        for probe in probes:
+            slot = {}
+            # daemon threads: a probe stuck in the kernel (e.g. on a dead mount) cannot block exit
+            thread = threading.Thread(target=run, args=(probe, slot), daemon=True)
+            thread.start()
+            threads.append((probe, thread, slot))
+        for probe, thread, slot in threads:
+            timeout = probe.get('timeout') or self.timeout
+            deadline = start + timeout + (PROBE_GRACE if 'command' in probe else 0)
+            thread.join(max(0, deadline - time.time()))
+            with self._results_lock:
+                if slot.get('done'):
+                    continue
+                slot['expired'] = True
+                result = {
+                    'status': 'unresponsive',
+                    'elapsed': time.time() - start,
+                    'details': f"Probe did not finish within its {timeout}s deadline"
+                }
+                results[probe['name']] = self.results[probe['name']] = result
+                self.print(f"❌ {probe['name']}: unresponsive - {result['details']}")
+        return results
+
+    def rocm_probes(self):
+        """Probes for ROCm tools that are installed"""
         tests = [
             {
                 'name': 'rocminfo',
@@ -170,58 +268,45 @@ class HealthCheck:
             }
         ]
         
-        results = {}
+        probes = []
         for test in tests:
             if self.command_exists(test['command']):
-                self.print(f"\nTesting {test['name']}: {test['description']}")
-                result = self.run_command_safe(test['command'], test['name'])
-                
-                status_symbol = "✅" if result['status'] == 'passed' else "❌"
-                self.print(f"{status_symbol} {test['name']}: {result['status']} - {result['details']}")
-                
-                results[test['name']] = result
+                self.print(f"Testing {test['name']}: {test['description']}")
+                probes.append(test)
             else:
                 self.print(f"⚠️ {test['name']} not found - skipping test")
-                
-        return results
+        return probes
+    
+    def test_rocm(self):
+        """Test ROCm functionality safely"""
+        return self.run_probes(self.rocm_probes())
+    
+    def nvidia_probes(self):
+        """Probes for NVIDIA tools that are installed"""
+        if self.command_exists('nvidia-smi'):
+            return [{'name': 'nvidia-smi', 'command': 'nvidia-smi'}]
+        self.print("NVIDIA tools not found - skipping NVIDIA tests")
+        return []
     
     def test_nvidia(self):
         """Test NVIDIA functionality safely"""
-        if self.command_exists('nvidia-smi'):
-            self.print("\nTesting NVIDIA GPU:")
-            result = self.run_command_safe('nvidia-smi', 'nvidia-smi')
-            
-            status_symbol = "✅" if result['status'] == 'passed' else "❌"
-            self.print(f"{status_symbol} nvidia-smi: {result['status']} - {result['details']}")
-            
-            return {'nvidia-smi': result}
-        else:
-            self.print("NVIDIA tools not found - skipping NVIDIA tests")
-            return {}
+        return self.run_probes(self.nvidia_probes())
     
-    def test_critical_tools(self):
-        """Test other critical tools that might hang"""
+    def critical_tool_probes(self):
+        """Version checks of other critical tools that might hang"""
         tools = [
             'docker',
             'python',
             'gcc',
             'apt-get'
         ]
-        
-        results = {}
+        # Most tools just need a simple version check
+        return [{'name': tool, 'command': f"{tool} --version"} for tool in tools if self.command_exists(tool)]
+    
+    def test_critical_tools(self):
+        """Test other critical tools that might hang"""
         self.print("\nTesting critical system tools:")
-        for tool in tools:
-            if self.command_exists(tool):
-                # Most tools just need a simple version check
-                cmd = f"{tool} --version"
-                result = self.run_command_safe(cmd, tool)
-                
-                status_symbol = "✅" if result['status'] == 'passed' else "❌"
-                self.print(f"{status_symbol} {tool}: {result['status']} - {result['details']}")
-                
-                results[tool] = result
-        
-        return results
+        return self.run_probes(self.critical_tool_probes())
     
     def test_file_system(self):
         """Test filesystem access and performance"""
@@ -263,14 +348,168 @@ class HealthCheck:
         
         return results
     
+    def measure_disk(self, directory):
+        """Sequential write/read and random read throughput of a directory
+        
+        Writes are fsync'ed and reads use O_DIRECT where the filesystem supports it
+        (otherwise the file is dropped from the page cache first), so the numbers are
+        the storage's, not the page cache's.
+        
+        Returns:
+            dict: 'write_mbs', 'read_mbs' and 'random_iops'
+        """
+        size = PERF_FILE_MB * 1024 * 1024
+        chunk = 1024 * 1024
+        # O_DIRECT needs block-aligned buffers: anonymous mmaps are page-aligned
+        buffer = mmap.mmap(-1, chunk)
+        buffer.write(os.urandom(chunk))
+        path = Path(directory) / f".health-perf-{os.getpid()}"
+        try:
+            start = time.time()
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                for _ in range(size // chunk):
+                    os.write(fd, buffer)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            write_mbs = PERF_FILE_MB / (time.time() - start)
+            
+            try:
+                fd = os.open(path, os.O_RDONLY | getattr(os, 'O_DIRECT', 0))
+            except OSError:  # e.g. tmpfs and sshfs refuse O_DIRECT
+                fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                start = time.time()
+                while os.readv(fd, [buffer]) > 0:
+                    pass
+                read_mbs = PERF_FILE_MB / (time.time() - start)
+                
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                offsets = [random.randrange(size // PERF_BLOCK) * PERF_BLOCK for _ in range(PERF_RANDOM_READS)]
+                with memoryview(buffer) as view, view[:PERF_BLOCK] as block:
+                    start = time.time()
+                    for offset in offsets:
+                        os.preadv(fd, [block], offset)
+                random_iops = PERF_RANDOM_READS / (time.time() - start)
+            finally:
+                os.close(fd)
+        finally:
+            path.unlink(missing_ok=True)
+            buffer.close()
+        return {'write_mbs': write_mbs, 'read_mbs': read_mbs, 'random_iops': random_iops}
+    
+    def measure_memory(self):
+        """Memory copy bandwidth in GB/s (bytes read + written, best of 3)"""
+        size = PERF_MEMORY_MB * 1024 * 1024
+        try:
+            import numpy as np
+            src = np.ones(size, dtype=np.uint8)
+            dst = np.empty_like(src)
+            copy = lambda: np.copyto(dst, src)
+        except ImportError:
+            src = bytearray(b"x" * size)
+            dst = bytearray(size)
+            def copy():
+                dst[:] = src
+        best = float('inf')
+        for _ in range(3):
+            start = time.time()
+            copy()
+            best = min(best, time.time() - start)
+        return {'memory_gbs': 2 * size / best / 1e9}
+    
+    def measure_h2d(self):
+        """Pinned host-to-device copy bandwidth in GB/s (best of 3), None without a usable GPU"""
+        try:
+            import torch
+        except ImportError:
+            return None
+        if not torch.cuda.is_available():
+            return None
+        size = PERF_MEMORY_MB * 1024 * 1024
+        src = torch.empty(size, dtype=torch.uint8).pin_memory()
+        dst = torch.empty(size, dtype=torch.uint8, device='cuda')
+        dst.copy_(src)  # warm up the context and the DMA engines
+        torch.cuda.synchronize()
+        best = float('inf')
+        for _ in range(3):
+            start = time.time()
+            dst.copy_(src, non_blocking=True)
+            torch.cuda.synchronize()
+            best = min(best, time.time() - start)
+        return {'h2d_gbs': size / best / 1e9}
+    
+    def perf_probe(self, name, measure, unit, baselines, record):
+        """Probe that runs a measurement and compares it with the host's baseline
+        
+        Returns:
+            dict: the probe result, with 'status' 'slow' for metrics below
+            PERF_TOLERANCE of their baseline
+        """
+        try:
+            metrics = measure()
+        except Exception as e:
+            result = {'status': 'failed', 'details': f"Error: {str(e)}"}
+            self.print(f"❌ {name}: failed - {result['details']}")
+            return result
+        if metrics is None:
+            result = {'status': 'passed', 'details': "skipped - no usable GPU"}
+            self.print(f"⚠️ {name}: {result['details']}")
+            return result
+        slow = []
+        details = []
+        for metric, value in metrics.items():
+            key = f"{name}:{metric}"
+            baseline = baselines.get(key)
+            if record or baseline is None:
+                baselines[key] = value
+                details.append(f"{metric}={value:.1f} {unit[metric]} (new baseline)")
+            else:
+                details.append(f"{metric}={value:.1f} {unit[metric]} ({value / baseline:.0%} of baseline)")
+                if value < PERF_TOLERANCE * baseline:
+                    slow.append(metric)
+        result = {
+            'status': 'slow' if slow else 'passed',
+            'details': ", ".join(details),
+            'metrics': metrics
+        }
+        status_symbol = "❌" if slow else "✅"
+        self.print(f"{status_symbol} {name}: {result['status']} - {result['details']}")
+        return result
+    
+    def perf_probes(self, baselines, record=False):
+        """Benchmark probes for disk (PERF_DIRS), memory and, with a GPU, host-to-device copies
+        
+        Args:
+            baselines: This host's baselines, metric -> value; updated in place with
+                first measurements (or with all of them if record is True)
+            record: Make this run's measurements the new baselines
+        """
+        disk_units = {'write_mbs': 'MB/s', 'read_mbs': 'MB/s', 'random_iops': 'IOPS'}
+        probes = []
+        for directory in PERF_DIRS:
+            if directory.is_dir():
+                probes.append({
+                    'name': f"disk:{directory.name}",
+                    'func': lambda d=directory: self.perf_probe(f"disk:{d.name}", lambda: self.measure_disk(d),
+                                                                disk_units, baselines, record)
+                })
+        probes.append({
+            'name': 'memory',
+            'func': lambda: self.perf_probe('memory', self.measure_memory, {'memory_gbs': 'GB/s'}, baselines, record)
+        })
+        if self.detect_gpu_type() != "Unknown":
+            probes.append({
+                'name': 'h2d',
+                'func': lambda: self.perf_probe('h2d', self.measure_h2d, {'h2d_gbs': 'GB/s'}, baselines, record)
+            })
+        return probes
+    
     def command_exists(self, command):
         """Check if a command exists and is executable"""
-        return subprocess.run(
-            f"command -v {command}",
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        ).returncode == 0
+        return shutil.which(command) is not None
     
     def detect_gpu_type(self):
         """Detect GPU type using both filesystem and command existence checks"""
@@ -301,8 +540,15 @@ class HealthCheck:
             
         return "Unknown"
     
-    def run_all_tests(self):
-        """Run all health check tests"""
+    def run_all_tests(self, tools=False, filesystem=False, perf=False, record_baseline=False):
+        """Run all health check tests, independent probes concurrently
+        
+        Args:
+            tools: Also version-check critical tools (docker, python, gcc, apt-get)
+            filesystem: Also run the filesystem test
+            perf: Also run the performance probes (one at a time, after the others)
+            record_baseline: Store this run's performance results as the host's baselines
+        """
         self.print(f"=== Container System Health Check ===")
         self.print(f"System: {platform.system()} {platform.release()}")
         self.print(f"Hostname: {platform.node()}")
@@ -311,15 +557,29 @@ class HealthCheck:
         gpu_type = self.detect_gpu_type()
         self.print(f"Detected GPU type: {gpu_type}")
         
-        # Run appropriate GPU tests
+        # Collect the probes for the GPU type and the optional checks, then run them all at once
+        probes = []
         if gpu_type == "AMD":
-            self.test_rocm()
+            probes += self.rocm_probes()
         elif gpu_type == "NVIDIA":
-            self.test_nvidia()
-            
-        # Run other tests
-        #self.test_critical_tools()
-        #self.test_file_system()
+            probes += self.nvidia_probes()
+        if tools:
+            probes += self.critical_tool_probes()
+        if filesystem:
+            probes.append({'name': 'filesystem', 'func': lambda: self.test_file_system()['filesystem']})
+        
+        self.print("")
+        start = time.time()
+        self.run_probes(probes)
+        self.print(f"{len(probes)} probes finished in {time.time() - start:.2f}s")
+        
+        if perf:
+            self.print("\nPerformance probes:")
+            baselines = load_baselines()
+            host_baselines = baselines.setdefault(host_id(), {})
+            # benchmarks would disturb each other (and the probes above), so one at a time
+            self.run_probes(self.perf_probes(host_baselines, record_baseline), parallel=False)
+            store_baselines(baselines)
         
         # Print summary
         self.print("\n=== Summary ===")
@@ -348,6 +608,8 @@ class HealthCheck:
                 self.print(f"alias {cmd}='echo \"WARNING: {cmd} is known to hang in this container\"'")
         
         return {
+            'hostname': platform.node(),
+            'gpu_type': gpu_type,
             'passed': passed,
             'failed': failed,
             'total': len(self.results),
@@ -356,16 +618,350 @@ class HealthCheck:
         }
 
 
+class HealthDaemon:
+    """Runs the command probes periodically on an asyncio event loop
+    
+    Each round runs all probes concurrently as subprocesses in their own process
+    groups, so the daemon itself only wakes up to start and reap them. After every
+    round the metrics are written to `metrics_file` (Prometheus text format, or JSON
+    if the name ends in .json) and served on `port` if one is given.
+    """
+    def __init__(self, checker, probes, interval=DAEMON_INTERVAL, metrics_file=None, port=None):
+        self.checker = checker
+        self.probes = probes
+        self.interval = interval
+        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self.port = port
+        self.state = {
+            probe['name']: {
+                'latencies': deque(maxlen=DAEMON_WINDOW),
+                'status': None,
+                'latency': None,
+                'median': None,
+                'regressed': False,
+                'runs': 0,
+                'failures': 0
+            }
+            for probe in probes
+        }
+        self.last_round = None
+    
+    async def run_probe(self, probe):
+        """Run one probe command; returns (status, elapsed)"""
+        timeout = probe.get('timeout') or self.checker.timeout
+        command = probe['command']
+        start = time.time()
+        try:
+            if isinstance(command, str):
+                process = await asyncio.create_subprocess_shell(
+                    command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+                    start_new_session=True)
+            else:
+                process = await asyncio.create_subprocess_exec(
+                    *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+                    start_new_session=True)
+        except Exception:
+            return 'error', time.time() - start
+        try:
+            exit_code = await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.checker.kill_process_group(process)
+            try:
+                await asyncio.wait_for(process.wait(), PROBE_GRACE)
+            except asyncio.TimeoutError:
+                return 'unresponsive', time.time() - start
+            return 'timeout', time.time() - start
+        return ('passed' if exit_code == 0 else 'failed'), time.time() - start
+    
+    def record(self, name, status, elapsed):
+        """Update a probe's trend and raise/clear its alert"""
+        state = self.state[name]
+        history = state['latencies']
+        median = statistics.median(history) if history else None
+        regressed = status != 'passed'
+        if not regressed and median is not None and len(history) >= ALERT_MIN_SAMPLES:
+            regressed = elapsed > ALERT_FACTOR * median and elapsed - median > ALERT_MIN_DELTA
+        if regressed and not state['regressed']:
+            median_text = f"{median:.2f}s" if median is not None else "n/a"
+            self.alert(f"ALERT {name}: {'slow' if status == 'passed' else status}, latency {elapsed:.2f}s (median {median_text})")
+        elif state['regressed'] and not regressed:
+            self.alert(f"RECOVERED {name}: latency {elapsed:.2f}s")
+        # only healthy runs shape the trend, so a wedged or slowed-down GPU cannot become the new normal
+        if not regressed:
+            history.append(elapsed)
+        state.update({
+            'status': status,
+            'latency': elapsed,
+            'median': statistics.median(history) if history else None,
+            'regressed': regressed,
+            'runs': state['runs'] + 1,
+            'failures': state['failures'] + (status != 'passed')
+        })
+    
+    def alert(self, msg):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {msg}", file=sys.stderr, flush=True)
+    
+    def render_json(self):
+        return json.dumps({
+            'hostname': platform.node(),
+            'last_round': self.last_round,
+            'probes': {
+                name: {k: v for k, v in state.items() if k != 'latencies'}
+                for name, state in self.state.items()
+            }
+        })
+    
+    def render_prometheus(self):
+        metrics = [
+            ('health_probe_up', 'gauge', "1 if the probe's last run passed", lambda s: int(s['status'] == 'passed')),
+            ('health_probe_latency_seconds', 'gauge', "Latency of the probe's last run", lambda s: s['latency']),
+            ('health_probe_latency_median_seconds', 'gauge', "Median latency of the recent healthy runs", lambda s: s['median']),
+            ('health_probe_regressed', 'gauge', "1 while the probe is failing or slower than its trend", lambda s: int(s['regressed'])),
+            ('health_probe_runs_total', 'counter', "Probe runs", lambda s: s['runs']),
+            ('health_probe_failures_total', 'counter', "Probe runs that did not pass", lambda s: s['failures']),
+        ]
+        lines = []
+        for metric, kind, help_text, value in metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, state in self.state.items():
+                if state['runs'] and value(state) is not None:
+                    lines.append(f'{metric}{{probe="{name}"}} {value(state)}')
+        if self.last_round is not None:
+            lines.append("# TYPE health_last_round_timestamp_seconds gauge")
+            lines.append(f"health_last_round_timestamp_seconds {self.last_round}")
+        return "\n".join(lines) + "\n"
+    
+    async def serve(self, reader, writer):
+        """Minimal HTTP endpoint: /metrics is Prometheus text, anything else JSON"""
+        try:
+            request = await reader.readline()
+            path = request.split()[1].decode() if len(request.split()) > 1 else "/"
+            if path.endswith('.json') or path == '/':
+                body, content_type = self.render_json(), "application/json"
+            else:
+                body, content_type = self.render_prometheus(), "text/plain; version=0.0.4"
+            body = body.encode()
+            writer.write(f"HTTP/1.0 200 OK\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+    
+    async def round(self):
+        results = await asyncio.gather(*(self.run_probe(probe) for probe in self.probes))
+        for probe, (status, elapsed) in zip(self.probes, results):
+            self.record(probe['name'], status, elapsed)
+        self.last_round = time.time()
+        if self.metrics_file is not None:
+            text = self.render_json() if self.metrics_file.suffix == '.json' else self.render_prometheus()
+            write_file(self.metrics_file, text)
+    
+    async def main(self):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        server = None
+        if self.port is not None:
+            server = await asyncio.start_server(self.serve, port=self.port)
+        self.alert(f"health daemon: {len(self.probes)} probes every {self.interval}s"
+                   + (f", metrics in {self.metrics_file}" if self.metrics_file else "")
+                   + (f", served on port {self.port}" if self.port is not None else ""))
+        while not stop.is_set():
+            start = time.time()
+            await self.round()
+            try:
+                await asyncio.wait_for(stop.wait(), max(0, self.interval - (time.time() - start)))
+            except asyncio.TimeoutError:
+                pass
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+
+def driver_version():
+    """GPU driver version (amdgpu or nvidia kernel module), or the kernel release if unknown"""
+    for path in ['/sys/module/amdgpu/version', '/proc/driver/nvidia/version', '/sys/module/amdgpu/srcversion']:
+        try:
+            version = Path(path).read_text().strip().splitlines()[0]
+        except (OSError, IndexError):
+            continue
+        if version:
+            return version
+    return platform.release()
+
+
+def host_id():
+    """Identifies the host across reboots, also from within its containers
+
+    Inside docker the hostname is the container id and /etc/machine-id belongs to the
+    image, so the hardware decides: the unique ids of the GPUs, else the board's
+    product UUID. Hosts without either fall back to machine-id and hostname.
+    """
+    ids = []
+    for path in sorted(Path('/sys/class/drm').glob('card*/device/unique_id')):
+        try:
+            ids.append(path.read_text().strip())
+        except OSError:
+            pass
+    if not any(ids):
+        ids = []
+        for path in ['/sys/class/dmi/id/product_uuid', '/etc/machine-id']:
+            if path == '/etc/machine-id' and Path('/.dockerenv').exists():
+                continue
+            try:
+                value = Path(path).read_text().strip()
+            except OSError:
+                continue
+            if value:
+                ids.append(value)
+                break
+        ids.append(platform.node())
+    return hashlib.sha256("\n".join(ids).encode()).hexdigest()[:16]
+
+
+def boot_id():
+    """Changes with every reboot of the host (the kernel is shared with the containers)"""
+    try:
+        return Path('/proc/sys/kernel/random/boot_id').read_text().strip()
+    except OSError:
+        return '-'
+
+
+def cache_key(options):
+    """Key of a verdict: host and boot, container, GPU driver version and the options the check ran with
+
+    A verdict from before a reboot is never reused.
+    """
+    container = platform.node() if Path('/.dockerenv').exists() else '-'
+    return f"{host_id()}/{boot_id()}/{container}/{driver_version()}/{options}"
+
+
+def load_cache():
+    """All cached verdicts (an empty dict if there is no usable cache file)"""
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_results(key, ttl):
+    """Results of the cached verdict for key, if it is younger than ttl seconds"""
+    entry = load_cache().get(key)
+    if entry is None or time.time() - entry['time'] > ttl:
+        return None
+    return entry
+
+
+def write_file(path, text):
+    """Write text to path atomically (write + rename), ignoring errors"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}")
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def write_json(path, data):
+    write_file(path, json.dumps(data))
+
+
+def load_baselines():
+    """Performance baselines of all hosts, host_id() -> {metric: value}"""
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def store_baselines(baselines):
+    write_json(BASELINE_FILE, baselines)
+
+
+def store_results(key, results, ttl):
+    """Cache a verdict, dropping entries that have expired"""
+    now = time.time()
+    cache = {k: v for k, v in load_cache().items() if now - v['time'] <= ttl}
+    cache[key] = {'time': now, 'results': results}
+    # write + rename, so concurrent logins never see a half-written cache
+    write_json(CACHE_FILE, cache)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Container System Health Check")
     parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT,
                       help=f'Command timeout in seconds (default: {DEFAULT_TIMEOUT})')
     parser.add_argument('--quiet', action='store_true',
                       help='Reduce output verbosity')
+    parser.add_argument('--tools', action='store_true',
+                      help='Also check critical tools (docker, python, gcc, apt-get)')
+    parser.add_argument('--filesystem', action='store_true',
+                      help='Also run the filesystem test')
+    parser.add_argument('--serial', action='store_true',
+                      help='Run probes one after the other instead of concurrently')
+    parser.add_argument('--json', action='store_true',
+                      help='Print the results as a single JSON document (implies --quiet)')
+    parser.add_argument('--ttl', type=int, default=DEFAULT_TTL,
+                      help=f'Reuse a cached verdict younger than this many seconds, 0 disables the cache (default: {DEFAULT_TTL})')
+    parser.add_argument('--refresh', action='store_true',
+                      help='Ignore the cached verdict and re-run the probes')
+    parser.add_argument('--clear-cache', action='store_true',
+                      help=f'Remove all cached verdicts ({CACHE_FILE}) and exit')
+    parser.add_argument('--perf', action='store_true',
+                      help='Also run the disk, memory and host-to-device bandwidth probes against this host\'s baselines')
+    parser.add_argument('--baseline', action='store_true',
+                      help='Record this run\'s --perf results as the host\'s baselines')
+    parser.add_argument('--daemon', action='store_true',
+                      help='Keep running the GPU (and --tools) probes every --interval seconds')
+    parser.add_argument('--interval', type=int, default=DAEMON_INTERVAL,
+                      help=f'Seconds between --daemon probe rounds (default: {DAEMON_INTERVAL})')
+    parser.add_argument('--metrics', default=None,
+                      help='File --daemon writes its metrics to: Prometheus text, or JSON if it ends in .json')
+    parser.add_argument('--port', type=int, default=None,
+                      help='Port --daemon serves its metrics on (/metrics: Prometheus text, /: JSON)')
     args = parser.parse_args()
     
-    checker = HealthCheck(timeout=args.timeout, verbose=not args.quiet)
-    results = checker.run_all_tests()
+    if args.daemon:
+        checker = HealthCheck(timeout=args.timeout, verbose=False)
+        gpu_type = checker.detect_gpu_type()
+        probes = checker.rocm_probes() if gpu_type == "AMD" else checker.nvidia_probes() if gpu_type == "NVIDIA" else []
+        if args.tools:
+            probes += checker.critical_tool_probes()
+        if not probes:
+            print("No probes to run - nothing for the daemon to do")
+            sys.exit(1)
+        daemon = HealthDaemon(checker, probes, interval=args.interval, metrics_file=args.metrics, port=args.port)
+        asyncio.run(daemon.main())
+        sys.exit(0)
+    
+    if args.clear_cache:
+        CACHE_FILE.unlink(missing_ok=True)
+        sys.exit(0)
+    
+    key = cache_key(f"timeout={args.timeout},tools={args.tools},filesystem={args.filesystem},perf={args.perf}")
+    entry = None if (args.refresh or args.baseline or args.ttl <= 0) else cached_results(key, args.ttl)
+    if entry is not None:
+        results = entry['results']
+        if not (args.quiet or args.json):
+            print(f"=== Container System Health Check (cached {time.time() - entry['time']:.0f}s ago, --refresh to re-run) ===")
+            print(f"Tests passed: {results['passed']}/{results['total']}")
+            for name, result in results['results'].items():
+                if result['status'] != 'passed':
+                    print(f"❌ {name}: {result['status']} - {result['details']}")
+    else:
+        checker = HealthCheck(timeout=args.timeout, verbose=not (args.quiet or args.json), parallel=not args.serial)
+        results = checker.run_all_tests(tools=args.tools, filesystem=args.filesystem,
+                                        perf=args.perf or args.baseline, record_baseline=args.baseline)
+        if args.ttl > 0:
+            store_results(key, results, args.ttl)
+    if args.json:
+        print(json.dumps(results))
     
     # Return non-zero exit code if any tests failed
     sys.exit(1 if results['failed'] > 0 else 0)
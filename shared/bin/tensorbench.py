@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for tensorhelp.py
+
+Usage:
+    tensorbench.py codecs [--size-mb 64] [--dtypes bfloat16 float32] [--codecs zstd lz4]
+    tensorbench.py suite [--sizes-mb 1 16 64] [--dtypes float32 bfloat16] [--json out.json]
+    tensorbench.py diff baseline.json new.json [--threshold 0.1]
+    tensorbench.py startup [--repeat 5] [--json out.json]
+
+codecs: compression ratio vs. write/read throughput of the TensorComp
+compressed dump formats, for a few typical tensor flavours (random
+activations, boolean masks, sparse index tensors).  Use it to pick the
+codec for dumps that travel over push.bash / pull.bash.
+
+suite: CPU-runnable sweep over tensor sizes and dtypes of
+TensorComp.save/load (atomic vs direct, native vs numpy), compare_np vs
+compare_torch vs compare_report and format_args_for_repro.  Reports
+throughput (GB/s), latency percentiles and peak RSS, optionally as JSON
+together with the sha256 of the tensorhelp.py that was measured.
+
+diff: compare two suite JSON files case by case, to catch regressions
+between versions of tensorhelp.py.
+
+startup: wall time of fresh interpreters importing tensorhelp, running
+tensorcmp.py --help and comparing two small .npy directories, next to a
+bare `import torch`, and whether each of them ended up importing torch.
+"""
+import io
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import argparse
+import contextlib
+import resource
+import platform
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import torch
+import tensorhelp
+from tensorhelp import (TensorComp, available_codecs, compare_np, compare_torch, compare_report,
+                        format_args_for_repro)
+
+
+def make_tensor(kind: str, numel: int, dtype: torch.dtype) -> torch.Tensor:
+    """Create a test tensor of a given flavour."""
+    gen = torch.Generator().manual_seed(0)
+    if kind == 'randn':
+        return torch.randn(numel, generator=gen).to(dtype)
+    if kind == 'mask':
+        # block-structured mask, like attention masks
+        return (torch.arange(numel) // 4096 % 3 == 0).to(dtype)
+    if kind == 'sparse':
+        # mostly zeros with a few small indices, like kv_idx / block tables
+        t = torch.zeros(numel, dtype=torch.int64)
+        nnz = max(1, numel // 64)
+        t[torch.randint(0, numel, (nnz,), generator=gen)] = torch.randint(0, 1024, (nnz,), generator=gen)
+        return t.to(dtype)
+    raise ValueError(f"unknown tensor kind {kind}")
+
+
+def bench_codec(tensor: torch.Tensor, codec, shuffle: bool, repeat: int) -> dict:
+    """Time save + load of one tensor, return ratio and throughputs (GB/s)."""
+    raw_bytes = tensor.numel() * tensor.element_size()
+    writes, reads = [], []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tc = TensorComp(tmpdir, native=True, use_rank_subdir=False,
+                        compress=codec, shuffle=shuffle)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tc.save(tensor, index=0)
+            writes.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            loaded = tc.load(index=0)
+            reads.append(time.perf_counter() - start)
+        # only the dump itself, not manifest.json and its journal/lock files
+        file_bytes = sum(p.stat().st_size for p in Path(tmpdir).glob('cp-*'))
+    assert torch.equal(loaded, tensor)
+    return {
+        'ratio': raw_bytes / file_bytes,
+        'write_gbps': raw_bytes / min(writes) / 1e9,
+        'read_gbps': raw_bytes / min(reads) / 1e9,
+    }
+
+
+def run_codecs(args):
+    numel_bytes = int(args.size_mb * (1 << 20))
+    print(f"{'kind':<8} {'dtype':<9} {'codec':<6} {'shuffle':<7} {'ratio':>7} {'write GB/s':>11} {'read GB/s':>10}")
+    print("-" * 64)
+    for kind in args.kinds:
+        for dtype_name in args.dtypes:
+            dtype = getattr(torch, dtype_name)
+            if kind == 'randn' and not dtype.is_floating_point:
+                continue
+            numel = numel_bytes // torch.empty((), dtype=dtype).element_size()
+            tensor = make_tensor(kind, numel, dtype)
+            configs = [(None, False)]
+            configs += [(codec, shuffle) for codec in args.codecs for shuffle in (False, True)]
+            for codec, shuffle in configs:
+                res = bench_codec(tensor, codec, shuffle, args.repeat)
+                print(f"{kind:<8} {dtype_name:<9} {codec or 'none':<6} {str(shuffle):<7} "
+                      f"{res['ratio']:>7.2f} {res['write_gbps']:>11.3f} {res['read_gbps']:>10.3f}")
+
+
+def percentiles(samples: list) -> dict:
+    """Latency percentiles in milliseconds."""
+    ms = np.sort(np.array(samples)) * 1e3
+    return {'min_ms': float(ms[0]), 'p50_ms': float(np.percentile(ms, 50)),
+            'p90_ms': float(np.percentile(ms, 90)), 'p99_ms': float(np.percentile(ms, 99))}
+
+
+def reset_peak_rss() -> None:
+    """Reset the kernel's peak RSS (VmHWM) of this process; best effort, Linux only."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS since the last reset_peak_rss() (or process start) in MiB."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(fn, repeat: int, warmup: int = 1):
+    """Run fn warmup + repeat times; return (per-call seconds, peak RSS in MiB, last result)."""
+    for _ in range(warmup):
+        fn()
+    reset_peak_rss()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return times, peak_rss_mb(), out
+
+
+def record(results: list, case: str, dtype_name: str, nbytes: int, times: list, peak: float, **params):
+    row = {'case': case, 'dtype': dtype_name, 'bytes': nbytes, **params,
+           'gbps': nbytes / float(np.median(times)) / 1e9, 'peak_rss_mb': peak, **percentiles(times)}
+    results.append(row)
+    extra = " ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{case:<16} {dtype_name:<9} {nbytes / (1 << 20):>8.1f} {extra:<24} {row['gbps']:>8.3f} "
+          f"{row['p50_ms']:>9.2f} {row['p90_ms']:>9.2f} {row['p99_ms']:>9.2f} {peak:>9.0f}")
+
+
+def suite_meta(args) -> dict:
+    source = Path(tensorhelp.__file__).read_bytes()
+    return {
+        'tensorhelp_sha256': hashlib.sha256(source).hexdigest(),
+        'torch': torch.__version__,
+        'numpy': np.__version__,
+        'python': platform.python_version(),
+        'host': socket.gethostname(),
+        'cpu_count': os.cpu_count(),
+        'threads': torch.get_num_threads(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'argv': sys.argv[1:],
+    }
+
+
+def run_suite(args):
+    torch.manual_seed(0)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    results = []
+    print(f"{'case':<16} {'dtype':<9} {'MiB':>8} {'params':<24} {'GB/s':>8} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'peak MiB':>9}")
+    print("-" * 112)
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        for size_mb in args.sizes_mb:
+            for dtype_name in args.dtypes:
+                dtype = getattr(torch, dtype_name)
+                numel = int(size_mb * (1 << 20)) // torch.empty((), dtype=dtype).element_size()
+                tensor = make_tensor('randn' if dtype.is_floating_point else 'sparse', numel, dtype)
+                other = tensor + 1 if dtype.is_floating_point else tensor.clone()
+                nbytes = tensor.numel() * tensor.element_size()
+                numpy_ok = dtype != torch.bfloat16  # numpy has no bfloat16
+                
+                for native in (True, False):
+                    if not native and not numpy_ok:
+                        continue
+                    for atomic in (True, False):
+                        tc = TensorComp(Path(tmpdir) / f"{native}-{atomic}", native=native,
+                                        use_rank_subdir=False)
+                        params = dict(native=native, atomic=atomic)
+                        times, peak, _ = measure(lambda: tc.save(tensor, index=0, atomic=atomic), args.repeat)
+                        record(results, 'save', dtype_name, nbytes, times, peak, **params)
+                        times, peak, _ = measure(lambda: tc.load(index=0), args.repeat)
+                        record(results, 'load', dtype_name, nbytes, times, peak, **params)
+                
+                if numpy_ok:
+                    arr1, arr2 = tensor.numpy(), other.numpy()
+                    times, peak, _ = measure(lambda: compare_np(arr1, arr2), args.repeat)
+                    record(results, 'compare_np', dtype_name, 2 * nbytes, times, peak)
+                if dtype.is_floating_point:  # compare_torch needs float means/stds
+                    times, peak, _ = measure(lambda: compare_torch(tensor, other), args.repeat)
+                    record(results, 'compare_torch', dtype_name, 2 * nbytes, times, peak)
+                times, peak, _ = measure(lambda: compare_report(tensor, other), args.repeat)
+                record(results, 'compare_report', dtype_name, 2 * nbytes, times, peak)
+                
+                repro_args = (tensor, other, 128, 0.5)
+                times, peak, _ = measure(lambda: format_args_for_repro(repro_args), args.repeat)
+                record(results, 'format_repro', dtype_name, 2 * nbytes, times, peak, dump=False)
+                dump_path = str(Path(tmpdir) / "repro")
+                def dump_repro():
+                    with contextlib.redirect_stdout(io.StringIO()):  # silence the "Saved ..." hints
+                        return format_args_for_repro(repro_args, dump_tensors=True, dump_path=dump_path)
+                times, peak, _ = measure(dump_repro, args.repeat)
+                record(results, 'format_repro', dtype_name, 2 * nbytes, times, peak, dump=True)
+    
+    if args.json:
+        Path(args.json).write_text(json.dumps({'meta': suite_meta(args), 'results': results}, indent=1))
+        print(f"\nResults written to {args.json}")
+
+
+def case_key(row: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in row.items()
+                        if k not in ('gbps', 'peak_rss_mb') and not k.endswith('_ms')))
+
+
+def run_diff(args):
+    old = json.loads(Path(args.baseline).read_text())
+    new = json.loads(Path(args.new).read_text())
+    if old['meta']['tensorhelp_sha256'] == new['meta']['tensorhelp_sha256']:
+        print("Note: both runs measured the same tensorhelp.py")
+    baseline = {case_key(row): row for row in old['results']}
+    regressions = 0
+    print(f"{'case':<16} {'dtype':<9} {'MiB':>8} {'params':<24} {'old GB/s':>9} {'new GB/s':>9} {'ratio':>7} "
+          f"{'old p50':>9} {'new p50':>9}")
+    print("-" * 110)
+    for row in new['results']:
+        base = baseline.get(case_key(row))
+        if base is None:
+            continue
+        ratio = row['gbps'] / base['gbps']
+        params = " ".join(f"{k}={v}" for k, v in row.items()
+                          if k not in ('case', 'dtype', 'bytes', 'gbps', 'peak_rss_mb') and not k.endswith('_ms'))
+        flag = ""
+        if ratio < 1 - args.threshold:
+            flag = "  ⚠️  slower"
+            regressions += 1
+        print(f"{row['case']:<16} {row['dtype']:<9} {row['bytes'] / (1 << 20):>8.1f} {params:<24} "
+              f"{base['gbps']:>9.3f} {row['gbps']:>9.3f} {ratio:>7.2f} {base['p50_ms']:>9.2f} "
+              f"{row['p50_ms']:>9.2f}{flag}")
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+# Runs a script or statement in a fresh interpreter and reports on stderr whether torch got imported
+_STARTUP_PROBE = ("import sys, atexit, runpy; "
+                  "atexit.register(lambda: sys.stderr.write('TORCH_IMPORTED=%d\\n' % ('torch' in sys.modules))); ")
+
+
+def startup_cases(tmpdir: Path) -> dict:
+    """name -> python -c code of the startup benchmark."""
+    bin_dir = Path(__file__).resolve().parent
+    tensorcmp = str(bin_dir / "tensorcmp.py")
+    for name, offset in (("a", 0.0), ("b", 1e-3)):
+        run = tmpdir / name
+        run.mkdir()
+        for i in range(4):
+            np.save(run / f"cp-{i}.npy", np.linspace(0, 1, 1 << 16, dtype=np.float32) + offset)
+    script = lambda *argv: f"sys.argv = {[tensorcmp, *argv]!r}; runpy.run_path({tensorcmp!r}, run_name='__main__')"
+    return {
+        'python': "pass",
+        'import numpy': "import numpy",
+        'import torch': "import torch",
+        'import tensorhelp': "import tensorhelp",
+        'tensorcmp --help': script('--help'),
+        'tensorcmp npy dirs': script(str(tmpdir / "a"), str(tmpdir / "b"), '--json'),
+    }
+
+
+def run_startup(args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(Path(tensorhelp.__file__).parent),
+                                                      env.get('PYTHONPATH')]))
+    env.pop('RANK', None)  # keep tensorcmp.py away from rank_N/ subdirectories
+    results = []
+    print(f"{'case':<20} {'min s':>8} {'median s':>9} {'torch':>6}")
+    print("-" * 46)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for case, code in startup_cases(Path(tmpdir)).items():
+            times, imported = [], None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                proc = subprocess.run([sys.executable, "-c", _STARTUP_PROBE + code], env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                times.append(time.perf_counter() - start)
+                imported = "TORCH_IMPORTED=1" in proc.stderr
+            row = {'case': case, 'min_s': min(times), 'median_s': float(np.median(times)),
+                   'torch_imported': imported}
+            results.append(row)
+            print(f"{case:<20} {row['min_s']:>8.3f} {row['median_s']:>9.3f} {'yes' if imported else 'no':>6}")
+    
+    if args.json:
+        Path(args.json).write_text(json.dumps({'meta': suite_meta(args), 'results': results}, indent=1))
+        print(f"\nResults written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for tensorhelp.py')
+    sub = parser.add_subparsers(dest='suite', required=True)
+
+    p = sub.add_parser('codecs', help='compression ratio vs. throughput of compressed dumps')
+    p.add_argument('--size-mb', type=float, default=64, help='Tensor size in MiB (default: 64)')
+    p.add_argument('--dtypes', nargs='+', default=['bfloat16', 'float16', 'float32', 'int32'])
+    p.add_argument('--kinds', nargs='+', default=['randn', 'mask', 'sparse'])
+    p.add_argument('--codecs', nargs='+', default=available_codecs())
+    p.add_argument('--repeat', type=int, default=3, help='Repetitions, best time is reported')
+    p.set_defaults(func=run_codecs)
+
+    p = sub.add_parser('suite', help='save/load, comparison and repro formatting throughput')
+    p.add_argument('--sizes-mb', nargs='+', type=float, default=[1, 16, 64], help='Tensor sizes in MiB')
+    p.add_argument('--dtypes', nargs='+', default=['float32', 'bfloat16', 'float16', 'int32'])
+    p.add_argument('--repeat', type=int, default=10, help='Timed repetitions per case (after one warm-up)')
+    p.add_argument('--threads', type=int, default=None, help='torch.set_num_threads() for reproducible numbers')
+    p.add_argument('--tmpdir', default=None, help='Directory for the dump files (default: system temp)')
+    p.add_argument('--json', default=None, metavar='PATH', help='Write results and environment as JSON')
+    p.set_defaults(func=run_suite)
+
+    p = sub.add_parser('diff', help='compare two suite --json result files')
+    p.add_argument('baseline', help='JSON of the reference run')
+    p.add_argument('new', help='JSON of the run to check')
+    p.add_argument('--threshold', type=float, default=0.1,
+                   help='Flag cases whose GB/s dropped by more than this fraction (default: 0.1)')
+    p.set_defaults(func=run_diff)
+
+    p = sub.add_parser('startup', help='interpreter startup cost of tensorhelp / tensorcmp.py')
+    p.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per case')
+    p.add_argument('--json', default=None, metavar='PATH', help='Write results and environment as JSON')
+    p.set_defaults(func=run_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
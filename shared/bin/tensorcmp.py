@@ -3,6 +3,7 @@ import sys
 import argparse
 from typing import Dict
 import json
+import time
 from pathlib import Path
 from tensorhelp import TensorComp
 
@@ -18,27 +19,183 @@ def format_comparison(comparison_results: Dict) -> str:
         shape = metrics.pop('shape')
         output.append(f"Shape: {shape}")
         
+        # Error histogram of compare_report() as one line per bucket
+        hist, edges = metrics.pop('hist', None), metrics.pop('hist_edges', None)
+        
         # Format all numerical metrics with consistent precision
         for metric_name, value in sorted(metrics.items()):
-            output.append(f"{metric_name}: {value:.6e}")
+            if isinstance(value, float):
+                output.append(f"{metric_name}: {value:.6e}")
+            else:
+                output.append(f"{metric_name}: {value}")
+        
+        if hist is not None:
+            labels = ["== 0"] + [f"<= {e:.0e}" for e in edges[1:]] + [f"> {edges[-1]:.0e}"]
+            output.append("|diff| histogram:")
+            for label, count in zip(labels, hist):
+                if count:
+                    output.append(f"  {label:>9}: {count}")
     
     return "\n".join(output)
 
+def format_summary(summary: Dict, only_nonfinite=False) -> str:
+    """Format a summary.json index as a table, one line per stored tensor."""
+    output = [f"{'entry':<24} {'shape':<20} {'dtype':<9} {'min':>11} {'max':>11} {'mean':>11} {'nan':>8} {'inf':>8}"]
+    fmt = lambda v: "-" if v is None else f"{v:.4g}"
+    for key, s in sorted(summary.items()):
+        if only_nonfinite and not (s.get('nan') or s.get('inf')):
+            continue
+        name = f"{key} ({s['name']})" if 'name' in s else key
+        output.append(f"{name:<24} {str(tuple(s['shape'])):<20} {s['dtype']:<9} {fmt(s.get('min')):>11} "
+                      f"{fmt(s.get('max')):>11} {fmt(s.get('mean')):>11} {s.get('nan', '-'):>8} {s.get('inf', '-'):>8}")
+    return "\n".join(output)
+
+def format_manifest(manifest: Dict) -> str:
+    """Format a manifest.json listing, one line per stored file."""
+    output = [f"{'file':<32} {'size':>14} {'mtime':>20}"]
+    for name, entry in sorted(manifest.items()):
+        mtime = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['mtime']))
+        output.append(f"{name:<32} {entry['size']:>14} {mtime:>20}")
+    return "\n".join(output)
+
 def main():
     parser = argparse.ArgumentParser(description='Compare PyTorch tensors stored in two directories.')
     parser.add_argument('dir1', type=str, help='First directory containing tensors')
-    parser.add_argument('dir2', type=str, help='Second directory containing tensors')
+    parser.add_argument('dir2', type=str, nargs='?', default=None,
+                       help='Second directory containing tensors (not needed with --list)')
     parser.add_argument('--json', action='store_true', help='Output in JSON format')
     parser.add_argument('--threshold', type=float, default=None,
                        help='Threshold for max_diff to consider tensors different')
+    parser.add_argument('--sample', type=int, default=None, metavar='N',
+                       help='Compare only N elements per tensor (fast approximate mode)')
+    parser.add_argument('--sample-mode', choices=['strided', 'random'], default='strided',
+                       help='How sampled elements are picked (default: strided)')
+    parser.add_argument('--escalate', type=float, default=None, metavar='MAX_DIFF',
+                       help='With --sample: redo a full comparison when the sampled max_diff exceeds this')
+    parser.add_argument('--list', action='store_true',
+                       help='List the tensors of the directories from their summary.json index (no loading)')
+    parser.add_argument('--nonfinite', action='store_true', help='With --list: only show tensors with NaN/Inf')
+    parser.add_argument('--prescreen', action='store_true',
+                       help='Classify tensors as identical/different from the summary.json indexes alone')
+    parser.add_argument('--first-divergence', action='store_true',
+                       help='Only report the first index (cp-0, cp-1, ...) that differs beyond --atol/--rtol')
+    parser.add_argument('--reindex', action='store_true',
+                        help='Rebuild manifest.json of both directories from a directory listing first '
+                             '(dumps from older versions or copied in by rsync)')
+    parser.add_argument('--named', choices=['dict', 'args'], default=None,
+                        help='Compare the save_dict (tensor_dict.pt) or save_args (args.pt) dumps entry by entry')
+    parser.add_argument('--match', choices=['position', 'name'], default='position',
+                        help='With --named args: pair args by position or by saved name')
+    parser.add_argument('--series', default=None, metavar='NAME',
+                        help='Compare the step series NAME (TensorComp.series) step by step: first '
+                             'divergent step and growth rate of the divergence')
+    parser.add_argument('--report', action='store_true',
+                        help='allclose-style report: mismatches against --atol/--rtol, relative and ULP '
+                             'errors, |diff| histogram (dtype-aware, chunked)')
+    parser.add_argument('--atol', type=float, default=1e-5, help='Absolute tolerance for --first-divergence / --report')
+    parser.add_argument('--rtol', type=float, default=1.3e-6, help='Relative tolerance for --first-divergence / --report')
     
     args = parser.parse_args()
+    if args.dir2 is None and not args.list:
+        parser.error("dir2 is required unless --list is given")
 
     try:
         tc1 = TensorComp(args.dir1)
-        tc2 = TensorComp(args.dir2)
+        tc2 = TensorComp(args.dir2) if args.dir2 else None
+        if args.reindex:
+            for tc in filter(None, [tc1, tc2]):
+                tc.rebuild_manifest()
         
-        comparison_results = tc1 == tc2
+        if args.list:
+            for tc in filter(None, [tc1, tc2]):
+                summary = tc.load_summary()
+                print(f"\n{tc.directory}:")
+                if summary:
+                    print(format_summary(summary, args.nonfinite))
+                elif tc.manifest() is not None and not args.nonfinite:
+                    print(format_manifest(tc.manifest()))
+                else:
+                    print("  no summary.json (save with TensorComp(..., summary=True))")
+            return
+        
+        if args.prescreen:
+            verdicts = tc1.prescreen(tc2)
+            if args.json:
+                print(json.dumps(verdicts, indent=2))
+            else:
+                for key, verdict in sorted(verdicts.items()):
+                    extra = {k: v for k, v in verdict.items() if k != 'status'}
+                    print(f"{key:<24} {verdict['status']:<15} {extra if extra else ''}")
+            return
+        
+        if args.named:
+            diff = tc1.compare_named(tc2, what=args.named, match=args.match, atol=args.atol, rtol=args.rtol)
+            if args.json:
+                print(json.dumps({k: {str(key): v for key, v in val.items()} if isinstance(val, dict) else val
+                                  for k, val in diff.items()}, indent=2, default=str))
+                return
+            for label in ('missing', 'extra', 'identical'):
+                if diff[label]:
+                    print(f"{label}: {diff[label]}")
+            if diff['duplicate_names']:
+                print(f"⚠️  Names saved more than once (paired by position): {diff['duplicate_names']}")
+            for key, (shape1, shape2) in diff['shape_mismatch'].items():
+                print(f"shape mismatch {key}: {shape1} vs {shape2}")
+            for key, (val1, val2) in diff['value_mismatch'].items():
+                print(f"value mismatch {key}: {val1!r} vs {val2!r}")
+            failing = [key for key, m in diff['compared'].items() if m['mismatches']]
+            if failing:
+                print(f"⚠️  Out of tolerance (atol={args.atol}, rtol={args.rtol}): {failing}")
+            print(format_comparison(diff['compared']))
+            return
+        
+        if args.series:
+            res = tc1.series(args.series).compare_series(tc2.series(args.series), atol=args.atol, rtol=args.rtol)
+            if args.json:
+                print(json.dumps(res, indent=2))
+                return
+            print(f"{len(res['steps'])} common steps, {len(res['missing'])} only in {args.dir1}, "
+                  f"{len(res['extra'])} only in {args.dir2}")
+            if res['first_divergence'] is None:
+                print(f"✓ No divergence beyond atol={args.atol}, rtol={args.rtol}")
+                return
+            print(f"⚠️  First divergence at step {res['first_divergence']}")
+            if res['growth_per_step'] is not None:
+                print(f"max_diff growth: {res['growth_per_step']:+.4g} decades/step"
+                      + (f", doubles every {res['doubling_steps']:.4g} steps" if res['doubling_steps'] else ""))
+            start = res['steps'].index(res['first_divergence'])
+            for step, max_diff, mismatches in list(zip(res['steps'], res['max_diff'], res['mismatches']))[start:start + 20]:
+                print(f"  step {step:>8}: max_diff={max_diff:.6e} mismatches={mismatches}")
+            return
+        
+        if args.first_divergence:
+            found = tc1.first_divergence(tc2, atol=args.atol, rtol=args.rtol)
+            if found is None:
+                print(f"✓ No divergence beyond atol={args.atol}, rtol={args.rtol}")
+            elif args.json:
+                index, metrics = found
+                print(json.dumps({str(index): {k: list(v) if isinstance(v, tuple) else v
+                                               for k, v in metrics.items()}}, indent=2))
+            else:
+                index, metrics = found
+                print(f"⚠️  First divergence at index {index}")
+                if 'other_shape' in metrics:
+                    print(f"Shape mismatch: {metrics['shape']} vs {metrics['other_shape']}")
+                else:
+                    print(format_comparison({index: metrics}))
+            return
+        
+        comparison_results = tc1.compare(tc2, sample=args.sample, sample_mode=args.sample_mode,
+                                         escalate_threshold=args.escalate,
+                                         report=args.report, atol=args.atol, rtol=args.rtol)
+        
+        if args.report and not args.json:
+            failing = sorted(i for i, m in comparison_results.items() if m['mismatches'])
+            if failing:
+                print(f"⚠️  {len(failing)} tensors out of tolerance (atol={args.atol}, rtol={args.rtol}): {failing}")
+            else:
+                print(f"✓ All tensors within atol={args.atol}, rtol={args.rtol}")
+            print()
         
         if args.threshold is not None:
             any_different = False
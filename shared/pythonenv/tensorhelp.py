@@ -33,6 +33,16 @@ USAGE EXAMPLES:
     args = tc.load_args(device='cuda:4')
     kernel[grid](*args)
 
+    # Huge args: one file per entry, read only (and in parallel) what is asked for
+    tc = TensorComp('./kernel_args', native=True, sharded=True)
+    tc.save_args(Q, K, V, LSE, names=['Q', 'K', 'V', 'LSE'])  # args.d/0.pt ... + args.d/index.json
+    q, = tc.load_args(device='cuda:4', indices=[0])
+    qk = tc.load_dict(keys=['q', 'k'])  # same for save_dict (tensor_dict.d/)
+
+    # CUDA targets are streamed: memory-mapped reads, pinned staging and H2D copies overlap
+    args = tc.load_args(device='cuda:4', streams=4)  # falls back to CPU without CUDA
+    gpu_tensors = to_device_pipelined(cpu_tensors, 'cuda:4')
+
 3b. Multi-process/distributed training (auto-detects rank):
     # Saves to ./checkpoints/rank_0/, ./checkpoints/rank_1/, etc.
     tc = TensorComp('./checkpoints', native=True, use_rank_subdir=True)
@@ -42,6 +52,16 @@ USAGE EXAMPLES:
     tc = TensorComp('./checkpoints', native=True, rank=int(os.environ['LOCAL_RANK']))
     tc.save(my_tensor, index=0, atomic=True)  # atomic=True for safety
 
+3c. Many ranks per node on a shared filesystem: capture via /dev/shm instead
+    # Local rank 0 drains every rank's ring to ./checkpoints/rank_N/ (same layout as above)
+    if int(os.environ['LOCAL_RANK']) == 0:
+        aggregator = ShmAggregator('./checkpoints').start()
+    tc = TensorComp('./checkpoints', native=True, capture='shm')
+    tc.save(my_tensor, index=0)  # returns once the data is in shared memory
+    tc.flush()                   # wait until it is on disk
+    ...
+    aggregator.stop()            # local rank 0, after the other ranks are done
+
 4. Compare tensors between two runs:
     tc1 = TensorComp('./run1', native=True)
     tc2 = TensorComp('./run2', native=True)
@@ -56,12 +76,42 @@ USAGE EXAMPLES:
     check_nan(my_tensor)  # Print NaN locations
     quick_nan_context(my_tensor, context=3)  # Show surrounding values
 
+    # Same analysis as a dict, computed on-device (fine for 10^8 NaNs)
+    report = nonfinite_report(my_tensor, what='nonfinite')  # or 'nan', 'inf'
+    print(report['count'], report['first'], report['runs'], report['per_dim'][0]['top'])
+
 6. Tensor statistics and comparisons:
-    from tensorhelp import tensor_stat, compare_torch
+    from tensorhelp import tensor_stat, compare_torch, compare_report
     
     tensor_stat(my_tensor)  # Print shape, dtype, min, max, mean, var
+    st = fused_stats(my_tensor)  # Same numbers as a dict, one fused pass and one host sync
     diff = compare_torch(tensor1, tensor2)  # Get detailed comparison metrics
 
+    # Huge tensors: compare 1M strided elements, redo in full only if they differ
+    diff = compare_torch(tensor1, tensor2, sample=1_000_000, escalate_threshold=1e-3)
+    results = tc1.compare(tc2, sample=1_000_000, escalate_threshold=1e-3)
+
+    # Ordered dumps cp-0 ... cp-N: find the first kernel whose output diverges.
+    # Dumps saved with TensorComp(..., summary=True) skip identical tensors without loading them
+    found = tc1.first_divergence(tc2, atol=1e-5, rtol=1e-3)
+    if found:
+        index, metrics = found
+
+    # save_dict / save_args dumps, matched by name (dict) or position / name (args)
+    diff = tc1.compare_named(tc2, what='dict')  # or what='args', match='name'
+    print(diff['missing'], diff['extra'], diff['shape_mismatch'], list(diff['compared']))
+
+    # allclose-style report, upcast chunk by chunk (bf16/fp16 safe, ints do not wrap)
+    rep = compare_report(tensor1, tensor2, atol=1e-2, rtol=1e-2)
+    print(rep['mismatches'], rep['first_mismatch'], rep['max_rel_diff'], rep['max_ulp'], rep['hist'])
+    results = tc1.compare(tc2, report=True, atol=1e-2, rtol=1e-2)
+
+    # The summary.json sidecar (summary=True) answers questions without loading tensors
+    tc = TensorComp('./run1', native=True, summary=True)
+    tc.save(my_tensor, index=0)  # also save_dict / save_args
+    nans = [key for key, s in tc.load_summary().items() if s['nan'] > 0]
+    verdicts = tc1.prescreen(tc2)  # {'cp-0': {'status': 'identical'}, ...}
+
 7. Format kernel args for reproduction (useful for Triton debugging):
     from tensorhelp import format_args_for_repro
     
@@ -79,17 +129,96 @@ USAGE EXAMPLES:
     print(format_args_for_repro(args, dump_tensors=True, dump_path='/tmp/my_repro'))
     # [TensorComp] Rank 0: Saved 17 args to /tmp/my_repro/rank_0/
     # [TensorComp] To load: tc = TensorComp('/tmp/my_repro/rank_0', native=True); args = tc.load_args(device='cuda:0')
+
+8. Compressed dumps (smaller files to push/pull around):
+    # Writes cp-0.pt.tcz, tensor_dict.pt.tcz, args.pt.tcz instead of the plain files
+    tc = TensorComp('./checkpoints', native=True, compress='zstd')  # or 'lz4', 'zlib'
+    tc.save(my_tensor, index=0)
+
+    # Loading is transparent, with or without the compress argument
+    t = TensorComp('./checkpoints', native=True).load(index=0)
+
+    # Pick a codec: tensorbench.py codecs --size-mb 64
+
+9. Manifest (no globbing/stat per index, e.g. on the sshfs mount):
+    # Every save appends a line to manifest.journal, folded into manifest.json now and then:
+    # {file name: {'size', 'mtime'}}
+    tc = TensorComp('./run1', native=True)
+    tc.indices()            # [0, 1, ...] straight from the manifest
+    tc.manifest()           # cached after the first read; tc.manifest(refresh=True) re-reads
+
+    # Dumps from older versions or copied in by rsync: list the directory once
+    tc.rebuild_manifest()   # or: tensorcmp.py ./run1 ./run2 --reindex
+
+10. Tracking a tensor over many training steps (one log instead of a file per step):
+    tc = TensorComp('./run1', native=True)
+    with tc.series('grad_norm') as series:   # ./run1/rank_N/grad_norm.series/
+        for step in range(num_steps):
+            ...
+            series.append(step, grad)        # appended to a segment file, no fsync
+    g = tc.series('grad_norm').read(1234)    # random access through the offset index
+
+    # Where do two runs start to diverge, and how fast does it grow?
+    res = TensorComp('./run1').series('grad_norm').compare_series(TensorComp('./run2').series('grad_norm'))
+    print(res['first_divergence'], res['growth_per_step'], res['doubling_steps'])
+
+NOTE: torch is imported lazily, on first use. The numpy-only paths (compare_np,
+load_and_compare_tensor, comparing non-native TensorComp directories, listing
+summaries/manifests) never import it, so e.g. `tensorcmp.py --help` starts fast.
+Measure with: tensorbench.py startup
 """
+from __future__ import annotations
 
 import os, sys, inspect
+import io
+import collections
+import math
+import json
+import re
+import hashlib
+import mmap
+import time
+import atexit
+import multiprocessing
+import struct
+import zlib
 import numpy as np
-import torch
 from pathlib import Path
-from typing import Dict, Union, Optional
+from typing import Dict, Union, Optional, Tuple
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 import fcntl  # For file locking on Unix systems
 
+
+class _LazyTorch:
+    """Stand-in for the torch module until it is first used (importing torch takes seconds)."""
+
+    def __getattr__(self, name):
+        import torch as real
+        globals()['torch'] = real  # later lookups hit the real module directly
+        return getattr(real, name)
+
+
+torch = _LazyTorch()
+
+
+def _is_tensor(x) -> bool:
+    """isinstance(x, torch.Tensor) without importing torch (no tensors exist before it is imported)."""
+    real = sys.modules.get('torch')
+    return real is not None and isinstance(x, real.Tensor)
+
+
+# Optional codecs for compressed dumps (zlib from the stdlib is always available)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4frame
+except ImportError:
+    lz4frame = None
+
 def format_args_for_repro(args, pretty=True, dump_tensors=False, dump_path="/tmp/triton_repro_tensors"):
     """Format args into copy-pasteable torch.randn()/torch.randint() calls.
     
@@ -147,33 +276,21 @@ def format_args_for_repro(args, pretty=True, dump_tensors=False, dump_path="/tmp
             dtype = str(arg.dtype).replace("torch.", "")
             device = str(arg.device)
             
-            # Gather tensor statistics for debugging
+            # Gather tensor statistics for debugging (one fused pass, one host sync)
             stats = ""
             try:
-                has_nan = arg.isnan().any().item() if arg.dtype.is_floating_point else False
-                has_inf = arg.isinf().any().item() if arg.dtype.is_floating_point else False
-                is_all_zeros = (arg == 0).all().item()
-                
-                if arg.numel() > 0:
-                    if arg.dtype.is_floating_point:
-                        min_val = arg[~arg.isnan()].min().item() if not arg.isnan().all() else float('nan')
-                        max_val = arg[~arg.isnan()].max().item() if not arg.isnan().all() else float('nan')
-                    else:
-                        min_val = arg.min().item()
-                        max_val = arg.max().item()
-                else:
-                    min_val = max_val = 0
+                st = fused_stats(arg, moments=False)  # only min/max and the flags are printed
                 
                 # Build warning string
                 warnings = []
-                if has_nan:
+                if st['has_nan']:
                     warnings.append("HAS_NaN!")
-                if has_inf:
+                if st['has_inf']:
                     warnings.append("HAS_Inf!")
-                if is_all_zeros:
+                if st['all_zeros']:
                     warnings.append("ALL_ZEROS!")
                 
-                stats = f"  # min={min_val}, max={max_val}"
+                stats = f"  # min={st['min']}, max={st['max']}"
                 if warnings:
                     stats += f" ⚠️ {', '.join(warnings)}"
             except Exception as e:
@@ -199,36 +316,143 @@ def format_args_for_repro(args, pretty=True, dump_tensors=False, dump_path="/tmp
         return ", ".join(formatted)
 
 
-def check_nan(tensor):
-    indx=torch.nonzero(torch.isnan(tensor)) # each row is an index
-    nn=len(indx) # number of nans
+_MASK_CHUNK = 1 << 24  # elements per chunk when scanning NaN/Inf masks
+
+
+def _nonfinite_mask(tensor: torch.Tensor, what: str) -> torch.Tensor:
+    if what == 'nan':
+        return torch.isnan(tensor)
+    if what == 'inf':
+        return torch.isinf(tensor)
+    if what == 'nonfinite':
+        return ~torch.isfinite(tensor)
+    raise ValueError(f"Unknown what='{what}', expected 'nan', 'inf' or 'nonfinite'")
+
+
+def _unravel(flat_index: int, shape) -> tuple:
+    pos = []
+    for size in reversed(shape):
+        flat_index, rem = divmod(flat_index, size)
+        pos.append(rem)
+    return tuple(reversed(pos))
+
+
+def _first_positions(flat_mask: torch.Tensor, k: int) -> list:
+    """Flat positions of the first k True elements, scanning chunk by chunk (no full nonzero())."""
+    found = []
+    for start in range(0, flat_mask.numel(), _MASK_CHUNK):
+        chunk = flat_mask[start:start + _MASK_CHUNK]
+        cum = torch.cumsum(chunk, 0, dtype=torch.int32)
+        wanted = torch.arange(1, k - len(found) + 1, device=chunk.device, dtype=torch.int32)
+        hits = torch.searchsorted(cum, wanted)
+        found += [start + p for p in hits.tolist() if p < chunk.numel()]
+        if len(found) == k:
+            break
+    return found
+
+
+def nonfinite_report(tensor: torch.Tensor, what='nan', topk=5) -> dict:
+    """Locate NaN/Inf values without materializing an index row per element.
+    
+    Everything is computed on the tensor's device from the boolean mask: counts per
+    slice of every dimension, the first/last position (argmax on the flattened mask)
+    and contiguous runs in memory order (scanned in chunks with cummax), with a
+    single host sync at the end.
+    
+    Args:
+        tensor (torch.Tensor): Tensor to analyze
+        what (str): 'nan', 'inf' or 'nonfinite' (either of them)
+        topk (int): Number of most affected slices reported per dimension
+    
+    Returns:
+        dict: 'count', 'numel', 'fraction', 'first' and 'last' (multi-indices, None if
+        count is 0), 'runs' (number of contiguous runs), 'longest_run', and 'per_dim':
+        per dimension the number of slices hit and the topk (slice index, count) pairs
+    """
+    mask = _nonfinite_mask(tensor.detach(), what)
+    flat = mask.reshape(-1)
+    numel = flat.numel()
+    report = {'count': 0, 'numel': numel, 'fraction': 0.0, 'first': None, 'last': None,
+              'runs': 0, 'longest_run': 0, 'per_dim': []}
+    if numel == 0:
+        return report
+    
+    u8 = flat.view(torch.uint8)
+    count = flat.sum()
+    first = torch.argmax(u8)
+    last = numel - 1 - torch.argmax(u8.flip(0))
+    
+    # contiguous runs in memory order: the run ending at i has length i minus the
+    # last off-position before it (0 where the mask is off), so runs start where that
+    # length is 1; a run touching the chunk start continues the previous chunk's run
+    runs = torch.zeros((), dtype=torch.int64, device=flat.device)
+    longest = torch.zeros((), dtype=torch.int64, device=flat.device)
+    carry = torch.zeros((), dtype=torch.int64, device=flat.device)
+    prev = torch.zeros((), dtype=torch.bool, device=flat.device)
+    idx = torch.arange(min(numel, _MASK_CHUNK), device=flat.device, dtype=torch.int32)
+    for start in range(0, numel, _MASK_CHUNK):
+        chunk = flat[start:start + _MASK_CHUNK]
+        n = chunk.numel()
+        last_off = torch.cummax(torch.where(chunk, -1, idx[:n]), 0).values
+        run_len = idx[:n] - last_off
+        lead = (last_off < 0).sum()
+        runs += (run_len == 1).sum() - (prev & chunk[0]).to(torch.int64)
+        longest = torch.maximum(longest, torch.maximum(run_len.max(), lead + carry))
+        carry = run_len[-1] + carry * (last_off[-1] < 0)
+        prev = chunk[-1]
+    
+    # per-slice counts (a 1-D tensor has no slices beyond first/last/runs)
+    per_dim = []
+    for dim in range(mask.dim() if mask.dim() > 1 else 0):
+        others = [d for d in range(mask.dim()) if d != dim]
+        slice_counts = mask.view(torch.uint8).sum(dim=others, dtype=torch.int64)
+        k = min(topk, slice_counts.numel())
+        top = torch.topk(slice_counts, k)
+        per_dim.append(((slice_counts > 0).sum(), top.indices, top.values))
+    
+    # single host sync for the scalars
+    count, first, last, runs, longest = torch.stack([count, first, last, runs, longest]).tolist()
+    report.update({'count': count, 'fraction': count / numel, 'runs': runs, 'longest_run': longest})
+    if count:
+        report['first'] = _unravel(first, mask.shape)
+        report['last'] = _unravel(last, mask.shape)
+        report['per_dim'] = [
+            {'dim': dim, 'slices_hit': int(hit),
+             'top': [(i, c) for i, c in zip(indices.tolist(), values.tolist()) if c > 0]}
+            for dim, (hit, indices, values) in enumerate(per_dim)
+        ]
+    return report
+
+
+def check_nan(tensor, what='nan'):
+    """Print where the NaNs (or what='inf'/'nonfinite') of a tensor are (see nonfinite_report)."""
+    report = nonfinite_report(tensor, what)
+    nn = report['count']
     if (nn>0):
-        print("\nnans found:", nn, "/", tensor.numel(), "=", nn/tensor.numel())
-        for i in range(0, min(2, len(indx))):
-            ind = indx[i]
-            print(ind, "-->", tensor[tuple(ind)])
-            if i>3: # show first 3 values
-                break
-        if len(indx) > 10:
+        print(f"\n{what}s found:", nn, "/", report['numel'], "=", report['fraction'])
+        print(report['first'], "-->", tensor[report['first']])
+        if nn > 1:
             print("...")
-            for i in range(len(indx)-2, len(indx)):
-                ind = indx[i]
-                print(ind, "-->", tensor[tuple(ind)])
+            print(report['last'], "-->", tensor[report['last']])
+        print(f"contiguous runs: {report['runs']}, longest run: {report['longest_run']}")
+        for d in report['per_dim']:
+            top = ", ".join(f"[{i}]={c}" for i, c in d['top'])
+            print(f"dim {d['dim']}: {d['slices_hit']}/{tensor.shape[d['dim']]} slices hit, most: {top}")
 
 def quick_nan_context(tensor, context=2):
     """Quick function to show NaN context"""
-    nan_indices = torch.nonzero(torch.isnan(tensor))
-    nn=len(nan_indices)
+    flat_mask = torch.isnan(tensor.detach()).reshape(-1)
+    nn = int(flat_mask.sum())
     if (nn>0):
         print("nans found:", nn, "/", tensor.numel(), "=", nn/tensor.numel())
 
-    for i, idx in enumerate(nan_indices[:3]):  # Show first 3 NaNs
-        print(f"NaN {i+1} at {idx.tolist()}:")
+    for i, flat_pos in enumerate(_first_positions(flat_mask, min(3, nn))):  # Show first 3 NaNs
+        idx = _unravel(flat_pos, tensor.shape)
+        print(f"NaN {i+1} at {list(idx)}:")
         
         # Create context slices
         slices = []
-        for dim_idx, pos_tensor in enumerate(idx):
-            pos = pos_tensor.item()  # Convert tensor to int
+        for dim_idx, pos in enumerate(idx):
             dim_size = tensor.shape[dim_idx]
             start = max(0, pos - context)
             end = min(dim_size, pos + context + 1)
@@ -269,20 +493,88 @@ def save_tensor(tensor, filename):
     np.save(filename, np_array)
 
 
+def fused_stats(tensor: torch.Tensor, moments=True) -> dict:
+    """Cheap statistics for debug printing: one aminmax + one var_mean pass, one host sync.
+    
+    NaN/Inf/all-zero flags are read off min and max (NaN propagates through aminmax,
+    +-Inf can only show up as the min or max), so there are no separate isnan()/isinf()/
+    == 0 passes and no boolean-mask copies. Only tensors that do contain NaNs take a
+    second pass to get NaN-free min/max.
+    
+    Args:
+        tensor (torch.Tensor): Tensor to describe
+        moments (bool): Also compute mean and var; without them a real tensor costs a
+            single aminmax pass (e.g. for the autotune hook, which prints just min/max)
+    
+    Returns:
+        dict: 'numel', 'min'/'max' (ignoring NaN, nan if everything is NaN; 0 for empty
+        tensors, None for complex ones), 'mean'/'var' (floating/complex tensors with
+        moments=True only, else None), 'has_nan', 'has_inf', 'all_zeros' (False if there
+        is a NaN)
+    """
+    t = tensor.detach()
+    numel = t.numel()
+    stats = {'numel': numel, 'min': 0, 'max': 0, 'mean': None, 'var': None,
+             'has_nan': False, 'has_inf': False, 'all_zeros': True}
+    if numel == 0:
+        return stats
+    if t.dtype == torch.bool:
+        t = t.view(torch.uint8)
+    
+    if t.is_complex():
+        mag = t.abs().amax().double()
+        if moments:
+            var, mean = torch.var_mean(t)
+            re, im, var, mag = torch.stack([mean.real.double(), mean.imag.double(), var.double(), mag]).tolist()
+            stats.update({'mean': complex(re, im), 'var': var})
+        else:
+            mag = mag.item()
+        stats.update({'min': None, 'max': None, 'all_zeros': mag == 0,
+                      'has_nan': math.isnan(mag), 'has_inf': math.isinf(mag)})
+        return stats
+    
+    mn, mx = torch.aminmax(t)
+    if not t.dtype.is_floating_point:
+        mn, mx = torch.stack([mn, mx]).tolist()
+        stats.update({'min': mn, 'max': mx, 'all_zeros': mn == 0 and mx == 0})
+        return stats
+    
+    if moments:
+        var, mean = torch.var_mean(t)
+        mn, mx, mean, var = torch.stack([mn.double(), mx.double(), mean.double(), var.double()]).tolist()
+        stats.update({'mean': mean, 'var': var})
+    else:
+        mn, mx = torch.stack([mn.double(), mx.double()]).tolist()
+    stats.update({'min': mn, 'max': mx})
+    if math.isnan(mn) or math.isnan(mx):
+        nan_mask = torch.isnan(t)
+        mn, mx, has_inf = torch.stack([
+            torch.where(nan_mask, float('inf'), t).amin().double(),
+            torch.where(nan_mask, float('-inf'), t).amax().double(),
+            torch.isinf(t).any().double()]).tolist()
+        if mn > mx:  # everything is NaN
+            mn = mx = float('nan')
+        stats.update({'min': mn, 'max': mx, 'has_nan': True, 'has_inf': bool(has_inf)})
+    else:
+        stats['has_inf'] = math.isinf(mn) or math.isinf(mx)
+    stats['all_zeros'] = not stats['has_nan'] and mn == mx == 0
+    return stats
+
+
 def tensor_stat(t):
-    min_v = torch.min(t).item()
-    max_v = torch.max(t).item()
+    st = fused_stats(t)
+    min_v, max_v = st['min'], st['max']
     dev = str(t.device)
     # Format values compactly
     def fmt(v):
         if isinstance(v, float):
             return f"{v:.4g}"
         return str(v)
+    flags = (" HAS_NaN!" if st['has_nan'] else "") + (" HAS_Inf!" if st['has_inf'] else "")
     # Only compute mean/var for floating point types
     if t.dtype.is_floating_point or t.dtype.is_complex:
-        mean_v = torch.mean(t).item()
-        var_v = torch.var(t).item()
-        print(f"{t.shape} {t.dtype} {dev} min={fmt(min_v)} max={fmt(max_v)} mean={fmt(mean_v)} var={fmt(var_v)}")
+        mean_v, var_v = st['mean'], st['var']
+        print(f"{t.shape} {t.dtype} {dev} min={fmt(min_v)} max={fmt(max_v)} mean={fmt(mean_v)} var={fmt(var_v)}{flags}")
     else:
         print(f"{t.shape} {t.dtype} {dev} min={min_v} max={max_v}")
 
@@ -290,13 +582,77 @@ def numpy_stat(arr):
     print(f"MIN: {np.min(arr)}, MAX: {np.max(arr)}, MEAN: {np.mean(arr)}, VAR: {np.var(arr)}")
 
 
-def compare_np(arr1: np.array, arr2: np.array) -> dict:
+# z-score of a two-sided 95% confidence interval
+_Z95 = 1.959964
+
+
+def _sample_flat(x, n: int, mode: str, seed: int):
+    """Pick n elements of x (numpy array or torch tensor) as a float64 (complex128) numpy array.
+
+    The same (numel, n, mode, seed) always selects the same positions, so two
+    tensors sampled with identical arguments are compared element by element.
+    Works on np.memmap / torch.load(mmap=True) data without reading the whole file.
+    """
+    is_torch = _is_tensor(x)
+    flat = x.reshape(-1)
+    numel = flat.shape[0]
+    if mode == 'strided':
+        stride = max(1, numel // n)
+        picked = flat[seed % stride::stride][:n]
+    elif mode == 'random':
+        idx = np.sort(np.random.default_rng(seed).integers(0, numel, size=n))
+        picked = flat[torch.from_numpy(idx).to(flat.device)] if is_torch else flat[idx]
+    else:
+        raise ValueError(f"Unknown sample_mode '{mode}', expected 'strided' or 'random'")
+    if is_torch:
+        return picked.detach().to('cpu', torch.complex128 if picked.is_complex() else torch.float64).numpy()
+    return np.asarray(picked, dtype=np.complex128 if np.iscomplexobj(picked) else np.float64)
+
+
+def _compare_sampled(x1, x2, n: int, mode: str, seed: int) -> dict:
+    """Comparison metrics estimated from n sampled elements, with 95% confidence bounds.
+
+    mean_diff_lo/hi: CLT interval for the mean absolute difference.
+    max_diff_exceed_frac: with 95% confidence at most this fraction of all elements
+    differ by more than the sampled max_diff (rule of three, -ln(0.05)/n; exact for
+    'random', an approximation for 'strided').
+    """
+    a = _sample_flat(x1, n, mode, seed)
+    b = _sample_flat(x2, n, mode, seed)
+    abs_diff = np.abs(a - b)
+    n = abs_diff.size
+    mean_diff = float(np.mean(abs_diff))
+    half_width = _Z95 * float(np.std(abs_diff)) / float(np.sqrt(n))
+    return {
+        'max_diff': float(np.max(abs_diff)),
+        'mean_diff': mean_diff,
+        'l2_diff': float(np.sqrt(np.mean(np.square(abs_diff)))),
+        'shape': tuple(x1.shape),
+        'arr1_mean': np.mean(a).item(),  # complex stays complex
+        'arr2_mean': np.mean(b).item(),
+        'arr1_std': float(np.std(a)),
+        'arr2_std': float(np.std(b)),
+        'sample_size': n,
+        'mean_diff_lo': max(0.0, mean_diff - half_width),
+        'mean_diff_hi': mean_diff + half_width,
+        'max_diff_exceed_frac': float(-np.log(0.05)) / n,
+    }
+
+
+def compare_np(arr1: np.array, arr2: np.array, sample: Optional[int] = None, sample_mode='strided',
+               escalate_threshold: Optional[float] = None, seed=0) -> dict:
+    """Compare two numpy arrays.
+
+    With sample=N only N elements are compared (see compare_torch); the result
+    then also carries 'sample_size' and confidence bounds.
+    """
     if arr1.shape != arr2.shape:
         raise ValueError(f"Shape mismatch: {arr1.shape} vs {arr2.shape}")
-    abs_diff = np.abs(arr1 - arr2)
-    max_diff = np.max(abs_diff)
-    mean_diff = np.mean(abs_diff)
-    l2_diff = np.sqrt(np.mean(np.square(abs_diff)))
+    if sample is not None and sample < arr1.size:
+        metrics = _compare_sampled(arr1, arr2, sample, sample_mode, seed)
+        if escalate_threshold is None or metrics['max_diff'] <= escalate_threshold:
+            return metrics
+    max_diff, mean_diff, l2_diff = _abs_diff_moments(arr1, arr2)
     return {
         'max_diff': max_diff,
         'mean_diff': mean_diff,
@@ -313,33 +669,914 @@ def compare_tensor(t1: torch.tensor, t2: torch.tensor):
     return compare_np(t1.to("cpu").detach().numpy(), t2.to("cpu").detach().numpy())
 
 
-def compare_torch(tensor1: torch.Tensor, tensor2: torch.Tensor) -> dict:
+def compare_torch(tensor1: torch.Tensor, tensor2: torch.Tensor, sample: Optional[int] = None,
+                  sample_mode='strided', escalate_threshold: Optional[float] = None, seed=0) -> dict:
+    """Compare two tensors: max/mean/l2 of the absolute difference plus means and stds.
+
+    Args:
+        tensor1, tensor2 (torch.Tensor): Tensors of identical shape
+        sample (int, optional): Compare only this many elements instead of all of them.
+            The result then has extra keys 'sample_size', 'mean_diff_lo', 'mean_diff_hi'
+            (95% interval of mean_diff) and 'max_diff_exceed_frac' (95% bound on the
+            fraction of elements whose diff exceeds the sampled max_diff)
+        sample_mode (str): 'strided' (every k-th element) or 'random' (seeded uniform)
+        escalate_threshold (float, optional): Redo a full comparison if the sampled
+            max_diff exceeds this value
+        seed (int): Seed / stride offset for deterministic sampling
+    """
     if tensor1.shape != tensor2.shape:
         raise ValueError(f"Shape mismatch: {tensor1.shape} vs {tensor2.shape}")
-    abs_diff = torch.abs(tensor1 - tensor2)
-    max_diff = torch.max(abs_diff).item()
-    mean_diff = torch.mean(abs_diff).item()
-    l2_diff = torch.sqrt(torch.mean(torch.square(abs_diff))).item()
+    if sample is not None and sample < tensor1.numel():
+        metrics = _compare_sampled(tensor1, tensor2, sample, sample_mode, seed)
+        if escalate_threshold is None or metrics['max_diff'] <= escalate_threshold:
+            return metrics
+    max_diff, mean_diff, l2_diff = _abs_diff_moments(tensor1, tensor2)
+    # torch.mean / torch.std reject integer tensors
+    t1, t2 = (t if t.is_floating_point() or t.is_complex() else t.double() for t in (tensor1, tensor2))
     return {
         'max_diff': max_diff,
         'mean_diff': mean_diff,
         'l2_diff': l2_diff,
         'shape': tuple(tensor1.shape),
-        'arr1_mean': torch.mean(tensor1).item(),
-        'arr2_mean': torch.mean(tensor2).item(),
-        'arr1_std': torch.std(tensor1).item(),
-        'arr2_std': torch.std(tensor2).item()
+        'arr1_mean': torch.mean(t1).item(),
+        'arr2_mean': torch.mean(t2).item(),
+        'arr1_std': torch.std(t1).item(),
+        'arr2_std': torch.std(t2).item()
     }
 
+_CMP_CHUNK = 1 << 22  # elements per chunk of the comparisons below, bounds their float64 temporaries
+
+# |a - b| histogram buckets of compare_report(): == 0, (0, 1e-10], (1e-10, 1e-9], ..., (10, 100], > 100
+_ERR_EDGES = [0.0] + [10.0 ** k for k in range(-10, 3)]
+
+
+def _ulp_view(dtype):
+    """Integer dtype to view a float dtype as, for ULP distances (None if unsupported)."""
+    return {torch.float16: torch.int16, torch.bfloat16: torch.int16,
+            torch.float32: torch.int32, torch.float64: torch.int64}.get(dtype)
+
+
+def _flat_view(x):
+    """Flatten a tensor or numpy array (complex as interleaved real/imag) without copying."""
+    if _is_tensor(x):
+        x = x.detach()
+        return (torch.view_as_real(x) if x.is_complex() else x).reshape(-1)
+    x = np.asarray(x)
+    if np.iscomplexobj(x):
+        x = np.ascontiguousarray(x).view(x.real.dtype)
+    return x.reshape(-1)
+
+
+def _paired_chunks(x1, x2):
+    """Yield (start, chunk1, chunk2): aligned torch slices of both inputs in their own dtype.
+
+    Numpy inputs (also np.memmap) are converted one chunk at a time.
+    """
+    f1, f2 = _flat_view(x1), _flat_view(x2)
+    numel = f1.shape[0]
+    if f2.shape[0] != numel:
+        raise ValueError(f"Size mismatch: {numel} vs {f2.shape[0]} elements")
+
+    def to_torch(chunk):
+        if _is_tensor(chunk):
+            return chunk
+        if chunk.dtype.kind == 'u' and chunk.itemsize > 1:
+            return torch.from_numpy(chunk.astype(np.int64))
+        return torch.from_numpy(np.array(chunk))
+
+    for start in range(0, numel, _CMP_CHUNK):
+        c1 = to_torch(f1[start:start + _CMP_CHUNK])
+        c2 = to_torch(f2[start:start + _CMP_CHUNK])
+        yield start, c1, c2.to(c1.device)
+
+
+def _is_complex(x) -> bool:
+    return x.is_complex() if _is_tensor(x) else np.iscomplexobj(x)
+
+
+def _abs_diff_moments(x1, x2):
+    """max, mean and rms of |x1 - x2|, computed chunk by chunk in float64.
+
+    Unlike a subtraction in the input dtype this neither overflows for fp16/bf16
+    nor wraps around for integers; NaNs propagate like in np.max / np.mean.
+    For complex inputs |x1 - x2| is the magnitude of the complex difference.
+    """
+    if not (_is_tensor(x1) or _is_tensor(x2)):
+        return _abs_diff_moments_np(x1, x2)
+    complex_ = _is_complex(x1) or _is_complex(x2)
+    partial = []
+    numel = 0
+    for _, c1, c2 in _paired_chunks(x1, x2):
+        d = (c1.to(torch.float64) - c2.to(torch.float64)).abs()
+        if complex_:  # chunks hold whole (real, imag) pairs, _CMP_CHUNK is even
+            d = torch.hypot(d[0::2], d[1::2])
+        partial.append(torch.stack([d.max(), d.sum(), torch.square(d).sum()]))
+        numel += d.numel()
+    if not partial:
+        return float('nan'), float('nan'), float('nan')
+    stacked = torch.stack(partial)
+    max_diff, total, total_sq = torch.stack([stacked[:, 0].max(), stacked[:, 1].sum(),
+                                             stacked[:, 2].sum()]).tolist()
+    return max_diff, total / numel, math.sqrt(total_sq / numel)
+
+
+def _abs_diff_moments_np(arr1, arr2):
+    """_abs_diff_moments() for two numpy arrays, in numpy (no torch import)."""
+    complex_ = _is_complex(arr1) or _is_complex(arr2)
+    f1, f2 = _flat_view(arr1), _flat_view(arr2)
+    if f1.shape[0] != f2.shape[0]:
+        raise ValueError(f"Size mismatch: {f1.shape[0]} vs {f2.shape[0]} elements")
+    numel = f1.shape[0] // 2 if complex_ else f1.shape[0]
+    if numel == 0:
+        return float('nan'), float('nan'), float('nan')
+    max_diff, total, total_sq = float('-inf'), 0.0, 0.0
+    for start in range(0, f1.shape[0], _CMP_CHUNK):
+        d = np.abs(f1[start:start + _CMP_CHUNK].astype(np.float64) - f2[start:start + _CMP_CHUNK].astype(np.float64))
+        if complex_:  # |real diff, imag diff| of each element
+            d = np.hypot(d[0::2], d[1::2])
+        chunk_max = float(np.max(d))
+        if chunk_max > max_diff or math.isnan(chunk_max):  # a NaN sticks, like np.max
+            max_diff = chunk_max
+        total += float(np.sum(d))
+        total_sq += float(np.dot(d, d))
+    return max_diff, total / numel, math.sqrt(total_sq / numel)
+
+
+def _ordinal(chunk: torch.Tensor) -> torch.Tensor:
+    """Map float bit patterns to integers ordered like the floats (adjacent floats differ by 1)."""
+    view = _ulp_view(chunk.dtype)
+    bits = chunk.view(view).to(torch.int64)
+    magnitude = bits & ((1 << (torch.iinfo(view).bits - 1)) - 1)
+    return torch.where(bits < 0, -magnitude, magnitude)
+
+
+def compare_report(x1, x2, atol=1e-5, rtol=1.3e-6, equal_nan=True) -> dict:
+    """Tolerance-aware comparison of two tensors / numpy arrays with allclose semantics.
+
+    Elements are upcast to float64 one chunk at a time (never a full-size float64
+    copy), so fp16/bf16 differences do not overflow and integer dumps do not wrap.
+    An element mismatches when |x1 - x2| > atol + rtol * |x2|, like
+    torch.testing.assert_close; NaN == NaN with equal_nan, Inf only equals the same Inf.
+
+    Args:
+        x1, x2: torch.Tensor or np.ndarray of identical shape (x2 is the reference for rtol)
+        atol (float): Absolute tolerance
+        rtol (float): Relative tolerance
+        equal_nan (bool): Whether NaNs in the same position count as equal
+
+    Returns:
+        dict: 'shape', 'dtype', 'other_dtype', 'numel', 'atol', 'rtol';
+        'mismatches' / 'mismatch_frac' (out of tolerance), 'nonfinite_mismatches'
+        (NaN/Inf positions that differ), 'first_mismatch' (index tuple or None);
+        over the positions where both are finite: 'max_diff' (+ 'max_diff_at'),
+        'mean_diff', 'l2_diff', 'max_rel_diff' (|x1 - x2| / |x2|, inf where only
+        x2 is 0) and 'max_ulp' (float dtypes only, both inputs of the same dtype,
+        else None); 'hist' counts of |x1 - x2| over 'hist_edges' (== 0, then
+        decades up to > 100)
+    """
+    shape = tuple(x1.shape)
+    if shape != tuple(x2.shape):
+        raise ValueError(f"Shape mismatch: {shape} vs {tuple(x2.shape)}")
+    dtype1 = str(x1.dtype).replace("torch.", "")
+    dtype2 = str(x2.dtype).replace("torch.", "")
+    nbins = len(_ERR_EDGES) + 1
+
+    partial, hist, edges = [], None, None
+    ulp = None
+    n_flat = 0
+    for start, c1, c2 in _paired_chunks(x1, x2):
+        if edges is None:
+            edges = torch.tensor(_ERR_EDGES, dtype=torch.float64, device=c1.device)
+            hist = torch.zeros(nbins + 1, dtype=torch.int64, device=c1.device)
+            ulp = [] if c1.dtype == c2.dtype and _ulp_view(c1.dtype) is not None else None
+        a, b = c1.to(torch.float64), c2.to(torch.float64)
+        mismatch = ~torch.isclose(a, b, rtol=rtol, atol=atol, equal_nan=equal_nan)
+        finite = torch.isfinite(a) & torch.isfinite(b)
+        d = torch.where(finite, (a - b).abs(), 0.0)
+        abs_b = b.abs()
+        rel = torch.where(abs_b > 0, d / abs_b, torch.where(d > 0, float('inf'), 0.0))
+        n_flat += d.numel()
+        pos = torch.arange(start, start + d.numel(), device=d.device)
+        first = torch.where(mismatch, pos, 1 << 62).amin()
+        partial.append(torch.stack([
+            d.amax(), (d.argmax() + start).to(torch.float64), d.sum(), torch.square(d).sum(),
+            rel.amax(), mismatch.sum().to(torch.float64), (mismatch & ~finite).sum().to(torch.float64),
+            first.to(torch.float64)]))
+        buckets = torch.where(finite, torch.bucketize(d, edges), nbins)
+        hist += torch.bincount(buckets, minlength=nbins + 1)
+        if ulp is not None:
+            dist = (_ordinal(c1) - _ordinal(c2)).abs() if c1.dtype != torch.float64 else \
+                (_ordinal(c1).to(torch.float64) - _ordinal(c2).to(torch.float64)).abs()
+            ulp.append(torch.where(finite, dist, 0).amax().to(torch.float64))
+
+    numel = math.prod(shape)
+    metrics = {'shape': shape, 'dtype': dtype1, 'other_dtype': dtype2, 'numel': numel,
+               'atol': atol, 'rtol': rtol}
+    if not partial:
+        metrics.update({'mismatches': 0, 'mismatch_frac': 0.0, 'nonfinite_mismatches': 0,
+                        'first_mismatch': None, 'max_diff': 0.0, 'max_diff_at': None, 'mean_diff': 0.0,
+                        'l2_diff': 0.0, 'max_rel_diff': 0.0, 'max_ulp': None,
+                        'hist': [0] * nbins, 'hist_edges': _ERR_EDGES})
+        return metrics
+
+    stacked = torch.stack(partial)
+    best = stacked[:, 0].argmax()
+    reduced = torch.cat([
+        torch.stack([stacked[best, 0], stacked[best, 1], stacked[:, 2].sum(), stacked[:, 3].sum(),
+                     stacked[:, 4].max(), stacked[:, 5].sum(), stacked[:, 6].sum(), stacked[:, 7].min(),
+                     torch.stack(ulp).max() if ulp else torch.tensor(-1.0, device=stacked.device)]),
+        hist[:nbins].to(torch.float64)]).tolist()  # the only host sync
+    (max_diff, max_at, total, total_sq, max_rel, mismatches, nonfinite, first, max_ulp), counts = \
+        reduced[:9], reduced[9:]
+    is_complex = x1.is_complex() if _is_tensor(x1) else np.iscomplexobj(x1)
+    flat_shape = shape + (2,) if is_complex else shape  # positions in the real view
+    finite_count = max(1, sum(counts))
+    metrics.update({
+        'mismatches': int(mismatches),
+        'mismatch_frac': mismatches / n_flat,
+        'nonfinite_mismatches': int(nonfinite),
+        'first_mismatch': _unravel(int(first), flat_shape) if first < n_flat else None,
+        'max_diff': max_diff,
+        'max_diff_at': _unravel(int(max_at), flat_shape),
+        'mean_diff': total / finite_count,
+        'l2_diff': math.sqrt(total_sq / finite_count),
+        'max_rel_diff': max_rel,
+        'max_ulp': int(max_ulp) if max_ulp >= 0 else None,
+        'hist': [int(c) for c in counts],
+        'hist_edges': _ERR_EDGES,
+    })
+    return metrics
+
+
 def load_and_compare_tensor(file1, file2):
     """Load and compare two numpy tensors, return comparison metrics"""
     arr1 = np.load(file1)
     arr2 = np.load(file2)
     return compare_np(arr1, arr2)
 
+
+# --- Compressed dump container -------------------------------------------
+#
+# Layout of a .tcz file:
+#   b"TCZ1" | u32 header length | JSON header | chunks...
+# where each chunk is: u32 raw length | u32 compressed length | compressed bytes.
+# The payload is the ordinary torch.save / np.save byte stream, optionally
+# byte-shuffled per chunk (all bytes 0 of each element, then all bytes 1, ...)
+# which groups the exponent/sign bytes of dense bf16/fp16 data (but scatters the
+# runs of masks and sparse tensors, hence off by default).
+
+COMPRESSED_SUFFIX = ".tcz"
+_TCZ_MAGIC = b"TCZ1"
+_TCZ_CHUNK = 4 << 20  # 4 MiB, a multiple of every element size
+
+
+def available_codecs() -> list:
+    """Return the compression codecs usable in this environment."""
+    codecs = ['zlib']
+    if zstandard is not None:
+        codecs.insert(0, 'zstd')
+    if lz4frame is not None:
+        codecs.append('lz4')
+    return codecs
+
+
+def _codec_fns(codec: str, level: Optional[int] = None):
+    """Return (compress, decompress) callables for a codec name."""
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError("codec 'zstd' needs the zstandard package: pip install zstandard")
+        cctx = zstandard.ZstdCompressor(level=3 if level is None else level)
+        dctx = zstandard.ZstdDecompressor()
+        return cctx.compress, dctx.decompress
+    if codec == 'lz4':
+        if lz4frame is None:
+            raise ImportError("codec 'lz4' needs the lz4 package: pip install lz4")
+        lvl = 0 if level is None else level
+        return (lambda b: lz4frame.compress(b, compression_level=lvl)), lz4frame.decompress
+    if codec == 'zlib':
+        lvl = 1 if level is None else level
+        return (lambda b: zlib.compress(b, lvl)), zlib.decompress
+    raise ValueError(f"Unknown codec '{codec}', expected one of {available_codecs()}")
+
+
+def _byte_shuffle(buf, width: int) -> bytes:
+    if width <= 1:
+        return bytes(buf)
+    n = len(buf) - len(buf) % width
+    arr = np.frombuffer(buf, dtype=np.uint8, count=n)
+    return arr.reshape(-1, width).T.tobytes() + bytes(buf[n:])
+
+
+def _byte_unshuffle(buf, width: int) -> bytes:
+    if width <= 1:
+        return bytes(buf)
+    n = len(buf) - len(buf) % width
+    arr = np.frombuffer(buf, dtype=np.uint8, count=n)
+    return arr.reshape(width, -1).T.tobytes() + bytes(buf[n:])
+
+
+def write_compressed(raw, path, codec: str = 'zstd', shuffle: int = 1,
+                     level: Optional[int] = None) -> int:
+    """Write a byte buffer to path as a chunked, compressed .tcz stream.
+
+    Args:
+        raw: bytes-like payload (e.g. the output of torch.save into a BytesIO)
+        path: Target file path or writable binary file object
+        codec (str): 'zstd', 'lz4' or 'zlib'
+        shuffle (int): Byte-shuffle element width (1 disables shuffling)
+        level (int, optional): Codec specific compression level
+
+    Returns:
+        int: Number of bytes written
+    """
+    compress, _ = _codec_fns(codec, level)
+    raw = memoryview(raw).cast('B')
+    header = json.dumps({'codec': codec, 'shuffle': shuffle,
+                         'chunk': _TCZ_CHUNK, 'size': len(raw)}).encode()
+    f = open(path, 'wb') if isinstance(path, (str, Path)) else path
+    try:
+        written = f.write(_TCZ_MAGIC + struct.pack('<I', len(header)) + header)
+        for start in range(0, len(raw), _TCZ_CHUNK):
+            chunk = raw[start:start + _TCZ_CHUNK]
+            packed = compress(_byte_shuffle(chunk, shuffle))
+            written += f.write(struct.pack('<II', len(chunk), len(packed)))
+            written += f.write(packed)
+    finally:
+        if f is not path:
+            f.close()
+    return written
+
+
+def read_compressed(path) -> bytes:
+    """Read back the payload of a .tcz file written by write_compressed()."""
+    with open(path, 'rb') as f:
+        if f.read(4) != _TCZ_MAGIC:
+            raise ValueError(f"{path} is not a compressed TensorComp dump")
+        (header_len,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_len))
+        _, decompress = _codec_fns(header['codec'])
+        out = bytearray()
+        while len(out) < header['size']:
+            raw_len, packed_len = struct.unpack('<II', f.read(8))
+            chunk = _byte_unshuffle(decompress(f.read(packed_len)), header['shuffle'])
+            if len(chunk) != raw_len:
+                raise ValueError(f"Corrupt chunk in {path}: expected {raw_len} bytes, got {len(chunk)}")
+            out += chunk
+    return bytes(out)
+
+
+SUMMARY_FILE = "summary.json"
+# summary updates are appended here and folded into summary.json like manifest.journal
+SUMMARY_JOURNAL = "summary.journal"
+MANIFEST_FILE = "manifest.json"
+# saves append their manifest updates here; folded into manifest.json once it is larger than
+# both _JOURNAL_COMPACT_BYTES and manifest.json itself (so compaction stays cheap per save)
+MANIFEST_JOURNAL = "manifest.journal"
+_JOURNAL_COMPACT_BYTES = 1 << 18
+# sharded save_dict / save_args dumps: one file per entry plus an index, in these subdirectories
+SHARD_DIRS = {'dict': "tensor_dict.d", 'args': "args.d"}
+SHARD_INDEX = "index.json"
+# files listed in manifest.json (relative to the dump directory): the tensor dumps
+# themselves, plain or compressed, and the files of sharded dumps
+_MANIFEST_NAME = re.compile(r"((cp-\d+\.(pt|npy)|tensor_dict\.pt|args\.pt|(tensor_dict|args)\.d/\d+\.pt)(\.tcz)?"
+                            r"|(tensor_dict|args)\.d/index\.json)$")
+
+
+def _manifest_entry(st: os.stat_result) -> dict:
+    return {'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def _save_json(data, target) -> None:
+    """save_fn for TensorComp._write() that writes JSON to a path or binary buffer."""
+    raw = json.dumps(data, indent=1).encode()
+    if isinstance(target, io.BytesIO):
+        target.write(raw)
+    else:
+        Path(target).write_bytes(raw)
+
+
+def tensor_checksum(tensor: torch.Tensor) -> str:
+    """Content hash of a tensor's bytes (blake2b-128), independent of device and strides."""
+    data = tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+_STATS_CHUNK = 1 << 24  # elements per float64 chunk, bounds the extra memory of tensor_stats()
+
+
+def _flat_chunks(tensor: torch.Tensor):
+    flat = tensor.reshape(-1)
+    for start in range(0, flat.numel(), _STATS_CHUNK):
+        yield flat[start:start + _STATS_CHUNK].to(torch.float64)
+
+
+def tensor_stats(tensor: torch.Tensor, bins=16) -> dict:
+    """Statistics of a real tensor, computed chunk by chunk in float64.
+    
+    Returns:
+        dict: min/max/mean/var over the finite values (None if there are none),
+        counts of NaN, Inf and zero elements, and a coarse histogram of the
+        finite values ('hist' counts over 'hist_range' = [min, max])
+    """
+    t = tensor.detach()
+    if t.dtype == torch.bool:
+        t = t.to(torch.uint8)
+    if t.is_complex():
+        return {}
+    
+    n = nan = inf = zeros = 0
+    mean = m2 = 0.0
+    lo, hi = float('inf'), float('-inf')
+    for chunk in _flat_chunks(t):
+        nan += int(torch.isnan(chunk).sum())
+        inf += int(torch.isinf(chunk).sum())
+        zeros += int((chunk == 0).sum())
+        finite = chunk[torch.isfinite(chunk)]
+        k = finite.numel()
+        if k == 0:
+            continue
+        # merge chunk mean/M2 into the running ones (Chan et al.)
+        chunk_mean = finite.mean().item()
+        chunk_m2 = torch.square(finite - chunk_mean).sum().item()
+        delta, total = chunk_mean - mean, n + k
+        mean += delta * k / total
+        m2 += chunk_m2 + delta * delta * n * k / total
+        n = total
+        lo, hi = min(lo, finite.min().item()), max(hi, finite.max().item())
+    
+    stats = {'min': None, 'max': None, 'mean': None, 'var': None,
+             'nan': nan, 'inf': inf, 'zeros': zeros, 'hist': [], 'hist_range': []}
+    if n == 0:
+        return stats
+    counts = torch.zeros(bins, dtype=torch.float64)
+    for chunk in _flat_chunks(t):
+        counts += torch.histc(chunk[torch.isfinite(chunk)], bins=bins, min=lo, max=hi)
+    stats.update({'min': lo, 'max': hi, 'mean': mean, 'var': m2 / (n - 1) if n > 1 else 0.0,
+                  'hist': [int(c) for c in counts.tolist()], 'hist_range': [lo, hi]})
+    return stats
+
+
+def tensor_summary(tensor: torch.Tensor) -> dict:
+    """Small JSON-serializable description of a tensor, stored in summary.json at save time.
+    
+    Holds shape, strides, dtype, a content checksum and the tensor_stats(), so that
+    dump directories can be listed, filtered and pre-screened without loading tensors.
+    """
+    return {
+        'shape': list(tensor.shape),
+        'strides': list(tensor.stride()),
+        'dtype': str(tensor.dtype).replace("torch.", ""),
+        'numel': tensor.numel(),
+        'checksum': tensor_checksum(tensor),
+        **tensor_stats(tensor),
+    }
+
+
+def _same_content(s1: dict, s2: dict) -> bool:
+    """Whether two tensor summaries describe bit-identical tensors."""
+    return all(s1.get(k) == s2.get(k) for k in ('shape', 'dtype', 'checksum'))
+
+
+def prescreen_summaries(mine: Dict[str, dict], theirs: Dict[str, dict]) -> Dict[str, dict]:
+    """Classify summary entries against another summary index, without any tensor data.
+    
+    Returns:
+        Dict[str, dict]: per key a 'status' ('identical', 'different', 'shape_mismatch'
+        or 'missing'). 'different' entries also carry lower bounds implied by the stats:
+        'max_diff_lb' (from min/max) and 'mean_diff_lb' (from the means)
+    """
+    results = {}
+    for key, s1 in mine.items():
+        s2 = theirs.get(key)
+        if s2 is None:
+            results[key] = {'status': 'missing'}
+        elif s1['shape'] != s2['shape']:
+            results[key] = {'status': 'shape_mismatch', 'shape': s1['shape'], 'other_shape': s2['shape']}
+        elif _same_content(s1, s2):
+            results[key] = {'status': 'identical'}
+        else:
+            entry = {'status': 'different'}
+            if s1.get('min') is not None and s2.get('min') is not None:
+                entry['max_diff_lb'] = max(abs(s1['min'] - s2['min']), abs(s1['max'] - s2['max']))
+                entry['mean_diff_lb'] = abs(s1['mean'] - s2['mean'])
+            results[key] = entry
+    return results
+
+
+def count_mismatches(t1: torch.Tensor, t2: torch.Tensor, atol=1e-5, rtol=1.3e-6) -> int:
+    """Number of elements violating |t1 - t2| <= atol + rtol * |t2| (NaNs in both count as equal).
+    
+    Complex tensors are checked on their real and imaginary parts separately.
+    """
+    counts = [(~torch.isclose(c1.to(torch.float64), c2.to(torch.float64), rtol=rtol, atol=atol,
+                              equal_nan=True)).sum()
+              for _, c1, c2 in _paired_chunks(t1, t2)]
+    return int(torch.stack(counts).sum()) if counts else 0
+
+
+def _common_itemsize(tensors) -> int:
+    """Element size shared by all tensors (1 if they disagree), used as the shuffle width."""
+    sizes = {t.element_size() for t in tensors}
+    return sizes.pop() if len(sizes) == 1 else 1
+
+
+_STAGE_BYTES = 64 << 20  # pinned staging buffer size of to_device_pipelined(), two per stream
+
+
+def _is_cuda(device) -> bool:
+    return device is not None and torch.device(device).type == 'cuda'
+
+
+def _fallback_device(device):
+    """device, or 'cpu' (with a message) for a CUDA device on a machine without CUDA."""
+    if _is_cuda(device) and not torch.cuda.is_available():
+        print(f"[TensorComp] CUDA not available - loading to CPU instead of {device}")
+        return 'cpu'
+    return device
+
+
+def to_device_pipelined(values: list, device, streams=2, stage_bytes=_STAGE_BYTES) -> list:
+    """Copy the CPU tensors in values to a CUDA device, overlapping reads and copies.
+    
+    Each of `streams` threads owns a CUDA stream and two pinned staging buffers and
+    moves its share of the tensors chunk by chunk: while one buffer is DMA'd to the
+    device, the next chunk is read into the other one. For tensors memory-mapped by
+    torch.load(mmap=True) that read is the file read itself, so a large load runs at
+    disk (or page cache) bandwidth instead of read-everything-then-copy. Non-tensors
+    are passed through. Without CUDA the values are returned unchanged (CPU fallback).
+    
+    Args:
+        values (list): Tensors (CPU, ideally memory-mapped) and other values
+        device: Target CUDA device
+        streams (int): Number of copy streams / threads
+        stage_bytes (int): Size of each pinned staging buffer
+        
+    Returns:
+        list: values with every tensor replaced by its copy on device
+    """
+    device = _fallback_device(device)
+    if not _is_cuda(device):
+        return list(values)
+    device = torch.device(device)
+    out = list(values)
+    jobs = [i for i, v in enumerate(values) if isinstance(v, torch.Tensor)]
+    if not jobs:
+        return out
+    streams = max(1, min(streams, len(jobs)))
+    # destinations are allocated on the caller's stream; copy streams wait for it first
+    current = torch.cuda.current_stream(device)
+    dests = {}
+    for i in jobs:
+        src = values[i]
+        if src.device.type == 'cpu' and src.is_contiguous() and src.numel() > 0:
+            dests[i] = torch.empty(src.shape, dtype=src.dtype, device=device)
+    
+    def copy_share(worker):
+        share = jobs[worker::streams]
+        stream = torch.cuda.Stream(device)
+        stream.wait_stream(current)
+        largest = max((dests[i].numel() * dests[i].element_size() for i in share if i in dests), default=0)
+        stage = [torch.empty(min(stage_bytes, largest), dtype=torch.uint8, pin_memory=True) for _ in range(2)]
+        chunk = max(1, min(stage_bytes, largest))
+        done = [None, None]
+        turn = 0
+        with torch.cuda.stream(stream):
+            for i in share:
+                if i not in dests:
+                    out[i] = values[i].to(device)  # non-contiguous / empty / already on a device
+                    continue
+                src = values[i].reshape(-1).view(torch.uint8)
+                dst = dests[i].reshape(-1).view(torch.uint8)
+                for start in range(0, src.numel(), chunk):
+                    n = min(chunk, src.numel() - start)
+                    buf = stage[turn]
+                    if done[turn] is not None:
+                        done[turn].synchronize()  # the previous copy out of this buffer has finished
+                    buf[:n].copy_(src[start:start + n])
+                    dst[start:start + n].copy_(buf[:n], non_blocking=True)
+                    done[turn] = torch.cuda.Event()
+                    done[turn].record(stream)
+                    turn ^= 1
+                out[i] = dests[i]
+        stream.synchronize()
+    
+    if streams == 1:
+        copy_share(0)
+    else:
+        with ThreadPoolExecutor(max_workers=streams) as pool:
+            list(pool.map(copy_share, range(streams)))
+    return out
+
+
+# --- Node-local shared-memory capture ring --------------------------------
+#
+# In capture='shm' mode every process appends its serialized dumps to its own
+# single-producer/single-consumer ring buffer in /dev/shm, and one ShmAggregator
+# process per node drains all rings to the real (NFS) directory, one large
+# sequential write per file.  Ring file layout:
+#   header (64 bytes): magic u32 | pad u32 | capacity u64 | write_pos u64 | read_pos u64
+#   data (capacity bytes), records may wrap around:
+#   payload length u64 | name length u16 | name (path relative to the base dir) | payload
+# write_pos/read_pos are ever-increasing byte counters, only the producer moves
+# write_pos and only the consumer moves read_pos.
+
+_RING_MAGIC = 0x47524354  # "TCRG"
+_RING_HEADER = 64
+_RING_RECORD = struct.Struct('<QH')
+_RING_SUMMARY = "summary.json+"  # record name suffix for summary.json updates
+SHM_ROOT = Path("/dev/shm")
+
+
+def shm_ring_dir(directory) -> Path:
+    """Node-local ring directory used for captures into (base) directory."""
+    key = hashlib.blake2b(str(Path(directory).resolve()).encode(), digest_size=6).hexdigest()
+    return SHM_ROOT / f"tensorcomp-{key}"
+
+
+class ShmRing:
+    """Single-producer/single-consumer byte ring in a memory-mapped /dev/shm file."""
+
+    def __init__(self, path, capacity: Optional[int] = None):
+        """Open an existing ring, or create a fresh one when capacity is given."""
+        self.path = Path(path)
+        if capacity is not None:
+            # build the new ring next to the final name and rename it into place
+            tmp = self.path.with_suffix(".tmp")
+            while True:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    f = open(tmp, 'wb')
+                    break
+                except FileNotFoundError:
+                    continue  # the (empty) directory was just removed by _remove_ring_dir()
+            with f:
+                f.truncate(_RING_HEADER + capacity)  # sparse on tmpfs
+                f.write(struct.pack('<IIQQQ', _RING_MAGIC, 0, capacity, 0, 0))
+            tmp.replace(self.path)
+        with open(self.path, 'r+b') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mm = mmap.mmap(f.fileno(), 0)
+        magic, _, self.capacity = struct.unpack_from('<IIQ', self._mm, 0)
+        if magic != _RING_MAGIC:
+            raise ValueError(f"{self.path} is not a TensorComp capture ring")
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    @property
+    def write_pos(self) -> int:
+        return struct.unpack_from('<Q', self._mm, 16)[0]
+
+    @property
+    def read_pos(self) -> int:
+        return struct.unpack_from('<Q', self._mm, 24)[0]
+
+    def _copy_in(self, pos: int, data) -> None:
+        off = pos % self.capacity
+        first = min(len(data), self.capacity - off)
+        self._mm[_RING_HEADER + off:_RING_HEADER + off + first] = data[:first]
+        if first < len(data):
+            self._mm[_RING_HEADER:_RING_HEADER + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos: int, n: int) -> bytes:
+        off = pos % self.capacity
+        first = min(n, self.capacity - off)
+        data = self._mm[_RING_HEADER + off:_RING_HEADER + off + first]
+        if first < n:
+            data += self._mm[_RING_HEADER:_RING_HEADER + n - first]
+        return data
+
+    def put(self, name: str, payload, timeout: float) -> bool:
+        """Append a record, waiting up to timeout seconds for free space.
+
+        Returns False if the record can never fit or the consumer did not make
+        room in time, so the caller can fall back to writing directly.
+        """
+        name_b = name.encode()
+        payload = memoryview(payload).cast('B')
+        need = _RING_RECORD.size + len(name_b) + len(payload)
+        if need > self.capacity:
+            return False
+        with self.lock:
+            pos = self.write_pos
+            deadline = time.monotonic() + timeout
+            delay = 1e-4
+            while self.capacity - (pos - self.read_pos) < need:
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(delay)
+                delay = min(2 * delay, 0.05)
+            self._copy_in(pos, _RING_RECORD.pack(len(payload), len(name_b)) + name_b)
+            self._copy_in(pos + _RING_RECORD.size + len(name_b), payload)
+            struct.pack_into('<Q', self._mm, 16, pos + need)  # publish after the data
+        return True
+
+    def get(self):
+        """Pop the oldest record as (name, payload), or None if the ring is empty."""
+        pos = self.read_pos
+        if pos == self.write_pos:
+            return None
+        payload_len, name_len = _RING_RECORD.unpack(self._copy_out(pos, _RING_RECORD.size))
+        name = self._copy_out(pos + _RING_RECORD.size, name_len).decode()
+        payload = self._copy_out(pos + _RING_RECORD.size + name_len, payload_len)
+        struct.pack_into('<Q', self._mm, 24, pos + _RING_RECORD.size + name_len + payload_len)
+        return name, payload
+
+    def wait_empty(self, stall_timeout: float) -> bool:
+        """Wait until the consumer has drained every record.
+
+        Gives up (returns False) once the consumer made no progress for stall_timeout seconds.
+        """
+        last, deadline = self.read_pos, time.monotonic() + stall_timeout
+        while last != self.write_pos:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+            if self.read_pos != last:
+                last, deadline = self.read_pos, time.monotonic() + stall_timeout
+        return True
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+def _remove_ring_dir(ring_dir: Path) -> None:
+    """Remove a ring directory once its last ring is gone."""
+    try:
+        ring_dir.rmdir()
+    except OSError:
+        pass  # other producers still have rings there (or it is gone already)
+
+
+_SHM_RINGS: Dict[Path, ShmRing] = {}  # this process' producer rings, one per ring directory
+_SHM_RINGS_LOCK = threading.Lock()
+
+
+def _producer_ring(base_directory: Path, capacity: int) -> ShmRing:
+    ring_dir = shm_ring_dir(base_directory)
+    with _SHM_RINGS_LOCK:
+        ring = _SHM_RINGS.get(ring_dir)
+        if ring is None or ring.pid != os.getpid():  # none yet, or inherited over fork
+            ring = ShmRing(ring_dir / f"{os.getpid()}.ring", capacity)
+            ring.base_directory = base_directory
+            _SHM_RINGS[ring_dir] = ring
+        return ring
+
+
+@atexit.register
+def _close_producer_rings(stall_timeout: float = 5.0) -> None:
+    """Let the aggregator drain this process' rings before exit, then remove them (and their
+    directory, if no other process has a ring there).
+
+    If no aggregator is draining, the queued files are written out directly so nothing is lost.
+    """
+    for ring in list(_SHM_RINGS.values()):
+        if ring.pid != os.getpid():
+            continue
+        if not ring.wait_empty(stall_timeout):
+            print(f"[TensorComp] no ShmAggregator draining {ring.path} - writing queued files directly")
+            ShmAggregator(ring.base_directory)._drain_ring(ring)
+        ring.path.unlink(missing_ok=True)
+        ring.close()
+        _remove_ring_dir(ring.path.parent)
+    _SHM_RINGS.clear()
+
+
+class ShmAggregator:
+    """Drain the /dev/shm capture rings of every process on this node into directory.
+    
+    Run exactly one per node and base directory, e.g. from local rank 0. Files land
+    in the same rank_N/ layout that direct saves produce.
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 0.01):
+        self.directory = Path(directory)
+        self.ring_dir = shm_ring_dir(directory)
+        self.poll_interval = poll_interval
+        self._rings: Dict[Path, ShmRing] = {}
+        self._dirs: Dict[Path, 'TensorComp'] = {}
+        self._stop = None
+        self._process = None
+
+    def _write_record(self, name: str, payload: bytes) -> None:
+        target = self.directory / name
+        # files of sharded dumps live one level below their TensorComp directory
+        root = target.parent.parent if target.parent.name in SHARD_DIRS.values() else target.parent
+        tc = self._dirs.get(root)
+        if tc is None:
+            tc = self._dirs[root] = TensorComp(root, use_rank_subdir=False)
+        target.parent.mkdir(exist_ok=True)
+        if target.name.endswith(_RING_SUMMARY):
+            update = json.loads(payload)
+            for entry in update['entries'].values():
+                # the dump file was queued (and so written) before its summary
+                if 'stamp' not in entry and (root / entry['file']).exists():
+                    entry['stamp'] = _manifest_entry((root / entry['file']).stat())
+            tc._update_summary(update['entries'], update['replace_prefix'])
+            return
+        # one sequential write per file, then an atomic rename
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+        tmp.replace(target)
+        # drop the other (plain/compressed) variant so loads see the latest dump
+        if target.name.endswith(COMPRESSED_SUFFIX):
+            stale = target.with_name(target.name[:-len(COMPRESSED_SUFFIX)])
+        else:
+            stale = target.with_name(target.name + COMPRESSED_SUFFIX)
+        stale.unlink(missing_ok=True)
+        tc._update_manifest({tc._relname(target): _manifest_entry(target.stat())},
+                            removed=[tc._relname(stale)])
+
+    def _drain_ring(self, ring: ShmRing) -> int:
+        count = 0
+        record = ring.get()
+        while record is not None:
+            self._write_record(*record)
+            count += 1
+            record = ring.get()
+        return count
+
+    def drain(self) -> int:
+        """Write out every record currently queued in any ring, return how many."""
+        count = 0
+        paths = set(self.ring_dir.glob("*.ring")) if self.ring_dir.exists() else set()
+        for path in paths | set(self._rings):
+            ring = self._rings.get(path)
+            try:
+                inode = path.stat().st_ino
+            except FileNotFoundError:
+                inode = None
+            if ring is None and inode is not None:
+                ring = self._rings[path] = ShmRing(path)
+            if ring is None:
+                continue
+            count += self._drain_ring(ring)
+            if inode != ring.inode:
+                ring.close()  # producer removed or recreated the ring
+                del self._rings[path]
+            elif not _pid_alive(int(path.stem)):
+                ring.close()  # producer exited without cleaning up (e.g. a multiprocessing child)
+                del self._rings[path]
+                path.unlink(missing_ok=True)
+        return count
+
+    def run(self, stop_event=None) -> None:
+        """Drain in a loop until stop_event is set, then drain what is left.
+        
+        The ring directory is removed on the way out unless producers are still attached.
+        """
+        while stop_event is None or not stop_event.is_set():
+            if self.drain() == 0:
+                time.sleep(self.poll_interval)
+        while self.drain():
+            pass
+        for ring in self._rings.values():
+            ring.close()
+        self._rings.clear()
+        _remove_ring_dir(self.ring_dir)
+
+    def start(self) -> 'ShmAggregator':
+        """Run the aggregator in a background process."""
+        self._stop = multiprocessing.Event()
+        self._process = multiprocessing.Process(target=_run_aggregator, daemon=True,
+                                                args=(self.directory, self.poll_interval, self._stop))
+        self._process.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background process after a final drain."""
+        if self._process is not None:
+            self._stop.set()
+            self._process.join(timeout)
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _run_aggregator(directory, poll_interval, stop_event) -> None:
+    ShmAggregator(directory, poll_interval).run(stop_event)
+
+
 class TensorComp:
     def __init__(self, directory: str, overwrite=True, verbose=False, native=False, 
-                 rank: Optional[int] = None, use_rank_subdir=True):
+                 rank: Optional[int] = None, use_rank_subdir=True,
+                 compress: Optional[str] = None, shuffle=False, compress_level: Optional[int] = None,
+                 summary=False, capture: Optional[str] = None, shm_capacity=1 << 30, shm_timeout=60.0,
+                 sharded=False):
         """Initialize TensorComp with a directory path.
         
         Args:
@@ -349,10 +1586,44 @@ class TensorComp:
             native (bool): Whether to use native torch operations for comparisons instead of numpy
             rank (int, optional): Process rank for distributed training (auto-detected from env if None)
             use_rank_subdir (bool): Whether to create rank-specific subdirectories for process safety
+            compress (str, optional): Codec for compressed dumps ('zstd', 'lz4' or 'zlib').
+                Files get an extra .tcz suffix; loading is transparent either way
+            shuffle (bool): Byte-shuffle tensor data before compressing. Gains a little on dense
+                float dumps but loses on masks and sparse index tensors and slows reads down;
+                measure with tensorbench.py codecs before turning it on
+            compress_level (int, optional): Codec specific compression level
+            summary (bool): Also record a tensor_summary() (shape, strides, dtype, stats, checksum,
+                histogram) of every saved tensor in the summary.json sidecar index. Listing and
+                pre-screening then work from the index alone, and comparisons skip
+                bit-identical tensors without loading them. Entries of files re-saved
+                without summary=True no longer match the manifest and are ignored
+            capture (str, optional): 'shm' queues every write in a node-local /dev/shm ring
+                instead of writing to directory; a ShmAggregator (one per node) drains the rings
+                into the usual rank_N/ layout with large sequential writes. Use flush() before
+                reading the files back
+            shm_capacity (int): Ring size in bytes for capture='shm' (tmpfs, allocated lazily)
+            shm_timeout (float): Seconds to wait for ring space before writing directly instead.
+                A directly written file can be overtaken by an older queued copy of the same
+                file, so size shm_capacity for the burst you expect
+            sharded (bool): Store save_dict / save_args dumps as one file per entry plus an
+                index.json (in tensor_dict.d/ and args.d/), so that load_dict(keys=...) and
+                load_args(indices=...) read only the requested entries, in parallel
         """
         self.overwrite = overwrite
         self.verbose = verbose
         self.native = native
+        self.compress = compress
+        self.shuffle = shuffle
+        self.compress_level = compress_level
+        self.summary = summary
+        self.sharded = sharded
+        if compress is not None:
+            _codec_fns(compress, compress_level)  # fail early on unknown/missing codecs
+        if capture not in (None, 'shm'):
+            raise ValueError(f"Unknown capture mode '{capture}', expected None or 'shm'")
+        self.capture = capture
+        self.shm_capacity = shm_capacity
+        self.shm_timeout = shm_timeout
         self._lock = threading.Lock()  # Thread safety within process
         
         # Auto-detect rank from common distributed training env vars
@@ -365,13 +1636,21 @@ class TensorComp:
         
         # Use rank-specific subdirectory for process safety
         base_dir = Path(directory)
+        self.base_directory = base_dir
         if self.rank is not None and use_rank_subdir:
             self.directory = base_dir / f"rank_{self.rank}"
         else:
             self.directory = base_dir
             
-        self.existed = self.directory.exists()
-        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            self.directory.mkdir(parents=True)
+            self.existed = False
+        except FileExistsError:
+            self.existed = True
+        self._manifest = None
+        # ((inode, mtime_ns) of manifest.json, inode and bytes read of manifest.journal) self._manifest came from
+        self._manifest_stamp = None
+        self._manifest_dirty = False  # this instance appended to the journal since then
     
     def exists(self):
         return self.existed
@@ -410,6 +1689,386 @@ class TensorComp:
             if temp_path.exists():
                 temp_path.unlink()
             raise e
+
+    def _resolve(self, filepath: Path, use_manifest=True) -> Optional[Path]:
+        """Return the plain or compressed variant of filepath that exists on disk (or None).
+        
+        Files listed in manifest.json are found without touching the filesystem; anything
+        else (e.g. dumps written after the manifest was read) falls back to stat calls.
+        A manifest hit can be stale, _read() then looks the file up again.
+        """
+        files = self.manifest() if use_manifest else None
+        if files is not None:
+            name = self._relname(filepath)
+            if name in files:
+                return filepath
+            if name + COMPRESSED_SUFFIX in files:
+                return filepath.with_name(filepath.name + COMPRESSED_SUFFIX)
+        if filepath.exists():
+            return filepath
+        packed = filepath.with_name(filepath.name + COMPRESSED_SUFFIX)
+        if packed.exists():
+            return packed
+        return None
+
+    def _relname(self, filepath: Path) -> str:
+        """Name of a file in this directory as listed in manifest.json."""
+        return filepath.relative_to(self.directory).as_posix()
+
+    def _write(self, data, filepath: Path, save_fn, atomic=True, itemsize=1, compress=True) -> dict:
+        """Write data with save_fn, compressing the serialized stream if requested.
+
+        Any stale variant of the file in the other format is removed so that
+        loading always sees the latest dump.
+        
+        Returns:
+            dict: {'file': manifest name, 'stamp': manifest entry} of the written file, for
+            its summary.json entries (no 'stamp' yet if the file went to the shm ring)
+        """
+        stale = filepath.with_name(filepath.name + COMPRESSED_SUFFIX)
+        if self.compress and compress:
+            buf = io.BytesIO()
+            save_fn(data, buf)
+            stale, filepath = filepath, stale
+            width = itemsize if self.shuffle else 1
+            data = buf.getbuffer()
+            save_fn = lambda raw, p: write_compressed(raw, p, self.compress, width, self.compress_level)
+
+        if self.capture == 'shm':
+            buf = io.BytesIO()
+            save_fn(data, buf)
+            if self._ring_put(filepath, buf.getbuffer()):
+                return {'file': self._relname(filepath)}
+            print(f"[TensorComp] shm ring full or no aggregator running - writing {filepath} directly")
+
+        if atomic:
+            self._atomic_save(data, filepath, save_fn)
+        else:
+            save_fn(data, filepath)
+
+        stale.unlink(missing_ok=True)
+        stamp = _manifest_entry(filepath.stat())
+        self._update_manifest({self._relname(filepath): stamp}, removed=[self._relname(stale)])
+        return {'file': self._relname(filepath), 'stamp': stamp}
+
+    def _remove(self, paths) -> None:
+        """Delete files of a superseded dump and drop them from the manifest."""
+        names = []
+        for filepath in paths:
+            if filepath.exists():
+                filepath.unlink()
+                names.append(self._relname(filepath))
+        listed = self.manifest() or {}
+        names += [self._relname(p) for p in paths if self._relname(p) in listed]
+        if names:
+            self._update_manifest({}, removed=names)
+
+    def _ring_put(self, filepath: Path, payload) -> bool:
+        """Queue a file for the ShmAggregator, named relative to the base directory."""
+        ring = _producer_ring(self.base_directory, self.shm_capacity)
+        name = str(filepath.relative_to(self.base_directory))
+        return ring.put(name, payload, self.shm_timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """In capture='shm' mode wait until the aggregator has written all queued files.
+
+        Returns False if the aggregator made no progress for timeout (default shm_timeout) seconds.
+        """
+        if self.capture != 'shm':
+            return True
+        ring = _SHM_RINGS.get(shm_ring_dir(self.base_directory))
+        if ring is None:
+            return True
+        return ring.wait_empty(self.shm_timeout if timeout is None else timeout)
+
+    def _read(self, filepath: Path, load_fn):
+        """Call load_fn on filepath, decompressing .tcz files transparently.
+        
+        If filepath came from a stale manifest (another process re-saved the dump in the
+        other format, or removed it), the file is looked up again on disk.
+        """
+        try:
+            return self._read_file(filepath, load_fn)
+        except FileNotFoundError:
+            plain = filepath
+            if filepath.name.endswith(COMPRESSED_SUFFIX):
+                plain = filepath.with_name(filepath.name[:-len(COMPRESSED_SUFFIX)])
+            self.manifest(refresh=True)
+            current = self._resolve(plain, use_manifest=False)
+            if current is None:
+                raise
+            return self._read_file(current, load_fn)
+
+    @staticmethod
+    def _read_file(filepath: Path, load_fn):
+        if filepath.name.endswith(COMPRESSED_SUFFIX):
+            return load_fn(io.BytesIO(read_compressed(filepath)))
+        return load_fn(filepath)
+
+    @staticmethod
+    def _index_of(filepath: Path) -> int:
+        """Parse the index out of cp-<index>.pt[.tcz] / cp-<index>.npy[.tcz]."""
+        return int(filepath.name.split('.')[0].split('-')[1])
+
+    def _index_files(self) -> Dict[int, Path]:
+        """Map every stored tensor index to its (plain or compressed) file.
+        
+        Read from manifest.json when there is one, otherwise the directory is globbed.
+        """
+        pattern = "cp-*.pt" if self.native else "cp-*.npy"
+        manifest = self.manifest()
+        if manifest is not None:
+            suffix = ".pt" if self.native else ".npy"
+            paths = [self.directory / n for n in manifest
+                     if n.startswith("cp-") and (n.endswith(suffix) or n.endswith(suffix + COMPRESSED_SUFFIX))]
+        else:
+            paths = list(self.directory.glob(pattern)) + list(self.directory.glob(pattern + COMPRESSED_SUFFIX))
+        files = {}
+        for filepath in paths:
+            index = self._index_of(filepath)
+            # plain file wins, like _resolve()
+            if index not in files or files[index].name.endswith(COMPRESSED_SUFFIX):
+                files[index] = filepath
+        return files
+
+    def manifest(self, refresh=False) -> Optional[Dict[str, dict]]:
+        """Contents of manifest.json plus manifest.journal: {file name: {'size': bytes, 'mtime': seconds}}.
+        
+        Every save appends one line to manifest.journal (folded into manifest.json now and
+        then) and the manifest is read once per instance, so listing, loading and comparing
+        need no glob or stat calls (which add up on sshfs mounts).
+        
+        Args:
+            refresh (bool): Re-read the manifest, e.g. while another process is still saving
+                (only journal lines appended since the last read are parsed)
+            
+        Returns:
+            dict or None: None for directories written without a manifest (see rebuild_manifest())
+        """
+        if refresh or self._manifest_dirty or self._manifest_stamp is None:
+            self._manifest_dirty = False
+            self._load_manifest()
+        return self._manifest
+
+    def _manifest_stale(self) -> bool:
+        """Whether manifest.json or manifest.journal changed since the manifest was read (two stats)."""
+        if self._manifest_stamp is None:
+            return True
+        base, journal, offset = self._manifest_stamp
+        try:
+            st = (self.directory / MANIFEST_FILE).stat()
+        except FileNotFoundError:
+            return base is not None
+        if base != (st.st_ino, st.st_mtime_ns):
+            return True
+        try:
+            st = (self.directory / MANIFEST_JOURNAL).stat()
+        except FileNotFoundError:
+            return journal is not None
+        return st.st_ino != journal or st.st_size != offset
+
+    def _load_manifest(self) -> None:
+        """(Re)read manifest.json and the journal lines appended since the last read."""
+        filepath = self.directory / MANIFEST_FILE
+        for _ in range(5):  # a concurrent compaction replaces both manifest.json and the journal
+            try:
+                st = filepath.stat()
+            except FileNotFoundError:
+                self._manifest, self._manifest_stamp = None, (None, None, 0)
+                return
+            stamp = (st.st_ino, st.st_mtime_ns)
+            if self._manifest is not None and self._manifest_stamp[0] == stamp:
+                files, journal, offset = self._manifest, self._manifest_stamp[1], self._manifest_stamp[2]
+            else:
+                try:
+                    files = json.loads(filepath.read_text())['files']
+                except (FileNotFoundError, ValueError):
+                    continue
+                journal, offset = None, 0
+            replayed = self._replay_journal(files, journal, offset)
+            if replayed is None:
+                self._manifest = None  # the journal was compacted under us, read everything again
+                continue
+            st = filepath.stat()
+            if (st.st_ino, st.st_mtime_ns) == stamp:
+                self._manifest, self._manifest_stamp = files, (stamp, *replayed)
+                return
+            self._manifest = None
+        raise RuntimeError(f"[TensorComp] {filepath} keeps changing, cannot read it")
+
+    def _replay_journal(self, files: Dict[str, dict], journal: Optional[int], offset: int) -> Optional[tuple]:
+        """Apply the complete journal lines from byte offset on to files.
+        
+        Returns:
+            tuple or None: (journal inode, new offset), None if the journal is no longer
+                the one offset refers to
+        """
+        try:
+            with open(self.directory / MANIFEST_JOURNAL, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if offset and inode != journal:
+                    return None
+                f.seek(offset)
+                tail = f.read()
+        except FileNotFoundError:
+            return None if offset else (None, 0)
+        end = tail.rfind(b"\n") + 1  # a line still being written is picked up next time
+        for line in tail[:end].splitlines():
+            record = json.loads(line)
+            for name in record.get('removed', ()):
+                files.pop(name, None)
+            files.update(record.get('added', {}))
+        return inode, offset + end
+
+    def _scan_manifest(self) -> Dict[str, dict]:
+        """Manifest entries for the dumps currently in the directory (one directory listing)."""
+        files = {}
+        for subdir in [""] + [d + "/" for d in SHARD_DIRS.values()]:
+            try:
+                entries = list(os.scandir(self.directory / subdir))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if _MANIFEST_NAME.match(subdir + entry.name) and entry.is_file():
+                    files[subdir + entry.name] = _manifest_entry(entry.stat())
+        return files
+
+    def _update_manifest(self, added: Dict[str, dict], removed=()) -> None:
+        """Append an update to manifest.journal under an exclusive file lock (process safe).
+        
+        A save costs one appended line, however many dumps the directory holds; the journal
+        is folded into manifest.json once it outgrows it (see MANIFEST_JOURNAL). The first update
+        in a directory without a manifest lists the directory once, so dumps written by older
+        versions are not lost.
+        """
+        record = (json.dumps({'added': added, 'removed': list(removed)}) + "\n").encode()
+        with open(self.directory / (MANIFEST_FILE + ".lock"), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if self._manifest is None:
+                if not (self.directory / MANIFEST_FILE).exists():
+                    self._save_manifest(self._scan_manifest())
+            fd = os.open(self.directory / MANIFEST_JOURNAL, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            self._manifest_dirty = True
+            if size > _JOURNAL_COMPACT_BYTES and size > (self.directory / MANIFEST_FILE).stat().st_size:
+                self._compact_manifest()
+
+    def _save_manifest(self, files: Dict[str, dict]) -> None:
+        """Write manifest.json and start a new, empty journal (call with the manifest lock held).
+        
+        The journal is replaced rather than truncated, so readers holding an offset into
+        the old one notice (see _replay_journal).
+        """
+        filepath = self.directory / MANIFEST_FILE
+        self._atomic_save({'files': files}, filepath,
+                          lambda d, p: p.write_text(json.dumps(d, indent=1)))
+        self._atomic_save(b"", self.directory / MANIFEST_JOURNAL, lambda d, p: p.write_bytes(d))
+        self._manifest, self._manifest_stamp = None, None
+        self._manifest_dirty = False
+
+    def _compact_manifest(self) -> None:
+        """Fold manifest.journal into manifest.json (call with the manifest lock held)."""
+        self._load_manifest()
+        self._save_manifest(dict(self._manifest or {}))
+
+    def rebuild_manifest(self) -> Dict[str, dict]:
+        """(Re)write manifest.json from a directory listing, e.g. for dumps copied in by rsync."""
+        with open(self.directory / (MANIFEST_FILE + ".lock"), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            files = self._scan_manifest()
+            self._save_manifest(files)
+        return files
+
+    def indices(self) -> list:
+        """Sorted list of the tensor indices stored in this directory."""
+        return sorted(self._index_files())
+
+    def load_summary(self, validate=True) -> Dict[str, dict]:
+        """Read summary.json (written when summary=True), {} if there is none.
+        
+        Every entry records the size and mtime of the dump file it describes. A later
+        save without summary=True (or by another tool) leaves the entry behind, so by
+        default only entries whose file still matches the manifest are returned. The
+        manifest already read is reused unless another process has saved since.
+        
+        Args:
+            validate (bool): Drop entries whose dump file changed or vanished since
+        """
+        summary = self._read_summary()
+        if not validate or not summary:
+            return summary
+        files = self.manifest(refresh=self._manifest_stale())
+        return {key: entry for key, entry in summary.items() if self._summary_current(entry, files)}
+
+    def _read_summary(self) -> Dict[str, dict]:
+        """summary.json with summary.journal applied, under a shared lock (no half-done compaction)."""
+        if not ((self.directory / SUMMARY_FILE).exists() or (self.directory / SUMMARY_JOURNAL).exists()):
+            return {}
+        try:
+            lock_file = open(self.directory / (SUMMARY_FILE + ".lock"), 'a')
+        except OSError:  # read-only directory: nobody is writing to it either
+            return self._replay_summary()
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            return self._replay_summary()
+
+    def _replay_summary(self) -> Dict[str, dict]:
+        """summary.json plus the complete lines of summary.journal (call with the summary lock held)."""
+        try:
+            summary = json.loads((self.directory / SUMMARY_FILE).read_text())
+        except FileNotFoundError:
+            summary = {}
+        try:
+            journal = (self.directory / SUMMARY_JOURNAL).read_bytes()
+        except FileNotFoundError:
+            journal = b""
+        for line in journal[:journal.rfind(b"\n") + 1].splitlines():
+            update = json.loads(line)
+            if update['replace_prefix'] is not None:
+                summary = {k: v for k, v in summary.items() if not k.startswith(update['replace_prefix'])}
+            summary.update(update['entries'])
+        return summary
+
+    def _summary_current(self, entry: dict, files: Optional[Dict[str, dict]]) -> bool:
+        """Whether the dump file of a summary entry is still the one it was computed from."""
+        if 'file' not in entry or 'stamp' not in entry:
+            return False
+        if files is not None:
+            return files.get(entry['file']) == entry['stamp']
+        try:
+            return _manifest_entry((self.directory / entry['file']).stat()) == entry['stamp']
+        except FileNotFoundError:
+            return False
+
+    def _update_summary(self, entries: Dict[str, dict], replace_prefix: Optional[str] = None) -> None:
+        """Append entries to summary.journal under an exclusive file lock (process safe).
+        
+        Keys starting with replace_prefix are dropped first (e.g. a re-saved tensor_dict).
+        A save costs one appended line; the journal is folded into summary.json once it
+        outgrows it, as for the manifest (see MANIFEST_JOURNAL).
+        """
+        update = json.dumps({'entries': entries, 'replace_prefix': replace_prefix})
+        if self.capture == 'shm':
+            if self._ring_put(self.directory / _RING_SUMMARY, update.encode()):
+                return
+        with open(self.directory / (SUMMARY_FILE + ".lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            fd = os.open(self.directory / SUMMARY_JOURNAL, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (update + "\n").encode())
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            filepath = self.directory / SUMMARY_FILE
+            if size > _JOURNAL_COMPACT_BYTES and size > (filepath.stat().st_size if filepath.exists() else 0):
+                # replaying an update twice gives the same result, so a crash in between is harmless
+                self._atomic_save(self._replay_summary(), filepath,
+                                  lambda d, p: p.write_text(json.dumps(d, indent=1)))
+                self._atomic_save(b"", self.directory / SUMMARY_JOURNAL, lambda d, p: p.write_bytes(d))
     
     def save(self, tensor: torch.Tensor, index: int, show = False, atomic=True) -> None:
         """Save a PyTorch tensor to disk (thread/process safe).
@@ -423,7 +2082,7 @@ class TensorComp:
         with self._lock:  # Thread safety
             filepath = self._get_filepath(index)
             
-            if self.overwrite==False and filepath.exists():
+            if self.overwrite==False and self._resolve(filepath) is not None:
                 print("File", filepath, "exists already - skipping")
                 return
                 
@@ -436,20 +2095,16 @@ class TensorComp:
             if show:
                 print(tensor_cpu)
             
-            if atomic:
-                # Atomic write using temp file + rename
-                if self.native:
-                    self._atomic_save(tensor, filepath, lambda t, p: torch.save(t, p))
-                else:
-                    np_array = tensor_cpu.numpy()
-                    self._atomic_save(np_array, filepath, lambda arr, p: np.save(p, arr))
+            # atomic: write to temp file + rename, otherwise direct write (faster but not atomic)
+            itemsize = tensor_cpu.element_size()
+            if self.native:
+                written = self._write(tensor, filepath, lambda t, p: torch.save(t, p), atomic, itemsize)
             else:
-                # Direct write (faster but not atomic)
-                if self.native:
-                    torch.save(tensor, filepath)
-                else:
-                    np_array = tensor_cpu.numpy()
-                    np.save(filepath, np_array)
+                np_array = tensor_cpu.numpy()
+                written = self._write(np_array, filepath, lambda arr, p: np.save(p, arr), atomic, itemsize)
+            
+            if self.summary:
+                self._update_summary({f"cp-{index}": {**tensor_summary(tensor_cpu), **written}})
     
     def load(self, index: int, device: Optional[str] = None) -> torch.Tensor:
         """Load a tensor from disk.
@@ -464,14 +2119,14 @@ class TensorComp:
         Raises:
             FileNotFoundError: If tensor file doesn't exist
         """
-        filepath = self._get_filepath(index)
-        if not filepath.exists():
+        filepath = self._resolve(self._get_filepath(index))
+        if filepath is None:
             raise FileNotFoundError(f"No tensor found at index {index}")
         
         if self.native:
-            tensor = torch.load(filepath, map_location=device if device else 'cpu')
+            tensor = self._read(filepath, lambda f: torch.load(f, map_location=device if device else 'cpu'))
         else:
-            np_array = np.load(filepath)
+            np_array = self._read(filepath, np.load)
             tensor = torch.from_numpy(np_array)
             if device:
                 tensor = tensor.to(device)
@@ -491,39 +2146,87 @@ class TensorComp:
         """
         with self._lock:  # Thread safety
             filepath = self.directory / "tensor_dict.pt"
+            shard_dir = self.directory / SHARD_DIRS['dict']
             
-            if self.overwrite == False and filepath.exists():
+            if self.overwrite == False and (self._resolve(filepath) is not None or
+                                            self._resolve(shard_dir / SHARD_INDEX) is not None):
                 print(f"File {filepath} exists already - skipping")
                 return
             
             # Convert all tensors to CPU before saving
             cpu_dict = {k: v.detach().cpu() for k, v in tensor_dict.items()}
             
-            if atomic:
-                self._atomic_save(cpu_dict, filepath, lambda d, p: torch.save(d, p))
+            if self.sharded:
+                written = self._write_shards(shard_dir, [(name, 'tensor', t) for name, t in cpu_dict.items()],
+                                             atomic)
+                self._remove([filepath, filepath.with_name(filepath.name + COMPRESSED_SUFFIX)])
             else:
-                torch.save(cpu_dict, filepath)
+                written = [self._write(cpu_dict, filepath, lambda d, p: torch.save(d, p), atomic,
+                                       _common_itemsize(cpu_dict.values()))] * len(cpu_dict)
+                self._remove_shards(shard_dir)
+            
+            if self.summary:
+                self._update_summary({f"tensor_dict/{name}": {**tensor_summary(t), **w}
+                                      for (name, t), w in zip(cpu_dict.items(), written)},
+                                     replace_prefix="tensor_dict/")
             
             if self.verbose:
                 print(f"[Rank {self.rank}] Saved {len(cpu_dict)} tensors to {filepath}")
                 for name, tensor in cpu_dict.items():
                     print(f"  {name}: {tensor.shape}, {tensor.dtype}")
     
-    def load_dict(self, device: Optional[str] = None) -> Dict[str, torch.Tensor]:
+    def load_dict(self, device: Optional[str] = None, keys: Optional[list] = None,
+                  workers=8, streams=2) -> Dict[str, torch.Tensor]:
         """Load a dictionary of named tensors.
         
         Args:
             device (str, optional): Device to load tensors to
+            keys (list, optional): Load only these entries (in this order). Sharded dumps
+                read just their files; single-file dumps are memory-mapped
+            workers (int): Threads reading the files of a sharded dump
+            streams (int): CUDA streams for a CUDA device, see to_device_pipelined()
             
         Returns:
             Dict[str, torch.Tensor]: Dictionary of loaded tensors
+            
+        Raises:
+            FileNotFoundError: If there is no tensor dictionary
+            KeyError: If one of keys is not in the dictionary
         """
-        filepath = self.directory / "tensor_dict.pt"
-        
-        if not filepath.exists():
-            raise FileNotFoundError(f"No tensor dictionary found at {filepath}")
-        
-        tensor_dict = torch.load(filepath, map_location=device if device else 'cpu')
+        device = _fallback_device(device)
+        index = self._shard_index(SHARD_DIRS['dict'])
+        if index is not None:
+            filepath = self.directory / SHARD_DIRS['dict']
+            entries = index['entries']
+            if keys is not None:
+                by_name = {e['name']: e for e in entries}
+                missing = [k for k in keys if k not in by_name]
+                if missing:
+                    raise KeyError(f"{missing} not in {filepath}")
+                entries = [by_name[k] for k in keys]
+            values = self._load_shards(filepath, entries, device, workers, streams)
+            tensor_dict = {e['name']: v for e, v in zip(entries, values)}
+        else:
+            filepath = self._resolve(self.directory / "tensor_dict.pt")
+            
+            if filepath is None:
+                raise FileNotFoundError(f"No tensor dictionary found at {self.directory / 'tensor_dict.pt'}")
+            
+            if _is_cuda(device):
+                # memory-mapped, the reads then overlap with the host-to-device copies
+                mapped = self._load_mapped("tensor_dict.pt")
+                names = list(mapped) if keys is None else keys
+            elif keys is None:
+                mapped = self._read(filepath, lambda f: torch.load(f, map_location=device if device else 'cpu'))
+                names, device = list(mapped), None
+            else:
+                mapped = self._load_mapped("tensor_dict.pt")
+                names = keys
+            missing = [k for k in names if k not in mapped]
+            if missing:
+                raise KeyError(f"{missing} not in {filepath}")
+            values = self._to_device([mapped[k] for k in names], device, streams)
+            tensor_dict = dict(zip(names, values))
         
         if self.verbose:
             print(f"Loaded {len(tensor_dict)} tensors from {filepath}")
@@ -542,8 +2245,10 @@ class TensorComp:
         """
         with self._lock:  # Thread safety
             filepath = self.directory / "args.pt"
+            shard_dir = self.directory / SHARD_DIRS['args']
             
-            if self.overwrite == False and filepath.exists():
+            if self.overwrite == False and (self._resolve(filepath) is not None or
+                                            self._resolve(shard_dir / SHARD_INDEX) is not None):
                 print(f"File {filepath} exists already - skipping")
                 return
             
@@ -557,12 +2262,26 @@ class TensorComp:
                 else:
                     saved_args.append(('other', str(type(arg))))
             
-            data = {'args': saved_args, 'names': names}
-            
-            if atomic:
-                self._atomic_save(data, filepath, lambda d, p: torch.save(d, p))
+            if self.sharded:
+                written = self._write_shards(shard_dir, [(names[i] if names and i < len(names) else None, kind, val)
+                                                         for i, (kind, val) in enumerate(saved_args)], atomic)
+                self._remove([filepath, filepath.with_name(filepath.name + COMPRESSED_SUFFIX)])
             else:
-                torch.save(data, filepath)
+                data = {'args': saved_args, 'names': names}
+                
+                written = [self._write(data, filepath, lambda d, p: torch.save(d, p), atomic,
+                                       _common_itemsize(v for kind, v in saved_args if kind == 'tensor'))
+                           ] * len(saved_args)
+                self._remove_shards(shard_dir)
+            
+            if self.summary:
+                entries = {}
+                for i, (kind, val) in enumerate(saved_args):
+                    if kind == 'tensor':
+                        entries[f"args/{i}"] = {**tensor_summary(val), **written[i]}
+                        if names and i < len(names):
+                            entries[f"args/{i}"]['name'] = names[i]
+                self._update_summary(entries, replace_prefix="args/")
             
             if self.verbose:
                 print(f"[Rank {self.rank}] Saved {len(saved_args)} args to {filepath}")
@@ -573,39 +2292,62 @@ class TensorComp:
                     else:
                         print(f"  {name}: {dtype} = {val}")
     
-    def load_args(self, device: Optional[str] = None) -> tuple:
+    def load_args(self, device: Optional[str] = None, indices: Optional[list] = None,
+                  workers=8, streams=2) -> tuple:
         """Load saved args.
         
         Args:
             device (str, optional): Device to load tensors to
+            indices (list, optional): Load only the args at these positions (in this order).
+                Sharded dumps read just their files; single-file dumps are memory-mapped
+            workers (int): Threads reading the files of a sharded dump
+            streams (int): CUDA streams for a CUDA device, see to_device_pipelined()
             
         Returns:
             tuple: Loaded arguments
         """
-        filepath = self.directory / "args.pt"
-        
-        if not filepath.exists():
-            raise FileNotFoundError(f"No args found at {filepath}")
-        
-        data = torch.load(filepath, map_location='cpu')
-        saved_args = data['args']
-        names = data.get('names', None)
-        
-        # Reconstruct args
-        loaded_args = []
-        for i, (dtype, val) in enumerate(saved_args):
-            if dtype == 'tensor':
-                tensor = val.to(device) if device else val
-                loaded_args.append(tensor)
-            elif dtype == 'scalar':
-                loaded_args.append(val)
+        device = _fallback_device(device)
+        index = self._shard_index(SHARD_DIRS['args'])
+        if index is not None:
+            filepath = self.directory / SHARD_DIRS['args']
+            entries = index['entries']
+            positions = range(len(entries)) if indices is None else indices
+            entries = [entries[i] for i in positions]
+            loaded_args = self._load_shards(filepath, entries, device, workers, streams)
+            names = [e['name'] for e in entries]
+        else:
+            filepath = self._resolve(self.directory / "args.pt")
+            
+            if filepath is None:
+                raise FileNotFoundError(f"No args found at {self.directory / 'args.pt'}")
+            
+            if indices is None and not _is_cuda(device):
+                data = self._read(filepath, lambda f: torch.load(f, map_location='cpu'))
             else:
-                loaded_args.append(None)  # Can't reconstruct other types
+                # memory-mapped, so only the requested args are read and the reads overlap
+                # with the host-to-device copies
+                data = self._load_mapped("args.pt")
+            saved_args = data['args']
+            names = data.get('names', None)
+            if indices is not None:
+                saved_args = [saved_args[i] for i in indices]
+                names = [names[i] if i < len(names) else None for i in indices] if names else None
+            
+            # Reconstruct args
+            loaded_args = []
+            for i, (dtype, val) in enumerate(saved_args):
+                if dtype == 'tensor':
+                    loaded_args.append(val)
+                elif dtype == 'scalar':
+                    loaded_args.append(val)
+                else:
+                    loaded_args.append(None)  # Can't reconstruct other types
+            loaded_args = self._to_device(loaded_args, device, streams)
         
         if self.verbose:
             print(f"Loaded {len(loaded_args)} args from {filepath}")
             for i, arg in enumerate(loaded_args):
-                name = names[i] if names and i < len(names) else f"arg_{i}"
+                name = names[i] if names and i < len(names) and names[i] else f"arg_{i}"
                 if isinstance(arg, torch.Tensor):
                     print(f"  {name}: {arg.shape}, {arg.dtype}, {arg.device}")
                 else:
@@ -613,11 +2355,113 @@ class TensorComp:
         
         return tuple(loaded_args)
     
+    def _write_shards(self, shard_dir: Path, entries: list, atomic=True) -> list:
+        """Write a sharded dump: one file per tensor entry, then index.json.
+        
+        entries are (name, kind, value) tuples with kind 'tensor', 'scalar' or 'other'.
+        The index is written last, so a dump is only visible once all its files are there.
+        
+        Returns:
+            list: per entry what _write() returned for its file (None for non-tensors)
+        """
+        old = self._shard_index(shard_dir.name)
+        shard_dir.mkdir(exist_ok=True)
+        index, written = [], []
+        for i, (name, kind, val) in enumerate(entries):
+            written.append(None)
+            if kind == 'tensor':
+                shard = f"{i}.pt"
+                written[i] = self._write(val, shard_dir / shard, lambda d, p: torch.save(d, p), atomic,
+                                         val.element_size())
+                index.append({'name': name, 'kind': kind, 'file': shard, 'shape': list(val.shape),
+                              'dtype': str(val.dtype).replace("torch.", "")})
+            else:
+                index.append({'name': name, 'kind': kind, 'value': val})
+        self._write({'entries': index}, shard_dir / SHARD_INDEX, _save_json, atomic, compress=False)
+        
+        if old is not None and self.capture != 'shm':
+            # shards of a previous, longer dump
+            kept = {e['file'] for e in index if 'file' in e}
+            self._remove([shard_dir / name for e in old['entries'] if e.get('file') and e['file'] not in kept
+                          for name in (e['file'], e['file'] + COMPRESSED_SUFFIX)])
+        return written
+
+    def _remove_shards(self, shard_dir: Path) -> None:
+        """Delete a sharded dump superseded by a single-file one."""
+        old = self._shard_index(shard_dir.name)
+        if old is None:
+            return
+        self._remove([shard_dir / SHARD_INDEX] +
+                     [shard_dir / name for e in old['entries'] if e.get('file')
+                      for name in (e['file'], e['file'] + COMPRESSED_SUFFIX)])
+
+    def _shard_index(self, subdir: str) -> Optional[dict]:
+        """index.json of a sharded dump (see _write_shards), None if there is none."""
+        filepath = self._resolve(self.directory / subdir / SHARD_INDEX)
+        if filepath is None:
+            return None
+        try:
+            return self._read(filepath, lambda p: json.loads(p.read_text()))
+        except FileNotFoundError:
+            return None  # replaced by a single-file dump since the manifest was read
+
+    def _load_shards(self, shard_dir: Path, entries: list, device: Optional[str], workers=8,
+                     streams=2) -> list:
+        """Values of index.json entries, tensor files are read by a thread pool.
+        
+        For a CUDA device the shards are memory-mapped and streamed with to_device_pipelined().
+        """
+        cuda = _is_cuda(device)
+        load_device = None if cuda else device
+        
+        def load(entry):
+            if entry['kind'] == 'scalar':
+                return entry['value']
+            if entry['kind'] != 'tensor':
+                return None  # Can't reconstruct other types
+            filepath = self._resolve(shard_dir / entry['file'])
+            if filepath is None:
+                raise FileNotFoundError(f"Missing shard {shard_dir / entry['file']}")
+            return self._read(filepath, lambda f: torch.load(f, map_location=load_device if load_device else 'cpu',
+                                                             mmap=cuda and not isinstance(f, io.BytesIO)))
+        
+        if len(entries) <= 1 or workers <= 1:
+            values = [load(e) for e in entries]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(entries))) as pool:
+                values = list(pool.map(load, entries))
+        return to_device_pipelined(values, device, streams) if cuda else values
+
+    def _to_device(self, values: list, device: Optional[str], streams=2) -> list:
+        """Move the tensors in values to device: pipelined for CUDA, plain .to() otherwise."""
+        if device is None:
+            return values
+        if _is_cuda(device):
+            return to_device_pipelined(values, device, streams)
+        return [v.to(device) if isinstance(v, torch.Tensor) else v for v in values]
+
     def __eq__(self, other: 'TensorComp') -> Dict[int, Dict]:
+        """Compare all tensors in this directory with another TensorComp instance (see compare())."""
+        return self.compare(other)
+
+    def compare(self, other: 'TensorComp', sample: Optional[int] = None, sample_mode='strided',
+                escalate_threshold: Optional[float] = None, seed=0,
+                report=False, atol=1e-5, rtol=1.3e-6) -> Dict[int, Dict]:
         """Compare all tensors in this directory with another TensorComp instance.
         
         Args:
             other (TensorComp): Another TensorComp instance to compare with
+            sample (int, optional): Compare only this many elements per tensor (see compare_torch).
+                Uncompressed dumps are memory-mapped so only the sampled pages are read
+            sample_mode (str): 'strided' or 'random'
+            escalate_threshold (float, optional): Fall back to a full comparison for tensors
+                whose sampled max_diff exceeds this value
+            seed (int): Seed for deterministic sampling
+            report (bool): Return compare_report() metrics instead (dtype-aware, chunked,
+                mismatch counts against atol/rtol, relative/ULP errors, error histogram).
+                Sampling does not apply
+            atol (float): Absolute tolerance for report=True
+            rtol (float): Relative tolerance for report=True
             
         Returns:
             Dict[int, Dict]: Dictionary mapping tensor indices to comparison metrics
@@ -626,43 +2470,420 @@ class TensorComp:
             FileNotFoundError: If a corresponding tensor is not found in other directory
         """
         results = {}
+        sample_kw = dict(sample=sample, sample_mode=sample_mode,
+                         escalate_threshold=escalate_threshold, seed=seed)
+        if sample is not None:
+            # memory-map plain files: a sampled comparison then touches only a few pages
+            torch_load = lambda f: torch.load(f, map_location='cpu', mmap=not isinstance(f, io.BytesIO))
+            np_load = lambda f: np.load(f, mmap_mode=None if isinstance(f, io.BytesIO) else 'r')
+        else:
+            torch_load, np_load = (lambda f: torch.load(f)), np.load  # no torch import for numpy dumps
         
-        # Get pattern based on file extension
-        pattern = "cp-*.pt" if self.native else "cp-*.npy"
-        
-        # Get all tensor files in this directory
-        for filepath in self.directory.glob(pattern):
-            index = int(filepath.stem.split('-')[1])
+        # Get all tensor files in this directory (plain and compressed dumps)
+        for index, filepath in self._index_files().items():
             
             try:
+                other_path = other._resolve(other._get_filepath(index))
+                if other_path is None:
+                    raise FileNotFoundError(other._get_filepath(index))
                 # Load tensors using the appropriate method based on native flag
-                if self.native:
-                    tensor1 = torch.load(filepath)
-                    tensor2 = torch.load(other._get_filepath(index))
+                if report:
+                    load = torch_load if self.native else np_load
+                    results[index] = compare_report(self._read(filepath, load), other._read(other_path, load),
+                                                    atol=atol, rtol=rtol)
+                elif self.native:
+                    tensor1 = self._read(filepath, torch_load)
+                    tensor2 = other._read(other_path, torch_load)
                     # Compare using torch operations
-                    results[index] = compare_torch(tensor1, tensor2)
+                    results[index] = compare_torch(tensor1, tensor2, **sample_kw)
                 else:
                     # Use numpy comparison (original implementation)
-                    arr1 = np.load(filepath)
-                    arr2 = np.load(other._get_filepath(index))
+                    arr1 = self._read(filepath, np_load)
+                    arr2 = other._read(other_path, np_load)
                     
                     if arr1.shape != arr2.shape:
                         raise ValueError(f"Shape mismatch for index {index}: {arr1.shape} vs {arr2.shape}")
                     
-                    abs_diff = np.abs(arr1 - arr2)
-                    results[index] = {
-                        'max_diff': float(np.max(abs_diff)),
-                        'mean_diff': float(np.mean(abs_diff)),
-                        'l2_diff': float(np.sqrt(np.mean(np.square(abs_diff)))),
-                        'shape': arr1.shape,
-                        'arr1_mean': float(np.mean(arr1)),
-                        'arr2_mean': float(np.mean(arr2)),
-                        'arr1_std': float(np.std(arr1)),
-                        'arr2_std': float(np.std(arr2))
-                    }
+                    # differences in float64 (chunked), uint8 0 vs 1 must not come out as 255
+                    metrics = compare_np(arr1, arr2, **sample_kw)
+                    results[index] = {k: float(v) if isinstance(v, np.generic) else v
+                                      for k, v in metrics.items()}
                 
             except FileNotFoundError:
                 raise FileNotFoundError(f"No corresponding tensor found at index {index} in comparison directory")
         
         return results
-    
\ No newline at end of file
+    
+
+    def _load_mapped(self, name: str):
+        """torch.load a dump memory-mapped, so tensors are only read when they are used.
+        
+        Compressed (.tcz) dumps have to be decompressed, but only once.
+        """
+        filepath = self._resolve(self.directory / name)
+        if filepath is None:
+            raise FileNotFoundError(f"No {name} found in {self.directory}")
+        return self._read(filepath, lambda f: torch.load(f, map_location='cpu',
+                                                         mmap=not isinstance(f, io.BytesIO)))
+
+    def _named_entries(self, what: str, match: str) -> Tuple[Dict, list]:
+        """Entries of the save_dict / save_args dump as {key: (value getter, summary key)}.
+        
+        Nothing is read before a getter is called: single-file dumps are memory-mapped,
+        sharded dumps load the entry's file. Args that are neither tensors nor scalars
+        come back as their saved type string in both layouts. With match='name', args
+        whose name occurs more than once keep their position as key.
+        
+        Returns:
+            tuple: (entries, names that occur more than once)
+        """
+        if what not in SHARD_DIRS:
+            raise ValueError(f"Unknown dump '{what}', expected 'dict' or 'args'")
+        if match not in ('position', 'name'):
+            raise ValueError(f"Unknown match '{match}', expected 'position' or 'name'")
+        index = self._shard_index(SHARD_DIRS[what])
+        if index is not None:
+            shard_dir = self.directory / SHARD_DIRS[what]
+            getters = [(e['name'], (lambda e=e: e['value']) if e['kind'] == 'other'
+                        else (lambda e=e: self._load_shards(shard_dir, [e], None)[0]))
+                       for e in index['entries']]
+        elif what == 'dict':
+            mapped = self._load_mapped("tensor_dict.pt")
+            getters = [(name, lambda t=t: t) for name, t in mapped.items()]
+        else:
+            data = self._load_mapped("args.pt")
+            names = data.get('names') or []
+            getters = [(names[i] if i < len(names) else None, lambda v=val: v)
+                       for i, (kind, val) in enumerate(data['args'])]
+        if what == 'dict':
+            return {name: (get, f"tensor_dict/{name}") for name, get in getters}, []
+        counts = collections.Counter(name for name, _ in getters if name)
+        duplicates = sorted(name for name, count in counts.items() if count > 1)
+        return {(name if match == 'name' and name and counts[name] == 1 else i): (get, f"args/{i}")
+                for i, (name, get) in enumerate(getters)}, duplicates
+
+    def compare_named(self, other: 'TensorComp', what='dict', match='position',
+                      atol=1e-5, rtol=1.3e-6, use_summary=True) -> Dict[str, object]:
+        """Compare the save_dict (what='dict') or save_args (what='args') dumps entry by entry.
+        
+        Both dump files are memory-mapped once (sharded dumps read single entry files) and
+        only the entries present in both are read (compressed dumps are decompressed once).
+        With summary=True dumps on both sides, bit-identical tensors are recognized from
+        their checksums without reading them.
+        
+        Args:
+            other (TensorComp): Another TensorComp instance to compare with
+            what (str): 'dict' (tensor_dict.pt) or 'args' (args.pt)
+            match (str): For args: pair entries by 'position' or by their saved 'name'
+            atol (float): Absolute tolerance for compare_report()
+            rtol (float): Relative tolerance for compare_report()
+            use_summary (bool): Whether to use summary.json checksums to skip identical tensors
+            
+        Returns:
+            dict: 'compared' {key: compare_report() metrics}, 'identical' [keys],
+            'missing' [keys only in this dump], 'extra' [keys only in other's dump],
+            'shape_mismatch' {key: (shape, other_shape)}, 'value_mismatch'
+            {key: (value, other_value)} for non-tensor args that differ and
+            'duplicate_names' [arg names saved more than once in either dump; with
+            match='name' those args are paired by position instead]
+        """
+        mine, duplicates = self._named_entries(what, match)
+        theirs, other_duplicates = other._named_entries(what, match)
+        summary1 = self.load_summary() if use_summary else {}
+        summary2 = other.load_summary() if use_summary else {}
+        
+        result = {'compared': {}, 'identical': [],
+                  'missing': [k for k in mine if k not in theirs],
+                  'extra': [k for k in theirs if k not in mine],
+                  'shape_mismatch': {}, 'value_mismatch': {},
+                  'duplicate_names': sorted(set(duplicates) | set(other_duplicates))}
+        for key, (get1, skey1) in mine.items():
+            if key not in theirs:
+                continue
+            get2, skey2 = theirs[key]
+            if skey1 in summary1 and skey2 in summary2 and _same_content(summary1[skey1], summary2[skey2]):
+                result['identical'].append(key)  # bit-identical tensors, nothing to read
+                continue
+            val1, val2 = get1(), get2()
+            tensors = isinstance(val1, torch.Tensor), isinstance(val2, torch.Tensor)
+            if tensors == (False, False) and type(val1) == type(val2) and val1 == val2:
+                result['identical'].append(key)
+            elif tensors != (True, True):
+                result['value_mismatch'][key] = tuple(
+                    f"tensor{tuple(v.shape)}" if is_tensor else v for v, is_tensor in zip((val1, val2), tensors))
+            elif val1.shape != val2.shape:
+                result['shape_mismatch'][key] = (tuple(val1.shape), tuple(val2.shape))
+            else:
+                result['compared'][key] = compare_report(val1, val2, atol=atol, rtol=rtol)
+        
+        return result
+
+    def series(self, name: str = "series", **kwargs) -> 'TensorSeries':
+        """Open the append-only step log <directory>/<name>.series (see TensorSeries).
+        
+        kwargs (segment_bytes, compress, ...) are passed on; compress defaults to this
+        instance's codec.
+        """
+        kwargs.setdefault('compress', self.compress)
+        kwargs.setdefault('shuffle', self.shuffle)
+        return TensorSeries(self.directory / f"{name}.series", **kwargs)
+
+    def prescreen(self, other: 'TensorComp') -> Dict[str, dict]:
+        """Pre-screen a comparison from the summary.json indexes alone (see prescreen_summaries).
+        
+        Only entries saved with summary=True are covered; nothing is loaded.
+        """
+        return prescreen_summaries(self.load_summary(), other.load_summary())
+
+    def first_divergence(self, other: 'TensorComp', atol=1e-5, rtol=1.3e-6, use_summary=True):
+        """Find the first index (in order) whose tensors differ beyond tolerance.
+        
+        Walks cp-0, cp-1, ... and stops at the first tensor with an element violating
+        |a - b| <= atol + rtol * |b|, which usually points at the offending kernel.
+        If both directories were saved with summary=True, tensors with identical
+        checksums are skipped without loading them; only summary entries whose dump
+        file still matches the manifest count (see load_summary()).
+        
+        Args:
+            other (TensorComp): Another TensorComp instance to compare with
+            atol (float): Absolute tolerance
+            rtol (float): Relative tolerance
+            use_summary (bool): Whether to use summary.json checksums to skip identical tensors
+            
+        Returns:
+            tuple or None: (index, metrics) of the first divergent tensor, None if all match.
+            metrics are those of compare_report(), or 'shape' / 'other_shape' on a
+            shape mismatch
+            
+        Raises:
+            FileNotFoundError: If a corresponding tensor is not found in other directory
+        """
+        mine = self.load_summary(validate=True) if use_summary else {}
+        theirs = other.load_summary(validate=True) if use_summary else {}
+        
+        for index in self.indices():
+            key = f"cp-{index}"
+            if key in mine and key in theirs and _same_content(mine[key], theirs[key]):
+                continue  # bit-identical
+            
+            tensor1 = self.load(index)
+            tensor2 = other.load(index)
+            if tensor1.shape != tensor2.shape:
+                return index, {'shape': tuple(tensor1.shape), 'other_shape': tuple(tensor2.shape)}
+            
+            # cheap scan; the full report only for the tensor that diverges
+            if count_mismatches(tensor1, tensor2, atol=atol, rtol=rtol):
+                return index, compare_report(tensor1, tensor2, atol=atol, rtol=rtol)
+        
+        return None
+
+
+# --- Append-only step series ----------------------------------------------
+#
+# <name>.series/ holds segment files seg-NNNNN.bin with back-to-back records
+#   u32 header length | JSON header {dtype, shape[, codec, shuffle]} | tensor bytes
+# and index.bin, one fixed-size _SERIES_ENTRY per appended step:
+#   step i64 | segment u32 | offset u64 | record length u64
+# Both files are only ever appended to; a torn last index entry (crash) is ignored
+# and a step appended twice resolves to its latest record.
+
+_SERIES_ENTRY = struct.Struct('<qIQQ')
+_SERIES_INDEX = "index.bin"
+
+
+class TensorSeries:
+    """Append-only log of one tensor per step, e.g. a gradient tracked over training.
+    
+    Replaces TensorComp.save(t, index=step) for long runs: instead of one file (and
+    one fsync) per step, tensors are appended to large segment files and found
+    again through an offset index, so any single step can still be read back
+    directly. One writer per series (e.g. per rank directory); readers may follow
+    a series while it is written (call refresh()).
+    """
+
+    def __init__(self, directory, segment_bytes: int = 1 << 30, compress: Optional[str] = None,
+                 shuffle=False, compress_level: Optional[int] = None):
+        """Open (or create) a series directory.
+        
+        Args:
+            directory: Path of the <name>.series directory
+            segment_bytes (int): Start a new segment file once a segment exceeds this size
+            compress (str, optional): Codec for the tensor bytes ('zstd', 'lz4' or 'zlib')
+            shuffle (bool): Byte-shuffle tensor bytes before compressing
+            compress_level (int, optional): Codec specific compression level
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.compress = compress
+        self.shuffle = shuffle
+        self.compress_level = compress_level
+        if compress is not None:
+            _codec_fns(compress, compress_level)  # fail early on unknown/missing codecs
+        self._lock = threading.Lock()
+        self._entries: Dict[int, tuple] = {}
+        self._index_pos = 0
+        self._readers: Dict[int, int] = {}
+        self._writer = None
+        self._index = None
+        self.refresh()
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"seg-{segment:05d}.bin"
+
+    def refresh(self) -> None:
+        """Pick up steps appended (by another process) since the index was last read."""
+        filepath = self.directory / _SERIES_INDEX
+        if not filepath.exists():
+            return
+        with open(filepath, 'rb') as f:
+            f.seek(self._index_pos)
+            data = f.read()
+        usable = len(data) - len(data) % _SERIES_ENTRY.size
+        for step, segment, offset, length in _SERIES_ENTRY.iter_unpack(data[:usable]):
+            self._entries[step] = (segment, offset, length)
+        self._index_pos += usable
+
+    def steps(self) -> list:
+        """Sorted list of the stored steps."""
+        return sorted(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, step: int) -> bool:
+        return step in self._entries
+
+    def append(self, step: int, tensor: torch.Tensor) -> None:
+        """Append the tensor of one step (no fsync, see sync())."""
+        t = tensor.detach().cpu().contiguous()
+        raw = t.reshape(-1).view(torch.uint8).numpy().tobytes() if t.numel() else b""
+        header = {'dtype': str(t.dtype).replace("torch.", ""), 'shape': list(t.shape)}
+        if self.compress:
+            width = t.element_size() if self.shuffle else 1
+            compress, _ = _codec_fns(self.compress, self.compress_level)
+            raw = compress(_byte_shuffle(raw, width))
+            header.update({'codec': self.compress, 'shuffle': width})
+        head = json.dumps(header).encode()
+        record = struct.pack('<I', len(head)) + head + raw
+        
+        with self._lock:
+            if self._writer is None:
+                segment = max((seg for seg, _, _ in self._entries.values()), default=0)
+                self._writer = (segment, open(self._segment_path(segment), 'ab'))
+                self._index = open(self.directory / _SERIES_INDEX, 'ab')
+                self._index.truncate(self._index_pos)  # drop a torn entry so the next one stays aligned
+            segment, f = self._writer
+            offset = f.tell()
+            if offset > 0 and offset + len(record) > self.segment_bytes:
+                f.close()
+                segment += 1
+                f = open(self._segment_path(segment), 'ab')
+                self._writer = (segment, f)
+                offset = 0
+            f.write(record)
+            f.flush()  # data before its index entry, so readers never see a dangling entry
+            self._index.write(_SERIES_ENTRY.pack(step, segment, offset, len(record)))
+            self._index.flush()
+            self._entries[step] = (segment, offset, len(record))
+            self._index_pos += _SERIES_ENTRY.size
+
+    def read(self, step: int, device: Optional[str] = None) -> torch.Tensor:
+        """Read back the tensor of one step (a single pread)."""
+        if step not in self._entries:
+            self.refresh()
+        if step not in self._entries:
+            raise KeyError(f"No step {step} in {self.directory}")
+        segment, offset, length = self._entries[step]
+        fd = self._readers.get(segment)
+        if fd is None:
+            fd = self._readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+        record = os.pread(fd, length, offset)
+        (head_len,) = struct.unpack_from('<I', record)
+        header = json.loads(record[4:4 + head_len])
+        raw = record[4 + head_len:]
+        if 'codec' in header:
+            _, decompress = _codec_fns(header['codec'])
+            raw = _byte_unshuffle(decompress(raw), header['shuffle'])
+        dtype = getattr(torch, header['dtype'])
+        if raw:
+            tensor = torch.frombuffer(bytearray(raw), dtype=dtype).reshape(header['shape'])
+        else:
+            tensor = torch.empty(header['shape'], dtype=dtype)
+        return tensor.to(device) if device else tensor
+
+    def __iter__(self):
+        """Yield (step, tensor) in step order, one tensor in memory at a time."""
+        for step in self.steps():
+            yield step, self.read(step)
+
+    def sync(self) -> None:
+        """fsync the open segment and the index (once, instead of per step)."""
+        with self._lock:
+            if self._writer is not None:
+                os.fsync(self._writer[1].fileno())
+                os.fsync(self._index.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer[1].close()
+                self._index.close()
+                self._writer = self._index = None
+            for fd in self._readers.values():
+                os.close(fd)
+            self._readers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def compare_series(self, other: 'TensorSeries', atol=1e-5, rtol=1.3e-6) -> dict:
+        """Stream both series step by step and describe how they diverge.
+        
+        Args:
+            other (TensorSeries): Series to compare with (e.g. the same name in another run)
+            atol (float): Absolute tolerance, see compare_report()
+            rtol (float): Relative tolerance, see compare_report()
+            
+        Returns:
+            dict: 'steps' (common steps, in order), 'max_diff' / 'mean_diff' / 'mismatches'
+            (one value per common step), 'first_divergence' (first step out of tolerance,
+            or None), 'shape_mismatch' (steps), 'missing' / 'extra' (steps only in this /
+            the other series), 'growth_per_step' (least-squares slope of log10(max_diff)
+            over the steps from the first divergence on: +1 means 10x per step) and
+            'doubling_steps' (steps for the max_diff to double, None unless it grows)
+        """
+        other.refresh()
+        self.refresh()
+        common = [step for step in self.steps() if step in other]
+        result = {'steps': common, 'max_diff': [], 'mean_diff': [], 'mismatches': [],
+                  'first_divergence': None, 'shape_mismatch': [],
+                  'missing': [step for step in self.steps() if step not in other],
+                  'extra': [step for step in other.steps() if step not in self],
+                  'growth_per_step': None, 'doubling_steps': None}
+        for step in common:
+            t1, t2 = self.read(step), other.read(step)
+            if t1.shape != t2.shape:
+                result['shape_mismatch'].append(step)
+                metrics = {'max_diff': float('inf'), 'mean_diff': float('inf'), 'mismatches': t1.numel()}
+            else:
+                metrics = compare_report(t1, t2, atol=atol, rtol=rtol)
+            for key in ('max_diff', 'mean_diff', 'mismatches'):
+                result[key].append(metrics[key])
+            if metrics['mismatches'] and result['first_divergence'] is None:
+                result['first_divergence'] = step
+        
+        if result['first_divergence'] is not None:
+            start = common.index(result['first_divergence'])
+            points = [(step, math.log10(diff)) for step, diff in zip(common[start:], result['max_diff'][start:])
+                      if 0 < diff < float('inf')]
+            if len(points) >= 2:
+                x = np.array([p[0] for p in points], dtype=np.float64)
+                y = np.array([p[1] for p in points])
+                slope = float(np.polyfit(x, y, 1)[0]) if np.ptp(x) > 0 else 0.0
+                result['growth_per_step'] = slope
+                result['doubling_steps'] = math.log10(2) / slope if slope > 0 else None
+        return result
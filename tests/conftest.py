@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# the tools are scripts, not an installed package: make their directories importable
+ROOT = Path(__file__).resolve().parent.parent
+for directory in ("mirror", "shared/pythonenv", "shared/bin"):
+    sys.path.insert(0, str(ROOT / directory))
@@ -0,0 +1,162 @@
+"""shared/bin/container-health-check.py"""
+import asyncio
+import importlib.util
+import json
+import os
+import threading
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def health():
+    path = os.path.join(HERE, "..", "shared", "bin", "container-health-check.py")
+    spec = importlib.util.spec_from_file_location("container_health_check", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_late_probe_stays_unresponsive(health):
+    checker = health.HealthCheck(timeout=0.2, verbose=False)
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.6)
+        finished.set()
+        return {'status': 'passed', 'elapsed': 0.6, 'details': 'late'}
+
+    probes = [
+        {'name': 'slow', 'func': slow},
+        {'name': 'fast', 'func': lambda: {'status': 'passed', 'elapsed': 0, 'details': ''}},
+    ]
+    results = checker.run_probes(probes, parallel=True)
+    assert results['slow']['status'] == 'unresponsive'
+    assert results['fast']['status'] == 'passed'
+    assert finished.wait(2)
+    time.sleep(0.05)  # let the late thread try to record its result
+    assert results['slow']['status'] == 'unresponsive'
+    assert checker.results['slow']['status'] == 'unresponsive'
+
+
+def test_serial_probes_record_results(health):
+    checker = health.HealthCheck(verbose=False)
+    results = checker.run_probes([{'name': 'true', 'command': 'true'}], parallel=False)
+    assert results['true']['status'] == 'passed'
+    assert checker.results['true'] is results['true']
+
+
+def run_main(health, monkeypatch, *argv):
+    monkeypatch.setattr(health.sys, "argv", ["container-health-check.py", *argv])
+    with pytest.raises(SystemExit) as exit_info:
+        health.main()
+    return exit_info.value.code
+
+
+def test_verdicts_are_cached_for_their_ttl(health, monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(health, "CACHE_FILE", tmp_path / "cache.json")
+    runs = []
+
+    def run_all_tests(self, **options):
+        runs.append(options)
+        return {'passed': 1, 'failed': 0, 'total': 1, 'results': {'probe': {'status': 'passed'}}}
+
+    monkeypatch.setattr(health.HealthCheck, "run_all_tests", run_all_tests)
+    assert run_main(health, monkeypatch, "--json") == 0
+    assert run_main(health, monkeypatch, "--json") == 0
+    assert len(runs) == 1
+    assert json.loads(capsys.readouterr().out.splitlines()[-1])['passed'] == 1
+
+    run_main(health, monkeypatch, "--json", "--refresh")
+    run_main(health, monkeypatch, "--json", "--tools")  # other options, other verdict
+    assert len(runs) == 3
+    run_main(health, monkeypatch, "--json", "--ttl", "0")
+    assert len(runs) == 4
+
+    now = time.time()
+    monkeypatch.setattr(health.time, "time", lambda: now + health.DEFAULT_TTL + 1)
+    assert health.cached_results(health.cache_key("timeout=5,tools=False,filesystem=False,perf=False"),
+                                 health.DEFAULT_TTL) is None
+    run_main(health, monkeypatch, "--json")
+    assert len(runs) == 5
+    assert len(health.load_cache()) == 1  # expired verdicts are dropped on the next store
+
+    run_main(health, monkeypatch, "--clear-cache")
+    assert not health.CACHE_FILE.exists()
+
+
+def test_perf_probes_flag_results_below_baseline(health, monkeypatch, tmp_path):
+    monkeypatch.setattr(health, "BASELINE_FILE", tmp_path / "baselines.json")
+    monkeypatch.setattr(health, "PERF_DIRS", [])
+    monkeypatch.setattr(health.HealthCheck, "detect_gpu_type", lambda self: "Unknown")
+    bandwidth = [10.0]
+    monkeypatch.setattr(health.HealthCheck, "measure_memory", lambda self: {'memory_gbs': bandwidth[0]})
+
+    def run(**options):
+        results = health.HealthCheck(verbose=False).run_all_tests(perf=True, **options)
+        return results['results']['memory']
+
+    first = run()
+    assert first['status'] == 'passed' and "new baseline" in first['details']
+    assert health.load_baselines() == {health.host_id(): {'memory:memory_gbs': 10.0}}
+
+    bandwidth[0] = 6.0  # above PERF_TOLERANCE of the baseline
+    assert run()['status'] == 'passed'
+    bandwidth[0] = 4.0
+    slow = run()
+    assert slow['status'] == 'slow' and "40% of baseline" in slow['details']
+
+    assert run(record_baseline=True)['status'] == 'passed'  # --baseline: the new normal
+    assert health.load_baselines()[health.host_id()] == {'memory:memory_gbs': 4.0}
+    assert run()['status'] == 'passed'
+
+
+def test_timeout_kills_the_whole_process_group(health, tmp_path):
+    pid_file = tmp_path / "child.pid"
+    checker = health.HealthCheck(verbose=False)
+    # the background child keeps the output pipes open; without killing the group
+    # communicate() would wait for it after the shell is gone
+    command = f"sleep 30 & echo $! > {pid_file}; wait"
+    start = time.time()
+    result = checker.run_command_safe(command, 'hang', timeout=0.5)
+    assert result['status'] == 'timeout'
+    assert time.time() - start < 0.5 + health.PROBE_GRACE
+    child = int(pid_file.read_text())
+    deadline = time.time() + 2
+    while time.time() < deadline:
+        try:
+            with open(f"/proc/{child}/stat") as f:
+                if f.read().rsplit(")", 1)[1].split()[0] == "Z":
+                    break  # killed, just not reaped yet
+        except FileNotFoundError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("the probe's background child survived the timeout")
+
+
+def test_daemon_round_metrics_and_alerts(health, tmp_path, capsys):
+    checker = health.HealthCheck(verbose=False)
+    probes = [{'name': 'ok', 'command': 'true'}, {'name': 'bad', 'command': ['false']}]
+    daemon = health.HealthDaemon(checker, probes, metrics_file=tmp_path / "health.prom")
+    asyncio.run(daemon.round())
+    text = (tmp_path / "health.prom").read_text()
+    assert 'health_probe_up{probe="ok"} 1' in text
+    assert 'health_probe_up{probe="bad"} 0' in text
+    assert 'health_probe_failures_total{probe="bad"} 1' in text
+    assert "ALERT bad: failed" in capsys.readouterr().err
+
+    # a latency far above the trend raises an alert, without becoming the new normal
+    for _ in range(health.ALERT_MIN_SAMPLES):
+        daemon.record('ok', 'passed', 0.1)
+    daemon.record('ok', 'passed', 5.0)
+    assert daemon.state['ok']['regressed']
+    assert daemon.state['ok']['median'] == pytest.approx(0.1)
+    daemon.record('ok', 'passed', 0.1)
+    assert not daemon.state['ok']['regressed']
+    err = capsys.readouterr().err
+    assert "ALERT ok: slow" in err and "RECOVERED ok" in err
+    assert json.loads(daemon.render_json())['probes']['ok']['runs'] == health.ALERT_MIN_SAMPLES + 3
@@ -0,0 +1,49 @@
+"""mirror/inventory.py parsing and reports (no ssh)"""
+import json
+
+import inventory
+
+OUTPUT = "\n".join([
+    "@@ images",
+    json.dumps({"Repository": "ci-rocm", "Tag": "latest", "ID": "abc123", "CreatedAt": "2026-10-01 10:00:00 +0000 UTC"}),
+    json.dumps({"Repository": "rocm/pytorch", "Tag": "v2", "ID": "def456", "CreatedAt": "2026-09-01 10:00:00 +0000 UTC"}),
+    "@@ containers",
+    json.dumps({"Names": "sampsa-dev-1", "State": "running", "Image": "rocm/pytorch:v2"}),
+    json.dumps({"Names": "ci-job-7", "State": "exited", "Image": "ci-rocm"}),
+    "@@ disk",
+    "Filesystem 1024-blocks Used Available Capacity Mounted on",
+    "/dev/sda1 2097152 1048576 1048576 50% /",
+    "/dev/sda1 2097152 1048576 1048576 50% /",
+    "@@ tmux",
+    "main session 3 1",
+])
+
+
+def test_parse_inventory():
+    parsed = inventory.parse_inventory(OUTPUT)
+    assert [i["ID"] for i in parsed["images"]] == ["abc123", "def456"]
+    assert len(parsed["containers"]) == 2
+    assert parsed["disk"] == [{"mount": "/", "total_kb": 2097152, "used_kb": 1048576,
+                               "avail_kb": 1048576, "used": "50%"}]
+    assert parsed["tmux"] == [{"name": "main session", "windows": "3", "attached": True}]
+
+
+def fleet():
+    entry = {"nickname": "box", "host": "box.example", **inventory.parse_inventory(OUTPUT)}
+    return {"time": 0, "elapsed": 0, "hosts": {"box.example": entry}}
+
+
+def test_report_contexts_matches_container_names_like_docker_filter(capsys):
+    contexts = {"dev": {"hostname": "box.example", "image_id": "rocm/pytorch:v2", "container_name": "sampsa-dev"}}
+    inventory.report_contexts(fleet(), contexts)
+    out = capsys.readouterr().out.splitlines()
+    assert "Image created on: 2026-09-01" in out
+    assert out.count("CONTAINER EXISTS") == 1
+    assert out.count("CONTAINER IS RUNNING") == 1
+
+
+def test_report_ci(capsys):
+    inventory.report_ci(fleet())
+    out = capsys.readouterr().out
+    assert "Image: ci-rocm:latest\n  Containers:\n    ci-job-7\n" in out
+    assert "rocm/pytorch" not in out
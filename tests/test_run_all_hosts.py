@@ -0,0 +1,25 @@
+"""mirror/run_all_hosts.py --parallel"""
+import sys
+
+import run_all_hosts
+
+HOSTS = [("good", "good.example", 22), ("broken", "broken.example", 22), ("bad", "bad.example", 22)]
+
+
+def test_run_parallel_collects_per_host_errors(monkeypatch, capsys):
+    def host_command(hostname, sshport, username, script_to_run, ssh):
+        if hostname == "broken.example":
+            raise RuntimeError("no route to host")
+        code = 0 if hostname == "good.example" else 3
+        return dict(args=[sys.executable, "-c", f"print('hi from {hostname}'); raise SystemExit({code})"]), None
+
+    monkeypatch.setattr(run_all_hosts, "host_command", host_command)
+    failed = run_all_hosts.run_parallel(HOSTS, "user", "ignored", ssh=False, parallel=3)
+    out = capsys.readouterr().out
+    assert failed == 2
+    assert "[good  ] hi from good.example" in out
+    assert "[bad   ] hi from bad.example" in out
+    summary = out.split("Summary:")[1]
+    assert "✓ good" in summary
+    assert "✗ broken error" in summary and "no route to host" in summary
+    assert "✗ bad    exit 3" in summary
@@ -0,0 +1,49 @@
+"""mirror/sshpool.py against a fake ssh on PATH"""
+import os
+import time
+
+import sshpool
+
+FAKE_SSH = """#!/bin/sh
+echo "$@" >> "{log}"
+case "$*" in
+    *"-O check"*) exit 255 ;;
+    *"down.example"*) echo "ssh: connect to host down.example port 22: Connection refused" >&2; exit 255 ;;
+    *"-f -N"*) sleep 30 & exit 0 ;;  # like a forked master: holds whatever fds it got
+esac
+"""
+
+
+def fake_ssh(tmp_path, monkeypatch):
+    log = tmp_path / "ssh.log"
+    script = tmp_path / "bin" / "ssh"
+    script.parent.mkdir()
+    script.write_text(FAKE_SSH.format(log=log))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+    return log
+
+
+def test_host_key_checking_is_relaxed_only_for_batch_commands():
+    assert "StrictHostKeyChecking=accept-new" in sshpool.ssh_command("h", 22, "u", "ls")
+    interactive = sshpool.ssh_command("h", 22, "u", batch=False)
+    assert not any(option.startswith("StrictHostKeyChecking") for option in interactive)
+    assert "BatchMode=no" in interactive
+
+
+def test_connect_does_not_wait_for_the_backgrounded_master(tmp_path, monkeypatch):
+    log = fake_ssh(tmp_path, monkeypatch)
+    start = time.time()
+    assert sshpool.connect("up.example", 2222, "user") is None
+    assert time.time() - start < 5
+    calls = log.read_text().splitlines()
+    assert len(calls) == 2 and "ControlMaster=yes" in calls[1] and "user@up.example" in calls[1]
+
+
+def test_connect_reports_ssh_errors(tmp_path, monkeypatch):
+    fake_ssh(tmp_path, monkeypatch)
+    error = sshpool.connect("down.example", 22, "user")
+    assert "Connection refused" in error
+    assert sshpool.describe_error(error) == "Port is closed"
+    result = sshpool.run("down.example", 22, "user", "true")
+    assert result.returncode == 255 and "Connection refused" in result.stderr
@@ -0,0 +1,119 @@
+"""mirror/sync.py against a local directory target"""
+import os
+import time
+
+import pytest
+
+import sync
+
+
+def write(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+@pytest.fixture
+def trees(tmp_path, monkeypatch):
+    monkeypatch.setattr(sync, "MANIFEST_DIR", tmp_path / "manifests")
+    local, remote = tmp_path / "local", tmp_path / "remote"
+    for name in [
+        "mirror/go_ssh.py", "mirror/.hidden", "mirror/context/hosts.yaml",
+        "shared/launch.json", "shared/dump/README.md",
+        "shared/bin/tool.bash", "shared/bin/.secret",
+        "shared/notebook/nb.ipynb", "shared/notebook/out.png", "shared/notebook/.ipynb_checkpoints/nb.ipynb",
+        "shared/tests/t1/test.py", "shared/tests/t1/log.txt", "shared/tests/t1/data.bin",
+        "shared/tests/SAVED/old.py",
+        "shared/secret/.env",
+        "shared/pythonenv/tensorhelp.py", "shared/pythonenv/__pycache__/tensorhelp.pyc",
+    ]:
+        write(local / name)
+    remote.mkdir()
+    return local, sync.LocalTarget(remote)
+
+
+def files(root):
+    return sorted(str(p.relative_to(root)) for p in root.rglob("*") if p.is_file())
+
+
+def test_push_rules(trees):
+    local, target = trees
+    summary = sync.push(local, target)
+    assert files(target.root) == [
+        "mirror/context/hosts.yaml", "mirror/go_ssh.py",
+        "shared/bin/tool.bash", "shared/dump/README.md", "shared/launch.json",
+        "shared/notebook/nb.ipynb", "shared/pythonenv/tensorhelp.py", "shared/secret/.env",
+        "shared/tests/t1/log.txt", "shared/tests/t1/test.py",
+    ]
+    assert summary["shared/notebook"]["sent"] == 1
+    assert summary["mirror"]["sent"] == 2
+
+
+def test_push_is_incremental(trees):
+    local, target = trees
+    sync.push(local, target)
+    summary = sync.push(local, target)
+    assert sum(result["sent"] for result in summary.values()) == 0
+
+    # touched but same content: re-hashed, not sent
+    later = time.time() + 10
+    os.utime(local / "mirror/go_ssh.py", (later, later))
+    assert sync.push(local, target)["mirror"]["sent"] == 0
+
+    write(local / "mirror/go_ssh.py", b"changed")
+    summary = sync.push(local, target)
+    assert summary["mirror"]["sent"] == 1
+    assert sum(result["sent"] for result in summary.values()) == 1
+    assert (target.root / "mirror/go_ssh.py").read_bytes() == b"changed"
+
+
+def test_push_restores_files_changed_at_the_target(trees):
+    local, target = trees
+    sync.push(local, target)
+    (target.root / "mirror/go_ssh.py").unlink()
+    write(target.root / "shared/bin/tool.bash", b"edited remotely")
+    later = time.time() + 10
+    os.utime(target.root / "shared/bin/tool.bash", (later, later))
+
+    summary = sync.push(local, target)
+    assert summary["mirror"]["sent"] == 1
+    assert summary["shared/bin"]["sent"] == 1
+    assert sum(result["sent"] for result in summary.values()) == 2
+    assert (target.root / "mirror/go_ssh.py").read_bytes() == b"x"
+    assert (target.root / "shared/bin/tool.bash").read_bytes() == b"x"
+    assert sum(result["sent"] for result in sync.push(local, target).values()) == 0
+
+
+def test_push_reports_large_files(trees):
+    local, target = trees
+    write(local / "shared/bin/big.bash", b"x" * 2048)
+    summary = sync.push(local, target, max_size=1024)
+    assert summary["shared/bin"]["too_large"] == ["shared/bin/big.bash"]
+    assert not (target.root / "shared/bin/big.bash").exists()
+
+
+def test_dry_run_sends_nothing(trees):
+    local, target = trees
+    summary = sync.push(local, target, dry_run=True)
+    assert summary["mirror"]["sent"] == 2
+    assert files(target.root) == []
+
+
+def test_pull_rules(trees, tmp_path):
+    remote, target = trees[0], sync.LocalTarget(trees[0])
+    local = tmp_path / "pulled"
+    summary = sync.pull(local, target)
+    assert files(local) == [
+        "mirror/.hidden", "mirror/go_ssh.py",
+        "shared/bin/tool.bash", "shared/launch.json",
+        "shared/notebook/nb.ipynb", "shared/notebook/out.png", "shared/pythonenv/tensorhelp.py",
+        "shared/tests/t1/log.txt", "shared/tests/t1/test.py",
+    ]
+    assert summary["shared"]["sent"] == 1
+
+    assert sum(result["sent"] for result in sync.pull(local, target).values()) == 0
+    write(remote / "shared/bin/tool.bash", b"new")
+    later = time.time() + 10
+    os.utime(remote / "shared/bin/tool.bash", (later, later))
+    summary = sync.pull(local, target)
+    assert summary["shared/bin"]["sent"] == 1
+    assert (local / "shared/bin/tool.bash").read_bytes() == b"new"
@@ -0,0 +1,330 @@
+"""shared/pythonenv/tensorhelp.py: dump directories, manifests and comparisons"""
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from tensorhelp import TensorComp
+
+
+def test_first_divergence_ignores_stale_summary(tmp_path):
+    run1 = TensorComp(tmp_path / "run1", summary=True)
+    run2 = TensorComp(tmp_path / "run2", summary=True)
+    for index in range(3):
+        run1.save(torch.full((4,), float(index)), index)
+        run2.save(torch.full((4,), float(index)), index)
+    assert run1.first_divergence(run2) is None
+
+    # re-saved without summary=True: the old checksum of cp-1 must not be trusted
+    TensorComp(tmp_path / "run1").save(torch.full((4,), 9.0), 1)
+    assert "cp-1" not in run1.load_summary()
+    index, metrics = run1.first_divergence(run2)
+    assert index == 1
+    assert metrics['mismatches'] == 4
+
+
+@pytest.mark.parametrize("native", [False, True])
+def test_compare_does_not_wrap_integers(tmp_path, native):
+    run1 = TensorComp(tmp_path / "run1", native=native)
+    run2 = TensorComp(tmp_path / "run2", native=native)
+    run1.save(torch.zeros(8, dtype=torch.uint8), 0)
+    run2.save(torch.ones(8, dtype=torch.uint8), 0)
+    assert run1.compare(run2)[0]['max_diff'] == 1.0
+    assert (run1 == run2)[0]['mean_diff'] == 1.0
+
+
+def test_fused_stats_flags():
+    from tensorhelp import fused_stats
+
+    st = fused_stats(torch.tensor([0.0, float('nan'), 0.0]))
+    assert st['has_nan'] and not st['all_zeros']
+    assert st['min'] == st['max'] == 0
+    assert fused_stats(torch.zeros(5))['all_zeros']
+    assert not fused_stats(torch.full((2,), float('nan')))['all_zeros']
+
+    st = fused_stats(torch.tensor([1.0, -2.0, float('inf')]), moments=False)
+    assert (st['min'], st['max'], st['mean'], st['var']) == (-2.0, float('inf'), None, None)
+    assert st['has_inf'] and not st['has_nan']
+    st = fused_stats(torch.zeros(3, dtype=torch.complex64), moments=False)
+    assert st['all_zeros'] and st['mean'] is None
+
+
+def _capture_rank(directory, rank):
+    tc = TensorComp(directory, rank=rank, capture='shm', summary=True, shm_capacity=1 << 20)
+    for index in range(3):
+        tc.save(torch.full((64,), float(rank * 10 + index)), index)
+    tc.save_dict({'Q': torch.ones(4) * rank})
+    assert tc.flush(timeout=30)
+
+
+def test_shm_capture_four_ranks(tmp_path, monkeypatch):
+    import multiprocessing
+    import tensorhelp
+
+    monkeypatch.setattr(tensorhelp, "SHM_ROOT", tmp_path / "shm")  # inherited by the forked ranks
+    directory = tmp_path / "dump"
+    ring_dir = tensorhelp.shm_ring_dir(directory)
+    ctx = multiprocessing.get_context("fork")
+    aggregator = tensorhelp.ShmAggregator(directory).start()
+    ranks = [ctx.Process(target=_capture_rank, args=(directory, rank)) for rank in range(4)]
+    for process in ranks:
+        process.start()
+    for process in ranks:
+        process.join(60)
+        assert process.exitcode == 0
+    aggregator.stop(60)
+
+    assert sorted(p.name for p in directory.iterdir()) == [f"rank_{rank}" for rank in range(4)]
+    for rank in range(4):
+        tc = TensorComp(directory, rank=rank)
+        assert tc.indices() == [0, 1, 2]
+        assert set(tc.manifest()) == {"cp-0.npy", "cp-1.npy", "cp-2.npy", "tensor_dict.pt"}
+        assert tc.manifest() == tc._scan_manifest()
+        assert tc.load(2).tolist() == [float(rank * 10 + 2)] * 64
+        assert tc.load_dict()['Q'].tolist() == [float(rank)] * 4
+        summary = tc.load_summary()
+        assert sorted(summary) == ["cp-0", "cp-1", "cp-2", "tensor_dict/Q"]
+        assert summary["cp-1"]['max'] == rank * 10 + 1
+    assert not ring_dir.exists()
+
+
+@pytest.mark.parametrize("listed", [True, False])
+def test_index_files_prefers_plain_dumps(tmp_path, listed):
+    import shutil
+
+    tc = TensorComp(tmp_path / "run", native=True, compress='zlib')
+    tc.save(torch.zeros(3), 0)
+    plain = TensorComp(tmp_path / "other", native=True)
+    plain.save(torch.ones(3), 0)
+    shutil.copy(plain.directory / "cp-0.pt", tc.directory / "cp-0.pt")
+    if listed:
+        tc.rebuild_manifest()
+        assert {"cp-0.pt", "cp-0.pt.tcz"} <= set(tc.manifest())
+    else:
+        for name in ("manifest.json", "manifest.journal"):
+            (tc.directory / name).unlink()
+        tc = TensorComp(tmp_path / "run", native=True)
+        assert tc.manifest() is None
+
+    assert tc._index_files()[0].name == "cp-0.pt"
+    assert tc.load(0).tolist() == [1.0, 1.0, 1.0]
+    assert tc.indices() == [0]
+
+
+def test_compare_named_sharded_vs_single_file(tmp_path):
+    args = (torch.arange(6.0).reshape(2, 3), 3, None, torch.ones(2))
+    names = ["x", "n", "opt", "x"]
+    sharded = TensorComp(tmp_path / "sharded", sharded=True)
+    single = TensorComp(tmp_path / "single")
+    sharded.save_args(*args, names=names)
+    single.save_args(*args, names=names)
+    sharded.save_dict({'Q': torch.ones(3), 'K': torch.zeros(2)})
+    single.save_dict({'Q': torch.ones(3), 'K': torch.zeros(2)})
+
+    diff = sharded.compare_named(single, what='args')
+    assert diff['value_mismatch'] == {}
+    assert sorted(diff['identical']) == [1, 2]
+    assert all(m['mismatches'] == 0 for m in diff['compared'].values())
+
+    diff = sharded.compare_named(single, what='args', match='name')
+    assert diff['duplicate_names'] == ["x"]
+    assert sorted(diff['compared'], key=str) == [0, 3]
+    assert sorted(diff['identical']) == ["n", "opt"]
+    assert diff['missing'] == diff['extra'] == []
+
+    diff = single.compare_named(sharded, what='dict')
+    assert sorted(diff['compared']) == ['K', 'Q'] and diff['missing'] == []
+
+
+@pytest.mark.parametrize("as_numpy", [False, True])
+def test_complex_diff_is_magnitude(as_numpy):
+    from tensorhelp import compare_np, compare_torch
+    t1 = torch.zeros(3, dtype=torch.complex64)
+    t2 = t1.clone()
+    t2[0] = 3 + 4j
+    if as_numpy:
+        metrics = compare_np(t1.numpy(), t2.numpy())
+    else:
+        metrics = compare_torch(t1, t2)
+    assert metrics['max_diff'] == pytest.approx(5)
+    assert metrics['mean_diff'] == pytest.approx(5 / 3)
+    assert metrics['l2_diff'] == pytest.approx((25 / 3) ** 0.5)
+    sampled = compare_torch(t1, t2, sample=2)  # elements 0 and 1
+    assert sampled['max_diff'] == pytest.approx(5)
+    assert sampled['mean_diff'] == pytest.approx(2.5)
+
+
+def test_summary_journal_checksums_and_compaction(tmp_path, monkeypatch):
+    import tensorhelp
+    from tensorhelp import tensor_checksum
+
+    monkeypatch.setattr(tensorhelp, "_JOURNAL_COMPACT_BYTES", 2048)
+    tc = TensorComp(tmp_path / "run", summary=True)
+    tensors = [torch.arange(8.0) * index for index in range(12)]
+    for index, tensor in enumerate(tensors):
+        tc.save(tensor, index)
+    tc.save_dict({'Q': torch.ones(3), 'K': torch.zeros(2)})
+    tc.save_dict({'V': torch.ones(2)})  # replaces the previous tensor_dict entries
+    assert (tc.directory / "summary.json").exists()  # the journal was folded in at least once
+
+    summary = TensorComp(tmp_path / "run").load_summary()
+    assert sorted(summary) == sorted([f"cp-{i}" for i in range(12)] + ["tensor_dict/V"])
+    for index, tensor in enumerate(tensors):
+        assert summary[f"cp-{index}"]['checksum'] == tensor_checksum(tensor)
+
+    other = TensorComp(tmp_path / "other", summary=True)
+    for index, tensor in enumerate(tensors):
+        other.save(tensor if index != 5 else tensor + 1, index)
+    verdicts = tc.prescreen(other)
+    assert verdicts["cp-5"]['status'] == 'different'
+    assert all(verdicts[f"cp-{i}"]['status'] == 'identical' for i in range(12) if i != 5)
+
+
+def test_sampled_compare_bounds():
+    from tensorhelp import compare_np, compare_torch
+
+    gen = torch.Generator().manual_seed(0)
+    t1 = torch.randn(100_000, generator=gen)
+    t2 = t1 + torch.rand(100_000, generator=gen)  # |diff| ~ U(0, 1), mean 0.5
+    full = compare_torch(t1, t2)
+    for mode in ('strided', 'random'):
+        sampled = compare_torch(t1, t2, sample=2000, sample_mode=mode)
+        assert sampled['sample_size'] == 2000
+        assert sampled['mean_diff_lo'] <= full['mean_diff'] <= sampled['mean_diff_hi']
+        assert sampled['max_diff'] <= full['max_diff']
+        assert sampled['max_diff_exceed_frac'] == pytest.approx(2.996 / 2000, rel=1e-3)
+        assert compare_torch(t1, t2, sample=2000, sample_mode=mode) == sampled  # deterministic
+    assert compare_np(t1.numpy(), t2.numpy(), sample=2000) == compare_torch(t1, t2, sample=2000)
+
+    # escalation: a sampled max_diff above the threshold redoes the full comparison
+    escalated = compare_torch(t1, t2, sample=2000, escalate_threshold=0.1)
+    assert 'sample_size' not in escalated and escalated['max_diff'] == full['max_diff']
+    assert 'sample_size' in compare_torch(t1, t2, sample=2000, escalate_threshold=2.0)
+    assert 'sample_size' not in compare_torch(t1, t2, sample=200_000)  # more than numel
+
+
+@pytest.mark.parametrize("chunk", [7, 1 << 20])
+def test_nonfinite_report_matches_brute_force(monkeypatch, chunk):
+    import tensorhelp
+    from tensorhelp import nonfinite_report
+
+    monkeypatch.setattr(tensorhelp, "_MASK_CHUNK", chunk)  # runs crossing chunk borders
+    gen = torch.Generator().manual_seed(0)
+    t = torch.randn(6, 10, generator=gen)
+    t[torch.rand(6, 10, generator=gen) < 0.3] = float('nan')
+    t[2, 3:9] = float('nan')
+    t[5, 9] = float('inf')
+
+    flags = torch.isnan(t).reshape(-1).tolist()
+    runs, longest, length = 0, 0, 0
+    for flag in flags:
+        length = length + 1 if flag else 0
+        runs += length == 1
+        longest = max(longest, length)
+    positions = torch.isnan(t).nonzero().tolist()
+
+    report = nonfinite_report(t, 'nan', topk=2)
+    assert report['count'] == sum(flags) and report['numel'] == 60
+    assert report['first'] == tuple(positions[0]) and report['last'] == tuple(positions[-1])
+    assert (report['runs'], report['longest_run']) == (runs, longest)
+    rows = torch.isnan(t).sum(dim=1)
+    assert report['per_dim'][0]['slices_hit'] == int((rows > 0).sum())
+    assert report['per_dim'][0]['top'][0] == (2, int(rows.max()))
+
+    assert nonfinite_report(t, 'inf')['first'] == (5, 9)
+    assert nonfinite_report(t, 'nonfinite')['count'] == sum(flags) + 1
+    clean = nonfinite_report(torch.zeros(4, 4))
+    assert clean['count'] == 0 and clean['first'] is None and clean['per_dim'] == []
+
+
+@pytest.mark.parametrize("compress", [None, 'zlib'])
+def test_series_append_read_and_compare(tmp_path, compress):
+    from tensorhelp import TensorSeries
+
+    tc = TensorComp(tmp_path / "run1", compress=compress)
+    with tc.series("grad", segment_bytes=256) as mine, \
+            TensorSeries(tmp_path / "run2" / "grad.series", compress=compress) as theirs:
+        for step in range(6):
+            base = torch.full((4, 4), float(step))
+            mine.append(step, base)
+            # diverges from step 3 on, 10x more every step
+            theirs.append(step, base + (10.0 ** (step - 6) if step >= 3 else 0))
+        theirs.append(6, torch.zeros(1))
+        mine.append(7, torch.empty(0, 3, dtype=torch.bfloat16))
+
+        assert len(list((tmp_path / "run1" / "grad.series").glob("seg-*.bin"))) > 1
+        reader = TensorSeries(tmp_path / "run1" / "grad.series")  # follows the writer
+        assert reader.steps() == [0, 1, 2, 3, 4, 5, 7]
+        assert torch.equal(reader.read(4), torch.full((4, 4), 4.0))
+        assert reader.read(7).shape == (0, 3) and reader.read(7).dtype == torch.bfloat16
+        with pytest.raises(KeyError):
+            reader.read(6)
+        reader.close()
+
+        result = mine.compare_series(theirs, atol=0, rtol=0)
+        assert result['steps'] == [0, 1, 2, 3, 4, 5]
+        assert result['missing'] == [7] and result['extra'] == [6]
+        assert result['first_divergence'] == 3
+        assert result['mismatches'][:3] == [0, 0, 0]
+        assert result['growth_per_step'] == pytest.approx(1, abs=0.05)
+        assert result['doubling_steps'] == pytest.approx(0.301, abs=0.02)
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_load_dict_and_args_to_cuda_device(tmp_path, sharded):
+    tc = TensorComp(tmp_path / "run", sharded=sharded)
+    tensors = {'Q': torch.randn(64, 8), 'K': torch.arange(10), 'V': torch.ones(0)}
+    tc.save_dict(tensors)
+    tc.save_args(torch.randn(5), 7, None, torch.zeros(2, 2, dtype=torch.bfloat16))
+    expected = 'cuda' if torch.cuda.is_available() else 'cpu'  # CPU fallback without CUDA
+
+    loaded = tc.load_dict(device='cuda', keys=['V', 'Q'], streams=2)
+    assert list(loaded) == ['V', 'Q']
+    for key, tensor in loaded.items():
+        assert tensor.device.type == expected
+        assert torch.equal(tensor.cpu(), tensors[key])
+
+    args = tc.load_args(device='cuda', indices=[3, 1])
+    assert args[0].device.type == expected and args[0].dtype == torch.bfloat16
+    assert args[1] == 7
+
+
+def test_compare_named_dicts_and_args(tmp_path):
+    run1 = TensorComp(tmp_path / "run1", summary=True)
+    run2 = TensorComp(tmp_path / "run2", summary=True)
+    run1.save_dict({'Q': torch.ones(4), 'K': torch.zeros(4), 'V': torch.ones(2), 'W': torch.ones(1)})
+    run2.save_dict({'Q': torch.ones(4), 'K': torch.full((4,), 0.5), 'V': torch.ones(3), 'X': torch.ones(1)})
+
+    diff = run1.compare_named(run2)
+    assert diff['identical'] == ['Q']  # from the summary.json checksums
+    assert list(diff['compared']) == ['K'] and diff['compared']['K']['mismatches'] == 4
+    assert diff['shape_mismatch'] == {'V': ((2,), (3,))}
+    assert (diff['missing'], diff['extra']) == (['W'], ['X'])
+
+    run1.save_args(torch.ones(2), 128, "causal", names=["q", "block", "mask"])
+    run2.save_args(torch.ones(2), 64, "causal", names=["q", "block", "mask"])
+    diff = run1.compare_named(run2, what='args', match='name')
+    assert diff['value_mismatch'] == {'block': (128, 64)}
+    assert sorted(diff['identical']) == ['mask', 'q']
+
+
+def test_manifest_journal_compaction_and_followers(tmp_path, monkeypatch):
+    import tensorhelp
+
+    monkeypatch.setattr(tensorhelp, "_JOURNAL_COMPACT_BYTES", 512)
+    writer = TensorComp(tmp_path / "run", native=True)
+    reader = TensorComp(tmp_path / "run", native=True)
+    for index in range(40):
+        writer.save(torch.full((2,), float(index)), index)
+        if index % 7 == 0:
+            assert reader.manifest(refresh=True) == writer._scan_manifest()
+    journal = tmp_path / "run" / "manifest.journal"
+    assert len(journal.read_text().splitlines()) < 40  # compacted along the way
+    assert reader._manifest_stale()  # saves since the last refresh
+    reader.manifest(refresh=True)
+    assert reader.indices() == list(range(40)) and not reader._manifest_stale()
+
+    # a dump deleted behind the manifest's back is found missing, not served stale
+    (tmp_path / "run" / "cp-3.pt").unlink()
+    with pytest.raises(FileNotFoundError):
+        reader.load(3)
+    assert reader.load(4).tolist() == [4.0, 4.0]